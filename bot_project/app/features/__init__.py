@@ -1,3 +1,4 @@
-from .odds_fetcher import fetch_odds_for_league
+from .odds_fetcher import fetch_odds_for_league, fetch_odds_frame
 from .data_processing import preprocess_odds, process_pipeline
-from .result_formatter import format_results
\ No newline at end of file
+from .result_formatter import format_results
+from .odds_frame import OddsFrame
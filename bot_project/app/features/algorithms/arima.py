@@ -1,61 +1,240 @@
+import logging
+import threading
+import time
+import warnings
 import numpy as np
-from typing import List, Dict
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Dict, Optional, Tuple, Union
 from app.features.data_processing import ProcessedMatch
+from app.features.odds_frame import OddsFrame, OUTCOMES, DRAW, ensure_frame
+from config.settings import (
+    ARIMA_ORDER,
+    ARIMA_MIN_OBSERVATIONS,
+    ARIMA_LOOKBACK_HOURS,
+    ARIMA_REFIT_EVERY,
+    ARIMA_TIME_BUDGET,
+    ARIMA_WORKERS,
+    ARIMA_MAX_MODELS,
+    ODDS_HISTORY_ENABLED
+)
 
-def analyze_odds_movement(matches: List[ProcessedMatch]) -> Dict[str, Dict]:
+logger = logging.getLogger('OddsBot')
+
+# Convergence chatter from short series; installed once, since the filter
+# list is process-global and fits run concurrently in pool threads
+warnings.filterwarnings('ignore', module='statsmodels')
+
+SeriesKey = Tuple[str, int]
+
+class _CachedModel:
+    __slots__ = ('results', 'forecast', 'last_ts', 'appended')
+
+    def __init__(self, results, last_ts: float, appended: int = 0):
+        self.results = results
+        self.forecast = float(results.forecast(1)[0])
+        self.last_ts = last_ts
+        self.appended = appended
+
+class ArimaForecaster:
+    """
+    One-step ARIMA forecasts for many (match, outcome) price series.
+    Fitted models are cached per series: new observations are appended to the
+    cached fit without re-estimation, and after refit_every appends the model is
+    refit warm-started from its previous parameters. Fits run in parallel; any
+    series not done within the time budget is left to the caller's fallback and
+    cached when it finishes. The cache is per process.
+    """
+
+    def __init__(
+        self,
+        order: Tuple[int, int, int] = ARIMA_ORDER,
+        min_observations: int = ARIMA_MIN_OBSERVATIONS,
+        refit_every: int = ARIMA_REFIT_EVERY,
+        time_budget: float = ARIMA_TIME_BUDGET,
+        max_workers: int = ARIMA_WORKERS,
+        max_models: int = ARIMA_MAX_MODELS
+    ):
+        self.order = order
+        self.min_observations = min_observations
+        self.refit_every = refit_every
+        self.time_budget = time_budget
+        self.max_models = max_models
+        self._models: "OrderedDict[SeriesKey, _CachedModel]" = OrderedDict()
+        self._pending: Dict[SeriesKey, object] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='arima')
+
+    def _fit(self, timestamps: np.ndarray, prices: np.ndarray, cached: Optional[_CachedModel]) -> _CachedModel:
+        from statsmodels.tsa.arima.model import ARIMA
+
+        if cached is not None:
+            new = prices[timestamps > cached.last_ts]
+            if not new.size:
+                return cached
+            if cached.appended + new.size < self.refit_every:
+                return _CachedModel(cached.results.append(new, refit=False), timestamps[-1], cached.appended + new.size)
+            start_params = cached.results.params
+        else:
+            start_params = None
+
+        results = ARIMA(prices, order=self.order).fit(start_params=start_params)
+        return _CachedModel(results, timestamps[-1])
+
+    def _store(self, key: SeriesKey, model: _CachedModel) -> None:
+        with self._lock:
+            self._models[key] = model
+            self._models.move_to_end(key)
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+
+    def _submit(self, key: SeriesKey, timestamps: np.ndarray, prices: np.ndarray):
+        with self._lock:
+            future = self._pending.get(key)
+            if future is not None:
+                return future
+            cached = self._models.get(key)
+            future = self._pool.submit(self._fit, timestamps, prices, cached)
+            self._pending[key] = future
+
+        def finish(done):
+            with self._lock:
+                self._pending.pop(key, None)
+            if done.exception() is None:
+                self._store(key, done.result())
+            else:
+                logger.warning(f"ARIMA fit failed for {key}: {done.exception()}")
+        future.add_done_callback(finish)
+        return future
+
+    def forecast(self, series: Dict[SeriesKey, Tuple[np.ndarray, np.ndarray]]) -> Dict[SeriesKey, float]:
+        """
+        One-step-ahead forecasts for series long enough to model.
+        Returns: {key: forecast} for series fitted within the time budget
+        """
+        futures = {
+            key: self._submit(key, timestamps, prices)
+            for key, (timestamps, prices) in series.items()
+            if len(prices) >= self.min_observations
+        }
+        if not futures:
+            return {}
+        wait(futures.values(), timeout=self.time_budget)
+
+        forecasts = {}
+        for key, future in futures.items():
+            if future.done() and future.exception() is None:
+                forecasts[key] = future.result().forecast
+        if len(forecasts) < len(futures):
+            logger.info(f"ARIMA budget hit: {len(futures) - len(forecasts)} series fell back to heuristic")
+        return forecasts
+
+_forecaster: Optional[ArimaForecaster] = None
+
+def get_forecaster() -> ArimaForecaster:
+    global _forecaster
+    if _forecaster is None:
+        _forecaster = ArimaForecaster()
+    return _forecaster
+
+def _load_history(frame: OddsFrame) -> Dict[SeriesKey, Tuple[np.ndarray, np.ndarray]]:
+    """Consensus price history for every match in the frame."""
+    if not ODDS_HISTORY_ENABLED:
+        return {}
+    from data.odds_history import get_history_store
+    try:
+        return get_history_store().get_consensus_series_bulk(
+            frame.match_ids.tolist(),
+            since=time.time() - ARIMA_LOOKBACK_HOURS * 3600
+        )
+    except Exception as e:
+        logger.error(f"Odds history read failed: {str(e)}")
+        return {}
+
+def _cross_section_trends(frame: OddsFrame):
+    """
+    Fallback heuristic: 3-point moving average over the bookmaker prices of a
+    single snapshot. Returns (usable, current, volatility, rising, strength) arrays.
+    """
+    # One row per (match, market), prices packed to the left in bookmaker order
+    series = frame.prices.transpose(0, 2, 1).reshape(-1, frame.n_bookmakers)
+    valid = ~np.isnan(series)
+    counts = valid.sum(axis=1)
+    packed = np.take_along_axis(series, np.argsort(~valid, axis=1, kind='stable'), axis=1)
+
+    # 3-point moving average at both ends of each series
+    usable = counts >= 3
+    last_idx = np.clip(counts[:, None] - 3 + np.arange(3), 0, None)
+    head = packed[:, :3].mean(axis=1) if packed.shape[1] >= 3 else np.full(len(packed), np.nan)
+    tail = np.take_along_axis(packed, last_idx, axis=1).mean(axis=1)
+    n = np.maximum(counts, 1)
+    mean = np.nansum(series, axis=1) / n
+    volatility = np.sqrt(np.nansum((series - mean[:, None]) ** 2, axis=1) / n)
+
+    shape = (frame.n_matches, len(OUTCOMES))
+    return (
+        usable.reshape(shape),
+        tail.reshape(shape),
+        volatility.reshape(shape),
+        (tail > head).reshape(shape),
+        np.abs(tail - head).reshape(shape)
+    )
+
+def analyze_odds_movement(
+    matches: Union[OddsFrame, List[ProcessedMatch]],
+    forecaster: Optional[ArimaForecaster] = None
+) -> Dict[str, Dict]:
     """
-    ARIMA analysis with market selection
+    ARIMA analysis with market selection.
+    Uses fitted ARIMA forecasts on stored price history where there is enough of
+    it, and the moving-average heuristic on the current snapshot otherwise.
     Returns: {match_id: {analysis}, ...}
     """
-    results = {}
-    
-    for match in matches:
-        try:
-            market_analysis = {}
-            
-            # Analyze all available markets
-            for market in ['home', 'away', 'draw']:
-                odds_key = f'{market}_odds'
-                if not match.get(odds_key) or len(match[odds_key]) < 3:
-                    continue
-                
-                prices = match[odds_key]
-                prices_array = np.array(prices)
-                
-                # Trend analysis
-                window_size = min(3, len(prices))
-                moving_avg = np.convolve(prices_array, np.ones(window_size)/window_size, mode='valid')
-                trend = 'rising' if moving_avg[-1] > moving_avg[0] else 'falling'
-                
-                market_analysis[market] = {
-                    'current_odds': round(float(np.mean(prices_array[-3:])), 2),
-                    'volatility': round(float(np.std(prices_array)), 3),
-                    'trend': trend,
-                    'trend_strength': abs(moving_avg[-1] - moving_avg[0])
-                }
-            
-            if not market_analysis:
+    frame = ensure_frame(matches)
+    if not frame.n_matches:
+        return {'error': 'no_clear_trends'}
+
+    usable, current, volatility, rising, strength = _cross_section_trends(frame)
+    forecast = np.full(usable.shape, np.nan)
+
+    history = _load_history(frame)
+    if history:
+        forecasts = (forecaster or get_forecaster()).forecast(history)
+        rows = {match_id: row for row, match_id in enumerate(frame.match_ids)}
+        for (match_id, market), value in forecasts.items():
+            row = rows.get(match_id)
+            if row is None or not np.isfinite(value):
                 continue
-                
-            # Select best market
-            best_market = max(market_analysis.items(), 
-                            key=lambda x: (x[1]['trend_strength'], -x[1]['volatility']))
-            
-            results[match['match_id']] = {
-                'home_team': match['home_team'],
-                'away_team': match['away_team'],
-                'recommended_market': best_market[0].upper(),
-                'recommended_team': match[f'{best_market[0]}_team'] if best_market[0] != 'draw' else 'Draw',
-                'current_odds': best_market[1]['current_odds'],
-                'trend': best_market[1]['trend'],
-                'volatility': best_market[1]['volatility'],
-                'recommendation': 'strong_buy' if (
-                    best_market[1]['trend'] == 'rising' and 
-                    best_market[1]['volatility'] > 0.3
-                ) else 'hold'
-            }
-            
-        except Exception as e:
-            continue
-            
-    return {'arima': results} if results else {'error': 'no_clear_trends'}
\ No newline at end of file
+            prices = history[(match_id, market)][1]
+            usable[row, market] = True
+            current[row, market] = prices[-1]
+            volatility[row, market] = np.std(prices)
+            rising[row, market] = value > prices[-1]
+            strength[row, market] = abs(value - prices[-1])
+            forecast[row, market] = value
+
+    results = {}
+    for row in np.flatnonzero(usable.any(axis=1)):
+        # Strongest trend wins, lower volatility breaks ties
+        markets = [k for k in range(len(OUTCOMES)) if usable[row, k]]
+        best = max(markets, key=lambda k: (strength[row, k], -round(float(volatility[row, k]), 3)))
+        trend = 'rising' if rising[row, best] else 'falling'
+        modelled = not np.isnan(forecast[row, best])
+
+        results[frame.match_ids[row]] = {
+            'home_team': frame.home_teams[row],
+            'away_team': frame.away_teams[row],
+            'recommended_market': OUTCOMES[best].upper(),
+            'recommended_team': frame.team(row, best) if best != DRAW else 'Draw',
+            'current_odds': round(float(current[row, best]), 2),
+            'forecast_odds': round(float(forecast[row, best]), 2) if modelled else None,
+            'model': 'arima' if modelled else 'heuristic',
+            'trend': trend,
+            'volatility': round(float(volatility[row, best]), 3),
+            'recommendation': 'strong_buy' if (
+                trend == 'rising' and
+                volatility[row, best] > 0.3
+            ) else 'hold'
+        }
+
+    return {'arima': results} if results else {'error': 'no_clear_trends'}
@@ -1,11 +1,13 @@
-from typing import Dict, List
+from typing import Dict, List, Union
 import random
+from app.features.odds_frame import OddsFrame, ensure_frame
 
-def demo_analysis(matches: List[Dict]) -> Dict[str, List[Dict]]:
+def demo_analysis(matches: Union[OddsFrame, List[Dict]]) -> Dict[str, List[Dict]]:
+    frame = ensure_frame(matches)
     return {
         "demo": [{
-            "match": f"{m['home_team']} vs {m['away_team']}",
+            "match": f"{home} vs {away}",
             "prediction": random.choice(["Home Win", "Away Win", "Draw"]),
             "confidence": f"{random.randint(50, 100)}%"
-        } for m in matches]
-    }
\ No newline at end of file
+        } for home, away in zip(frame.home_teams, frame.away_teams)]
+    }
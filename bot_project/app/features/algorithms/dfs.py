@@ -1,48 +1,78 @@
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Union
 from app.features.data_processing import ProcessedMatch
+from app.features.odds_frame import OddsFrame, OUTCOMES, HOME, AWAY, DRAW, ensure_frame
 
-def detect_arbitrage(matches: List[ProcessedMatch]) -> Dict[str, List[Dict]]:
+def scan_arbitrage(frame: OddsFrame, total_stake: float = 100.0) -> List[Dict]:
     """
-    Find arbitrage opportunities within individual matches using bookmaker odds
-    Returns: {arbitrage_opportunities: [...]}
+    Scan every match of a frame for arbitrage in one pass over the price tensor.
+    Concatenate frames (OddsFrame.concat) to scan several leagues at once.
+    Returns: opportunities ranked by ROI, each with the stake split that pays
+    the same amount whichever outcome wins.
     """
-    opportunities = []
-    
-    for match in matches:
-        try:
-            best_home = max((odds for bm in match['bookmakers'].values() 
-                           if (odds := bm['home']) is not None), default=None)
-            best_away = max((odds for bm in match['bookmakers'].values() 
-                           if (odds := bm['away']) is not None), default=None)
-            best_draw = max((odds for bm in match['bookmakers'].values() 
-                           if (odds := bm['draw']) is not None), default=None)
+    if not frame.n_matches:
+        return []
+
+    best = frame.best_prices
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inverse = 1 / best
+        implied_sum = inverse.sum(axis=1)  # NaN when an outcome is unquoted
+        roi = 1 / implied_sum - 1
+
+    rows = np.flatnonzero(implied_sum < 1)
+    if not rows.size:
+        return []
+    rows = rows[np.argsort(-roi[rows], kind='stable')]
+
+    # Equal-payout allocation: stake_k is proportional to 1/odds_k
+    stakes = (total_stake * inverse[rows] / implied_sum[rows, None]).tolist()
+    payouts = (total_stake / implied_sum[rows]).tolist()
+    best_odds = best[rows].tolist()
 
-            if all([best_home, best_away, best_draw]):
-                total_implied_prob = (1/best_home + 1/best_away + 1/best_draw)
-                roi = (1 - total_implied_prob) * 100
-                
-                if total_implied_prob < 1:  # ROI > 0%
-                    # Find bookmakers offering these odds
-                    home_bms = [bm for bm, odds in match['bookmakers'].items() 
-                              if odds['home'] == best_home]
-                    away_bms = [bm for bm, odds in match['bookmakers'].items() 
-                              if odds['away'] == best_away]
-                    draw_bms = [bm for bm, odds in match['bookmakers'].items() 
-                              if odds['draw'] == best_draw]
-                    
-                    opportunities.append({
-                        'home_team': match['home_team'],
-                        'away_team': match['away_team'],
-                        'home_odds': best_home,
-                        'away_odds': best_away,
-                        'draw_odds': best_draw,
-                        'home_bookmakers': home_bms[:2],  # Top 2 bookmakers
-                        'away_bookmakers': away_bms[:2],
-                        'draw_bookmakers': draw_bms[:2],
-                        'potential_return': round(roi, 1)
-                    })
-        except Exception as e:
-            continue
+    # Every bookmaker tying on the best price, grouped per opportunity and outcome
+    ties = [[[] for _ in OUTCOMES] for _ in rows]
+    for i, col, k in zip(*np.nonzero(frame.prices[rows] == best[rows, None, :])):
+        ties[i][k].append(frame.bookmakers[col])
 
-    return {'arbitrage_opportunities': opportunities[:5]} if opportunities else {'status': 'no_arbitrage'}
\ No newline at end of file
+    opportunities = []
+    for i, row in enumerate(rows.tolist()):
+        bookmakers = ties[i]
+        opportunities.append({
+            'match_id': frame.match_ids[row],
+            'league': frame.leagues[row],
+            'home_team': frame.home_teams[row],
+            'away_team': frame.away_teams[row],
+            'commence_time': frame.commence_times[row],
+            'home_odds': best_odds[i][HOME],
+            'away_odds': best_odds[i][AWAY],
+            'draw_odds': best_odds[i][DRAW],
+            'home_bookmakers': bookmakers[HOME],
+            'away_bookmakers': bookmakers[AWAY],
+            'draw_bookmakers': bookmakers[DRAW],
+            'implied_probability_sum': float(implied_sum[row]),
+            'potential_return': round(float(roi[row]) * 100, 2),
+            'total_stake': total_stake,
+            'guaranteed_payout': payouts[i],
+            'stakes': [
+                {
+                    'market': name.upper(),
+                    'team': frame.team(row, k),
+                    'bookmaker': bookmakers[k][0],
+                    'odds': best_odds[i][k],
+                    'stake': stakes[i][k]
+                }
+                for k, name in enumerate(OUTCOMES)
+            ]
+        })
+    return opportunities
+
+def detect_arbitrage(
+    matches: Union[OddsFrame, List[ProcessedMatch]],
+    total_stake: float = 100.0
+) -> Dict[str, List[Dict]]:
+    """
+    Find arbitrage opportunities within individual matches using bookmaker odds
+    Returns: {arbitrage_opportunities: [...]} ranked by ROI
+    """
+    opportunities = scan_arbitrage(ensure_frame(matches), total_stake)
+    return {'arbitrage_opportunities': opportunities} if opportunities else {'status': 'no_arbitrage'}
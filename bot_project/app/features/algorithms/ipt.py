@@ -1,39 +1,38 @@
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Union
 from app.features.data_processing import ProcessedMatch
+from app.features.fair_odds import fair_probabilities
+from app.features.odds_frame import OddsFrame, HOME, AWAY, ensure_frame
 
-def implied_probability_threshold_model(matches: List[ProcessedMatch], threshold: float = 0.4) -> Dict[str, List[Dict]]:
+def implied_probability_threshold_model(
+    matches: Union[OddsFrame, List[ProcessedMatch]],
+    threshold: float = 0.4
+) -> Dict[str, List[Dict]]:
     """
     Predict outcomes based on implied probabilities
     Returns: {predictions: [...]}
     """
+    frame = ensure_frame(matches)
     predictions = []
-    
-    for match in matches:
-        try:
-            home_prob = np.median([1/o for o in match['home_odds']])
-            away_prob = np.median([1/o for o in match['away_odds']])
-            draw_prob = np.median([1/o for o in match['draw_odds']])
-            
-            total = home_prob + away_prob + draw_prob
-            home_prob /= total
-            away_prob /= total
-            
-            prediction = (
-                "Home Win" if home_prob > threshold else
-                "Away Win" if away_prob > threshold else
-                "No Clear Favorite"
-            )
-            
-            predictions.append({
-                'match_id': match['match_id'],
-                'prediction': "Home Win" if home_prob > threshold else "Away Win" if away_prob > threshold else "No Clear Favorite",
-                'home_team': match['home_team'],   
-                'away_team': match['away_team'],
-                'home_prob': round(home_prob, 2),
-                'away_prob': round(away_prob, 2)
-            })
-        except:
+    if not frame.n_matches:
+        return {'error': 'no_predictions'}
+
+    # Margin-free consensus probability per outcome, shared with the other algorithms
+    probs = fair_probabilities(frame)
+
+    for row in range(frame.n_matches):
+        home_prob = probs[row, HOME]
+        away_prob = probs[row, AWAY]
+        if np.isnan(home_prob) or np.isnan(away_prob):
             continue
+
+        predictions.append({
+            'match_id': frame.match_ids[row],
+            'prediction': "Home Win" if home_prob > threshold else "Away Win" if away_prob > threshold else "No Clear Favorite",
+            'home_team': frame.home_teams[row],
+            'away_team': frame.away_teams[row],
+            'home_prob': float(round(home_prob, 2)),
+            'away_prob': float(round(away_prob, 2))
+        })
             
-    return {'predictions': predictions} if predictions else {'error': 'no_predictions'}
\ No newline at end of file
+    return {'predictions': predictions} if predictions else {'error': 'no_predictions'}
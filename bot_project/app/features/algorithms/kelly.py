@@ -1,49 +1,182 @@
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Optional, Union
 from app.features.data_processing import ProcessedMatch
+from app.features.fair_odds import fair_probabilities
+from app.features.odds_frame import OddsFrame, OUTCOMES, ensure_frame
+from config.settings import (
+    KELLY_FRACTION,
+    KELLY_MAX_STAKE,
+    KELLY_MAX_EXPOSURE,
+    KELLY_MIN_EDGE,
+    KELLY_SCENARIOS,
+    KELLY_SEED
+)
 
-def calculate_parlay_stakes(matches: List[ProcessedMatch], bankroll: float = 1000.0) -> Dict[str, List[Dict]]:
+class KellyOptimizer:
     """
-    Enhanced Kelly Criterion with bookmaker-specific recommendations
-    Returns: {recommended_parlays: [...]}
+    Simultaneous Kelly staking for many concurrent bets.
+    Bets on the same match are mutually exclusive, bets on different matches
+    independent. Expected log growth is estimated over seeded joint outcome
+    scenarios and maximised by diagonally scaled projected gradient ascent
+    with backtracking, subject to 0 <= stake <= cap and total stake <= exposure.
     """
-    parlays = []
-    
-    for match in matches:
-        try:
-            # Get all valid home odds from bookmakers
-            bookmaker_odds = [
-                (bm_name, bm_data['home']) 
-                for bm_name, bm_data in match['bookmakers'].items()
-                if bm_data['home'] is not None
-            ]
-            
-            if not bookmaker_odds:
-                continue
-                
-            # Find best odds and corresponding bookmaker
-            best_odds, best_bookmaker = max(
-                bookmaker_odds, 
-                key=lambda x: x[1]
-            )
-            
-            # Calculate probability and edge
-            implied_prob = 1 / best_odds
-            edge = implied_prob * best_odds - 1  # Simplified edge calculation
-            
-            if edge > 0.05:  # Minimum 5% edge threshold
-                stake = (edge / (best_odds - 1)) * bankroll
-                
-                parlays.append({
-                    'home_team': match['home_team'],
-                    'away_team': match['away_team'],
-                    'bookmaker': best_bookmaker,
-                    'odds': best_odds,
-                    'recommended_stake': stake,
-                    'edge_percentage': edge * 100
-                })
-                
-        except Exception as e:
-            continue
-            
-    return {'recommended_parlays': parlays[:5]} if parlays else {'status': 'no_valuable_parlays'}
\ No newline at end of file
+
+    def __init__(
+        self,
+        fraction: float = KELLY_FRACTION,
+        max_stake: float = KELLY_MAX_STAKE,
+        max_exposure: float = KELLY_MAX_EXPOSURE,
+        scenarios: int = KELLY_SCENARIOS,
+        seed: Optional[int] = KELLY_SEED,
+        max_iter: int = 200,
+        tolerance: float = 1e-9
+    ):
+        self.fraction = fraction
+        self.max_stake = max_stake
+        self.max_exposure = max_exposure
+        self.scenarios = scenarios
+        self.max_iter = max_iter
+        self.tolerance = tolerance
+        self.iterations = 0
+        self.rng = np.random.default_rng(seed)
+
+    def sample_outcomes(self, probabilities: np.ndarray) -> np.ndarray:
+        """
+        Draw joint results for independent matches from their (matches, outcomes)
+        probabilities. Returns: (scenarios, matches) array of outcome indices
+        """
+        cumulative = np.cumsum(np.nan_to_num(probabilities), axis=1)
+        cumulative /= cumulative[:, -1:]
+        draws = self.rng.random((self.scenarios, len(probabilities)))
+        outcomes = np.zeros(draws.shape, dtype=np.int8)
+        for bound in cumulative[:, :-1].T:
+            outcomes += draws > bound
+        return outcomes
+
+    @staticmethod
+    def project(stakes: np.ndarray, cap: float, total: float, scale: np.ndarray) -> np.ndarray:
+        """
+        Projection onto {0 <= f <= cap, sum(f) <= total} in the metric weighted
+        by 1 / scale: f = clip(stakes - tau * scale, 0, cap) for the smallest tau >= 0
+        that satisfies the total.
+        """
+        clipped = np.clip(stakes, 0.0, cap)
+        if clipped.sum() <= total:
+            return clipped
+        low, high = 0.0, float((stakes / scale).max())
+        for _ in range(50):
+            tau = (low + high) / 2
+            if np.clip(stakes - tau * scale, 0.0, cap).sum() > total:
+                low = tau
+            else:
+                high = tau
+        return np.clip(stakes - high * scale, 0.0, cap)
+
+    def optimize(self, returns: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Full-Kelly stakes for a (scenarios, bets) matrix of net returns per unit
+        staked (odds - 1 on a win, -1 on a loss), within the caps scaled up by
+        1 / fraction so the fractional stakes respect them.
+        Returns: {stakes, growth} with growth the expected log growth at those stakes
+        """
+        cap = min(1.0, self.max_stake / self.fraction)
+        # Stakes summing below 1 keep wealth positive in every scenario
+        total = min(0.99, self.max_exposure / self.fraction)
+
+        # Steps are scaled by the inverse curvature at zero stakes (long odds
+        # move the growth far more per unit staked), which also makes the
+        # first step the independent single-bet Kelly stakes
+        scale = 1 / np.maximum((returns ** 2).mean(axis=0), 1e-12)
+        stakes = self.project(np.maximum(returns.mean(axis=0) * scale, 0.0), cap, total, scale)
+        wealth = 1 + returns @ stakes
+        value = float(np.log(wealth).mean())
+        step = 1.0
+
+        for self.iterations in range(1, self.max_iter + 1):
+            gradient = (1 / wealth) @ returns / len(returns)
+            while True:
+                candidate = self.project(stakes + step * scale * gradient, cap, total, scale)
+                candidate_wealth = 1 + returns @ candidate
+                candidate_value = float(np.log(candidate_wealth).mean())
+                # Armijo condition for the scaled projected step
+                if candidate_value >= value + 1e-4 * float(gradient @ (candidate - stakes)) or step < 1e-8:
+                    break
+                step /= 2
+            improvement = candidate_value - value
+            if improvement <= 0:
+                break
+            stakes, wealth, value = candidate, candidate_wealth, candidate_value
+            step *= 2
+            if improvement < self.tolerance:
+                break
+
+        return {'stakes': stakes, 'growth': value}
+
+def calculate_parlay_stakes(
+    matches: Union[OddsFrame, List[ProcessedMatch]],
+    bankroll: float = 1000.0,
+    min_edge: float = KELLY_MIN_EDGE,
+    fraction: float = KELLY_FRACTION,
+    max_stake: float = KELLY_MAX_STAKE,
+    max_exposure: float = KELLY_MAX_EXPOSURE,
+    seed: Optional[int] = KELLY_SEED
+) -> Dict[str, List[Dict]]:
+    """
+    Fractional Kelly stakes for every best price beating the fair probability
+    by at least min_edge, sized together as one portfolio across matches.
+    Returns: {recommended_parlays: [...], portfolio: {...}}
+    """
+    frame = ensure_frame(matches)
+    if not frame.n_matches:
+        return {'status': 'no_valuable_parlays'}
+
+    best = frame.best_prices
+    fair = fair_probabilities(frame)
+    with np.errstate(invalid='ignore'):
+        edge = fair * best - 1
+    rows, outcomes = np.nonzero(edge >= min_edge)
+    if not rows.size:
+        return {'status': 'no_valuable_parlays'}
+
+    # Scenarios only for the matches that carry a candidate bet
+    match_rows, bet_match = np.unique(rows, return_inverse=True)
+    optimizer = KellyOptimizer(fraction=fraction, max_stake=max_stake, max_exposure=max_exposure, seed=seed)
+    results = optimizer.sample_outcomes(fair[match_rows])
+    odds = best[rows, outcomes]
+    returns = np.where(results[:, bet_match] == outcomes, odds - 1, -1.0)
+
+    solved = optimizer.optimize(returns)
+    stakes = solved['stakes'] * fraction
+    keep = np.flatnonzero(stakes * bankroll >= 0.01)
+    if not keep.size:
+        return {'status': 'no_valuable_parlays'}
+    keep = keep[np.argsort(-stakes[keep], kind='stable')]
+    columns = frame.best_columns
+
+    parlays = [
+        {
+            'match_id': frame.match_ids[row],
+            'home_team': frame.home_teams[row],
+            'away_team': frame.away_teams[row],
+            'market': OUTCOMES[k].upper(),
+            'team': frame.team(row, k),
+            'bookmaker': frame.bookmakers[columns[row, k]],
+            'odds': float(best[row, k]),
+            'fair_probability': round(float(fair[row, k]), 4),
+            'recommended_stake': round(float(stakes[i]) * bankroll, 2),
+            'recommended_stake_pct': round(float(stakes[i]) * 100, 2),
+            'edge_percentage': round(float(edge[row, k]) * 100, 2)
+        }
+        for i, row, k in ((i, int(rows[i]), int(outcomes[i])) for i in keep.tolist())
+    ]
+    staked = float(stakes.sum())
+    return {
+        'recommended_parlays': parlays,
+        'portfolio': {
+            'bankroll': bankroll,
+            'total_stake': round(staked * bankroll, 2),
+            'exposure_pct': round(staked * 100, 2),
+            'expected_growth_pct': round(float(np.log1p(returns @ stakes).mean()) * 100, 3),
+            'candidates': int(rows.size)
+        }
+    }
@@ -1,59 +1,122 @@
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Optional, Union
 from app.features.data_processing import ProcessedMatch
+from app.features.fair_odds import fair_probabilities
+from app.features.odds_frame import OddsFrame, OUTCOMES, DRAW, ensure_frame
+from config.settings import (
+    MONTE_CARLO_SIMULATIONS,
+    MONTE_CARLO_BATCH,
+    MONTE_CARLO_TOLERANCE,
+    MONTE_CARLO_SEED
+)
 
-def simulate_outcomes(matches: List[ProcessedMatch], simulations: int = 10000) -> Dict[str, List[Dict]]:
+class MonteCarloEngine:
+    """
+    Batched win-probability simulator.
+    Every active (match, market) cell is sampled in one binomial draw per batch
+    from a single Generator; a cell stops sampling once its Wilson confidence
+    interval half-width drops below the tolerance or the sample budget is spent.
+    """
+
+    def __init__(
+        self,
+        simulations: int = MONTE_CARLO_SIMULATIONS,
+        batch_size: int = MONTE_CARLO_BATCH,
+        tolerance: float = MONTE_CARLO_TOLERANCE,
+        seed: Optional[int] = MONTE_CARLO_SEED,
+        z: float = 1.96
+    ):
+        self.simulations = simulations
+        self.batch_size = max(1, min(batch_size, simulations))
+        self.tolerance = tolerance
+        self.z = z
+        self.rng = np.random.default_rng(seed)
+
+    def _interval(self, wins: np.ndarray, samples: np.ndarray):
+        """Wilson score interval for wins out of samples."""
+        n = np.maximum(samples, 1)
+        p = wins / n
+        z2 = self.z ** 2
+        centre = (p + z2 / (2 * n)) / (1 + z2 / n)
+        half = self.z * np.sqrt(p * (1 - p) / n + z2 / (4 * n ** 2)) / (1 + z2 / n)
+        return centre - half, centre + half
+
+    def run(self, probabilities: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Simulate wins for an array of success probabilities (NaN cells are skipped).
+        Returns: {win_rate, ci_low, ci_high, samples} arrays shaped like the input
+        """
+        probabilities = np.asarray(probabilities, dtype=float)
+        wins = np.zeros(probabilities.shape, dtype=np.int64)
+        samples = np.zeros(probabilities.shape, dtype=np.int64)
+        active = ~np.isnan(probabilities)
+        p = np.clip(np.nan_to_num(probabilities), 0.0, 1.0)
+
+        while active.any():
+            batch = min(self.batch_size, self.simulations - int(samples[active].min()))
+            wins[active] += self.rng.binomial(batch, p[active])
+            samples[active] += batch
+
+            low, high = self._interval(wins, samples)
+            converged = (high - low) / 2 < self.tolerance
+            active &= ~converged & (samples < self.simulations)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            win_rate = np.where(samples > 0, wins / samples, np.nan)
+        low, high = self._interval(wins, samples)
+        return {'win_rate': win_rate, 'ci_low': low, 'ci_high': high, 'samples': samples}
+
+def simulate_outcomes(
+    matches: Union[OddsFrame, List[ProcessedMatch]],
+    simulations: int = MONTE_CARLO_SIMULATIONS,
+    seed: Optional[int] = MONTE_CARLO_SEED,
+    tolerance: float = MONTE_CARLO_TOLERANCE
+) -> Dict[str, List[Dict]]:
     """
     Enhanced Monte Carlo simulation with market selection
     Returns: {simulation_results: [...]}
     """
+    frame = ensure_frame(matches)
     results = []
-    
-    for match in matches:
-        try:
-            best_market = None
-            max_value = -1
-            
-            # Analyze all three markets
-            for market in ['home', 'away', 'draw']:
-                odds_key = f'{market}_odds'
-                if not match.get(odds_key):
-                    continue
-                
-                # Use median odds for simulation
-                median_odds = np.median(match[odds_key])
-                if median_odds < 1.1:  # Skip invalid odds
-                    continue
-                
-                implied_prob = 1 / median_odds
-                outcomes = np.random.binomial(1, implied_prob, simulations)
-                win_rate = outcomes.mean()
-                
-                # Calculate value score
-                value_score = win_rate * median_odds
-                edge = value_score - 1
-                
-                if edge > max_value:
-                    max_value = edge
-                    kelly_stake = (edge / (median_odds - 1)) * 100 if edge > 0 else 0
-                    best_market = {
-                        'market': market.upper(),
-                        'team': match[f'{market}_team'] if market != 'draw' else 'Draw',
-                        'win_probability': round(win_rate, 2),
-                        'odds': round(median_odds, 2),
-                        'value_rating': 'good' if value_score > 1.05 else 'fair' if value_score > 1 else 'poor',
-                        'recommended_stake_pct': round(kelly_stake, 1)
-                    }
-
-            if best_market and best_market['value_rating'] != 'poor':
-                results.append({
-                    'match_id': match['match_id'],
-                    'home_team': match['home_team'],
-                    'away_team': match['away_team'],
-                    **best_market
-                })
-                
-        except Exception as e:
+    if not frame.n_matches:
+        return {'error': 'no_valuable_markets'}
+
+    # Simulate the margin-free consensus probabilities and price them at the
+    # best available odds, skipping invalid or missing odds
+    best_odds = frame.best_prices
+    with np.errstate(invalid='ignore'):
+        fair_prob = np.where(best_odds >= 1.1, fair_probabilities(frame), np.nan)
+
+    engine = MonteCarloEngine(simulations=simulations, tolerance=tolerance, seed=seed)
+    simulated = engine.run(fair_prob)
+
+    # Calculate value score
+    value_score = simulated['win_rate'] * best_odds
+    edge = np.where(np.isnan(value_score), -np.inf, value_score - 1)
+
+    for row in range(frame.n_matches):
+        market = int(np.argmax(edge[row]))
+        if edge[row, market] <= 0:  # 'poor' value
             continue
-            
-    return {'simulation_results': results} if results else {'error': 'no_valuable_markets'}
\ No newline at end of file
+
+        odds = best_odds[row, market]
+        kelly_stake = (edge[row, market] / (odds - 1)) * 100
+        results.append({
+            'match_id': frame.match_ids[row],
+            'home_team': frame.home_teams[row],
+            'away_team': frame.away_teams[row],
+            'market': OUTCOMES[market].upper(),
+            'team': frame.team(row, market) if market != DRAW else 'Draw',
+            'win_probability': float(round(simulated['win_rate'][row, market], 2)),
+            'confidence_interval': (
+                float(round(simulated['ci_low'][row, market], 3)),
+                float(round(simulated['ci_high'][row, market], 3))
+            ),
+            'samples': int(simulated['samples'][row, market]),
+            'odds': float(round(odds, 2)),
+            'bookmaker': frame.bookmakers[frame.best_columns[row, market]],
+            'value_rating': 'good' if value_score[row, market] > 1.05 else 'fair',
+            'recommended_stake_pct': float(round(kelly_stake, 1))
+        })
+
+    return {'simulation_results': results} if results else {'error': 'no_valuable_markets'}
@@ -1,31 +1,82 @@
-from typing import List, Dict
+import numpy as np
+from typing import List, Dict, Union
 from app.features.data_processing import ProcessedMatch
+from app.features.fair_odds import fair_probabilities
+from app.features.odds_frame import OddsFrame, OUTCOMES, HOME, AWAY, ensure_frame
 
-def odds_comparison_model(matches: List[ProcessedMatch]) -> Dict[str, List[Dict]]:
+def odds_comparison_model(matches: Union[OddsFrame, List[ProcessedMatch]]) -> Dict[str, List[Dict]]:
+    frame = ensure_frame(matches)
     value_bets = []
-    
-    for match in matches:
-        try:
-            best_home = max((odds for odds in match['home_odds'] if odds is not None), default=None)
-            best_away = max((odds for odds in match['away_odds'] if odds is not None), default=None)
-            
-            # Find bookmakers offering best odds
-            home_bookmakers = [bm for bm, odds in match['bookmakers'].items() 
-                             if odds['home'] == best_home]
-            away_bookmakers = [bm for bm, odds in match['bookmakers'].items() 
-                             if odds['away'] == best_away]
-            
-            value_bets.append({
-                'match_id': match['match_id'],
-                'home_team': match['home_team'],
-                'away_team': match['away_team'],
-                'best_home_odds': best_home,
-                'best_away_odds': best_away,
-                'home_bookmaker': home_bookmakers[0] if home_bookmakers else 'N/A',
-                'away_bookmaker': away_bookmakers[0] if away_bookmakers else 'N/A',
-                'value_rating': 'home' if best_home > best_away else 'away'
+
+    # Best prices and the first bookmaker offering each of them
+    best = frame.best_prices
+    columns = frame.best_columns
+
+    # Expected return of every best price against the margin-free consensus
+    with np.errstate(invalid='ignore'):
+        edge = best * fair_probabilities(frame) - 1
+    picks = np.argmax(np.where(np.isnan(edge), -np.inf, edge), axis=1)
+
+    for row in range(frame.n_matches):
+        best_home = float(best[row, HOME])
+        best_away = float(best[row, AWAY])
+        pick = int(picks[row])
+        pick_edge = float(edge[row, pick])
+        entry = {
+            'match_id': frame.match_ids[row],
+            'home_team': frame.home_teams[row],
+            'away_team': frame.away_teams[row],
+            'best_home_odds': best_home,
+            'best_away_odds': best_away,
+            'home_bookmaker': frame.bookmakers[columns[row, HOME]],
+            'away_bookmaker': frame.bookmakers[columns[row, AWAY]],
+            'value_rating': 'home' if best_home > best_away else 'away'
+        }
+        if not np.isnan(pick_edge):
+            entry.update({
+                'recommended_market': f"{OUTCOMES[pick].upper()} ({frame.team(row, pick)})",
+                'best_odds': float(best[row, pick]),
+                'bookmaker': frame.bookmakers[columns[row, pick]],
+                'edge_percentage': round(pick_edge * 100, 2),
+                'value_rating': 'good' if pick_edge >= 0.02 else 'fair' if pick_edge > 0 else 'poor'
             })
-        except Exception as e:
-            continue
-            
-    return {'value_bets': value_bets}
\ No newline at end of file
+        value_bets.append(entry)
+
+    return {'value_bets': value_bets}
+
+def scan_value(frame: OddsFrame, min_edge: float = 0.02) -> List[Dict]:
+    """
+    Best prices that beat the margin-free consensus by at least min_edge, in
+    one pass over the price tensor.
+    Returns: one entry per match outcome, ranked by expected return
+    """
+    if not frame.n_matches:
+        return []
+
+    best = frame.best_prices
+    fair = fair_probabilities(frame)
+    with np.errstate(invalid='ignore'):
+        edge = best * fair - 1
+    rows, outcomes = np.nonzero(edge >= min_edge)
+    if not rows.size:
+        return []
+    order = np.argsort(-edge[rows, outcomes], kind='stable')
+    columns = frame.best_columns
+
+    return [
+        {
+            'match_id': frame.match_ids[row],
+            'league': frame.leagues[row],
+            'home_team': frame.home_teams[row],
+            'away_team': frame.away_teams[row],
+            'commence_time': frame.commence_times[row],
+            'market': OUTCOMES[k].upper(),
+            'team': frame.team(row, k),
+            'odds': float(best[row, k]),
+            'bookmaker': frame.bookmakers[columns[row, k]],
+            'fair_probability': float(fair[row, k]),
+            'fair_odds': float(1 / fair[row, k]),
+            'edge_percentage': round(float(edge[row, k]) * 100, 2)
+        }
+        for row, k in zip(rows[order].tolist(), outcomes[order].tolist())
+    ]
@@ -2,12 +2,24 @@ import asyncio
 import logging
 import hashlib
 import numpy as np
-from typing import List, Dict, Union, Any
-from app.features.odds_fetcher import fetch_odds_for_league
+from typing import List, Dict, Union, Any, Optional
+from app.features.odds_fetcher import fetch_odds_frame
+from app.features.odds_cache import odds_cache
+from app.features.incremental import incremental_preprocessor
+from app.features.odds_frame import OddsFrame
+from app.features.executor import algorithm_executor
+from app.features.fair_odds import fair_odds_engine
+from data.odds_history import get_history_store
+from config.settings import ODDS_HISTORY_ENABLED
+from utils.metrics import errors, stage_seconds
 
 logger = logging.getLogger('OddsBot')
 
+# Algorithm key that runs every algorithm on one fetch
+ALL_ALGORITHMS = 'all'
+
 # Define the ProcessedMatch type with bookmaker data
+# (legacy layout; the pipeline itself works on columnar OddsFrame snapshots)
 ProcessedMatch = Dict[str, Union[str, List[float], Dict[str, Dict[str, float]]]]
 
 def preprocess_odds(raw_odds: List[Dict]) -> List[ProcessedMatch]:
@@ -83,34 +95,97 @@ def preprocess_odds(raw_odds: List[Dict]) -> List[ProcessedMatch]:
     logger.info(f"Preprocessed {len(processed)} valid matches")
     return processed
 
+async def load_odds_frame(
+    api_key: str,
+    base_url: str,
+    league_key: str,
+    regions: str = "eu",
+    markets: str = "h2h"
+) -> Optional[OddsFrame]:
+    """
+    Fetch a league, decoding the response straight into its OddsFrame while it
+    streams in, and append the frame to the odds history.
+    Only bookmakers whose quotes changed since the previous fetch are
+    re-projected; when nothing changed the previous frame is returned as is.
+    Returns None when the API returned nothing.
+    """
+    update = incremental_preprocessor.begin(odds_cache.make_key(league_key, regions, markets), league_key)
+    # Decoding overlaps the download, so 'fetch' covers both
+    with stage_seconds.time('fetch', league_key, ''):
+        frame = await fetch_odds_frame(api_key, base_url, league_key, regions, markets, builder=update)
+    if frame is None:
+        return None
+    logger.info(
+        f"Built odds frame {frame.n_matches}x{frame.n_bookmakers} for {league_key} "
+        f"(changes {update.changes.summary()}, {update.reused} quotes reused)"
+    )
+
+    if ODDS_HISTORY_ENABLED:
+        try:
+            with stage_seconds.time('history_write', league_key, ''):
+                await asyncio.to_thread(get_history_store().record_snapshot, frame)
+        except Exception as e:
+            errors.inc('history_write')
+            logger.error(f"Odds history write failed: {str(e)}")
+    return frame
+
+async def run_all_algorithms(frame: OddsFrame, algorithm_map: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run every algorithm concurrently on one frame and merge their sections.
+    Per-algorithm errors and empty statuses are dropped from the merged result.
+    """
+    # Warm shared derived arrays once so concurrent runs don't each compute them
+    frame.best_prices
+    frame.best_columns
+    await fair_odds_engine.prepare(frame)
+
+    names = list(algorithm_map)
+    outcomes = await asyncio.gather(
+        *(algorithm_executor.run(algorithm_map[name], frame) for name in names),
+        return_exceptions=True
+    )
+
+    merged: Dict[str, Any] = {}
+    for name, result in zip(names, outcomes):
+        if isinstance(result, BaseException):
+            logger.error(f"Algorithm {name} failed in combined run: {result!r}")
+            continue
+        merged.update({k: v for k, v in (result or {}).items() if k not in ('error', 'status')})
+
+    return merged or {"status": "no_opportunities"}
+
 async def process_pipeline(
     api_key: str,
     base_url: str,
     league_key: str,
     algorithm: str,
-    paid_user: bool
+    paid_user: bool,
+    regions: str = "eu",
+    markets: str = "h2h"
 ) -> Dict[str, Any]:
     """
     Robust processing pipeline with error handling and algorithm execution.
     Returns results from the selected algorithm or an error message.
     """
     try:
-        # Fetch raw data from the API
-        raw_data = await fetch_odds_for_league(api_key, base_url, league_key)
+        # Fetch and build the odds frame, served from the shared cache when fresh
+        cache_key = odds_cache.make_key(league_key, regions, markets)
+        with stage_seconds.time('odds', league_key, algorithm):
+            frame = await odds_cache.get_or_fetch(
+                cache_key,
+                lambda: load_odds_frame(api_key, base_url, league_key, regions, markets)
+            )
         
-        if not raw_data:
+        if frame is None:
             return {"error": "No data fetched from API"}
         
-        # Preprocess the raw data
-        processed_matches = preprocess_odds(raw_data)
-        
-        if not processed_matches:
+        if not frame.n_matches:
             return {"error": "No valid matches after preprocessing"}
         
         # Check user payment status
         if not paid_user:
             from app.features.algorithms.demo import demo_analysis
-            return demo_analysis(processed_matches)
+            return demo_analysis(frame)
         
         # Import algorithms only for paid users
         from app.features.algorithms import (
@@ -132,6 +207,11 @@ async def process_pipeline(
             'value': odds_comparison_model
         }
         
+        # Combined mode: every algorithm on the same snapshot
+        if algorithm == ALL_ALGORITHMS:
+            with stage_seconds.time('algorithm', league_key, algorithm):
+                return await run_all_algorithms(frame, algorithm_map)
+
         # Validate the selected algorithm
         if algorithm not in algorithm_map:
             return {"error": f"Invalid algorithm: {algorithm}"}
@@ -139,14 +219,18 @@ async def process_pipeline(
         # Get the processor function
         processor = algorithm_map[algorithm]
         
-        # Execute the algorithm
-        if asyncio.iscoroutinefunction(processor):
-            results = await processor(processed_matches)
-        else:
-            results = processor(processed_matches)
+        # Execute the algorithm off the event loop
+        with stage_seconds.time('algorithm', league_key, algorithm):
+            results = await algorithm_executor.run(processor, frame)
             
         return results or {"status": "no_opportunities"}
         
+    except asyncio.TimeoutError:
+        errors.inc('algorithm_timeout')
+        logger.error(f"Algorithm {algorithm} timed out for {league_key}")
+        return {"error": "Analysis timed out"}
+
     except Exception as e:
+        errors.inc('pipeline')
         logger.error(f"Pipeline failure: {str(e)}", exc_info=True)
         return {"error": str(e)}
\ No newline at end of file
@@ -0,0 +1,72 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from config.settings import ALGORITHM_EXECUTOR, ALGORITHM_WORKERS, ALGORITHM_TIMEOUT
+
+logger = logging.getLogger('OddsBot')
+
+class AlgorithmExecutor:
+    """
+    Runs algorithm functions off the event loop.
+    Modes: 'inline' (on the loop), 'thread' (thread pool) or 'process' (process pool).
+    Each run is bounded by a timeout; cancelling the awaiting task abandons the run.
+    """
+    MODES = ('inline', 'thread', 'process')
+
+    def __init__(
+        self,
+        mode: str = ALGORITHM_EXECUTOR,
+        max_workers: int = ALGORITHM_WORKERS,
+        timeout: Optional[float] = ALGORITHM_TIMEOUT
+    ):
+        if mode not in self.MODES:
+            raise ValueError(f"Invalid executor mode: {mode}")
+        self.mode = mode
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._pool: Optional[Executor] = None
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.mode == 'process':
+                # Spawned, not forked: workers must not inherit the parent's open
+                # SQLite connections or locks held at fork time
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='algorithm'
+                )
+            logger.info(f"Algorithm executor started ({self.mode}, workers={self.max_workers})")
+        return self._pool
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Execute func(*args, **kwargs) with the configured backend.
+        Raises asyncio.TimeoutError when the run exceeds the timeout.
+        """
+        if asyncio.iscoroutinefunction(func):
+            return await asyncio.wait_for(func(*args, **kwargs), self.timeout)
+        if self.mode == 'inline':
+            return func(*args, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._get_pool(), functools.partial(func, *args, **kwargs))
+        # A queued run is dropped on cancel/timeout; one already executing runs to
+        # completion in its worker but its result is discarded
+        return await asyncio.wait_for(future, self.timeout)
+
+    def shutdown(self) -> None:
+        """Stop the worker pool, dropping queued runs."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+# Shared executor used by the processing pipeline
+algorithm_executor = AlgorithmExecutor()
@@ -0,0 +1,186 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Optional
+from app.features.executor import algorithm_executor
+from app.features.odds_frame import OddsFrame
+from config.settings import FAIR_ODDS_METHOD
+from utils.metrics import registry
+
+METHODS = ('multiplicative', 'power', 'shin')
+
+@dataclass
+class FairOdds:
+    """
+    Margin-free probabilities of one snapshot.
+    probabilities is (matches x bookmakers x outcomes), NaN wherever a
+    bookmaker does not quote every outcome of the match; margins is the
+    bookmaker overround (sum of implied probabilities - 1) per match and
+    bookmaker; consensus is the renormalised median across bookmakers,
+    NaN for outcomes the match has no price for.
+    """
+    method: str
+    probabilities: np.ndarray
+    margins: np.ndarray
+    consensus: np.ndarray
+
+    @property
+    def fair_prices(self) -> np.ndarray:
+        """Consensus fair decimal odds, shape (matches, outcomes)."""
+        with np.errstate(divide='ignore'):
+            return 1 / self.consensus
+
+def _multiplicative(implied: np.ndarray, total: np.ndarray) -> np.ndarray:
+    return implied / total[:, None]
+
+def _power(implied: np.ndarray, total: np.ndarray, iterations: int = 50) -> np.ndarray:
+    """p = implied ** k with k solving sum(p) = 1 (Newton from k = 1)."""
+    log_implied = np.log(implied)
+    k = np.ones(len(implied))
+    for _ in range(iterations):
+        powered = implied ** k[:, None]
+        step = (np.nansum(powered, axis=1) - 1) / np.nansum(powered * log_implied, axis=1)
+        k = np.maximum(k - step, 1e-3)
+        if not np.nanmax(np.abs(step), initial=0.0) > 1e-12:
+            break
+    return implied ** k[:, None]
+
+def _shin(implied: np.ndarray, total: np.ndarray, iterations: int = 50) -> np.ndarray:
+    """
+    Shin's model: p = (sqrt(z^2 + 4 (1 - z) implied^2 / total) - z) / (2 (1 - z)),
+    with the insider share z solving sum(p) = 1. The sum falls as z grows, so
+    Newton steps are kept inside a shrinking [low, high] bracket and replaced
+    by bisection whenever they would leave it.
+    """
+    squared = 4 * implied ** 2 / total[:, None]
+    z = np.zeros(len(implied))
+    low = np.zeros(len(implied))
+    high = np.full(len(implied), 0.99)
+    for _ in range(iterations):
+        zc = z[:, None]
+        root = np.sqrt(zc ** 2 + (1 - zc) * squared)
+        excess = np.nansum((root - zc) / (2 * (1 - zc)), axis=1) - 1
+        slope = np.nansum(
+            (((zc - squared / 2) / root - 1) * (1 - zc) + root - zc) / (2 * (1 - zc) ** 2), axis=1
+        )
+        above = excess > 0
+        low = np.where(above, z, low)
+        high = np.where(above, high, z)
+        newton = z - excess / slope
+        step = np.where((newton >= low) & (newton <= high), newton, (low + high) / 2) - z
+        z = z + step
+        if not np.nanmax(np.abs(step), initial=0.0) > 1e-12:
+            break
+    zc = z[:, None]
+    return (np.sqrt(zc ** 2 + (1 - zc) * squared) - zc) / (2 * (1 - zc))
+
+_SOLVERS = {'multiplicative': _multiplicative, 'power': _power, 'shin': _shin}
+
+def devig(implied: np.ndarray, method: str = FAIR_ODDS_METHOD) -> np.ndarray:
+    """
+    Remove the margin from rows of implied probabilities (NaN for outcomes
+    outside the market). Rows without a margin, or where the method fails to
+    produce finite values, fall back to plain normalisation.
+    Returns: fair probabilities shaped like implied, each row summing to 1
+    """
+    if method not in _SOLVERS:
+        raise ValueError(f"Unknown fair odds method: {method}")
+    implied = np.asarray(implied, dtype=float)
+    total = np.nansum(implied, axis=1)
+    fair = _multiplicative(implied, total)
+    margin = total > 1
+    if method != 'multiplicative' and margin.any():
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            solved = _SOLVERS[method](implied[margin], total[margin])
+        solved_ok = np.isfinite(np.where(np.isnan(implied[margin]), 0.0, solved)).all(axis=1)
+        rows = np.flatnonzero(margin)[solved_ok]
+        fair[rows] = solved[solved_ok] / np.nansum(solved[solved_ok], axis=1, keepdims=True)
+    return fair
+
+def _median(values: np.ndarray) -> np.ndarray:
+    """NaN-ignoring median over axis 1 without nanmedian's all-NaN warnings."""
+    ordered = np.sort(values, axis=1)
+    counts = (~np.isnan(values)).sum(axis=1, keepdims=True)
+    low = np.take_along_axis(ordered, np.maximum(counts - 1, 0) // 2, axis=1)
+    high = np.take_along_axis(ordered, counts // 2, axis=1)
+    return np.where(counts > 0, (low + high) / 2, np.nan)[:, 0]
+
+def compute_fair_odds(frame: OddsFrame, method: str = FAIR_ODDS_METHOD) -> FairOdds:
+    """
+    De-vig every bookmaker of every match in one vectorised pass.
+    A match's market is the set of outcomes any bookmaker prices; only
+    bookmakers pricing all of it (and at least two outcomes) are de-vigged.
+    Matches without such a bookmaker get their consensus from the median
+    price of each outcome instead.
+    """
+    n_matches, n_bookmakers, n_outcomes = frame.prices.shape
+    market = frame.valid.any(axis=1)
+    complete = (frame.valid | ~market[:, None, :]).all(axis=2) & (market.sum(axis=1) >= 2)[:, None]
+
+    probabilities = np.full((n_matches, n_bookmakers, n_outcomes), np.nan)
+    margins = np.full((n_matches, n_bookmakers), np.nan)
+    rows = frame.prices[complete]
+    if len(rows):
+        implied = 1 / rows
+        probabilities[complete] = devig(implied, method)
+        margins[complete] = np.nansum(implied, axis=1) - 1
+
+    consensus = _median(probabilities)
+    uncovered = ~complete.any(axis=1) & (market.sum(axis=1) >= 2)
+    if uncovered.any():
+        consensus[uncovered] = devig(1 / _median(frame.prices[uncovered]), method)
+    with np.errstate(invalid='ignore'):
+        consensus /= np.nansum(consensus, axis=1, keepdims=True)
+    return FairOdds(method=method, probabilities=probabilities, margins=margins, consensus=consensus)
+
+class FairOddsEngine:
+    """
+    Computes fair odds once per snapshot and method. Results live in the
+    frame's derived cache, so they are shared by every algorithm analysing
+    that frame and dropped together with it.
+    """
+
+    def __init__(self, method: str = FAIR_ODDS_METHOD):
+        self.method = method
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, frame: OddsFrame, method: Optional[str] = None) -> FairOdds:
+        method = method or self.method
+        key = ('fair_odds', method)
+        cached = frame.derived.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        return frame.derived.setdefault(key, compute_fair_odds(frame, method))
+
+    async def prepare(self, frame: OddsFrame, method: Optional[str] = None) -> FairOdds:
+        """
+        Like get(), but a miss is computed on the algorithm executor. Awaited
+        before algorithms run concurrently on a frame, so they all read one
+        cached result instead of each de-vigging it.
+        """
+        method = method or self.method
+        key = ('fair_odds', method)
+        cached = frame.derived.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        fair = await algorithm_executor.run(compute_fair_odds, frame, method)
+        return frame.derived.setdefault(key, fair)
+
+# Shared engine used by every algorithm
+fair_odds_engine = FairOddsEngine()
+
+def fair_probabilities(frame: OddsFrame, method: Optional[str] = None) -> np.ndarray:
+    """Consensus fair probabilities of a frame, shape (matches, outcomes)."""
+    return fair_odds_engine.get(frame, method).consensus
+
+registry.callback(
+    'betsage_fair_odds_total',
+    'Fair odds lookups by outcome (a miss de-vigs a whole snapshot)',
+    'counter',
+    lambda: {('hit',): fair_odds_engine.hits, ('miss',): fair_odds_engine.misses},
+    ('outcome',)
+)
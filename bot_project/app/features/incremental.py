@@ -0,0 +1,305 @@
+import logging
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+from app.features.odds_frame import (
+    MIN_PRICES_PER_OUTCOME, OUTCOMES, OddsFrame, OddsFrameBuilder, allocate_prices, h2h_quotes, make_match_id
+)
+from utils.metrics import registry
+
+logger = logging.getLogger('OddsBot')
+
+# (home team, away team, commence time)
+MatchKey = Tuple[str, str, str]
+# Bookmaker h2h last_update, or the quoted prices when the feed has no stamp
+Signature = Any
+Quotes = List[Tuple[int, float]]
+
+@dataclass
+class ChangeSet:
+    """
+    What changed in one snapshot of a feed compared to the previous one.
+    updated maps a match id to the bookmakers whose quotes changed, appeared
+    or disappeared. version only moves when something changed.
+    """
+    key: Hashable
+    version: int
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    updated: Dict[str, List[str]] = field(default_factory=dict)
+    full: bool = False
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.updated)
+
+    @property
+    def changed_matches(self) -> Set[str]:
+        """Match ids whose prices must be recomputed (removed ones excluded)."""
+        return set(self.added) | set(self.updated)
+
+    def summary(self) -> str:
+        return f"+{len(self.added)} -{len(self.removed)} ~{len(self.updated)}"
+
+class _MatchState:
+    __slots__ = ('match_id', 'quotes')
+
+    def __init__(self, match_id: str, quotes: Dict[str, Tuple[Signature, Quotes]]):
+        self.match_id = match_id
+        self.quotes = quotes
+
+class _FeedState:
+    __slots__ = ('matches', 'order', 'frame', 'version')
+
+    def __init__(self):
+        self.matches: Dict[MatchKey, _MatchState] = {}
+        self.order: List[str] = []
+        self.frame: Optional[OddsFrame] = None
+        self.version = 0
+
+class IncrementalBuild:
+    """
+    One pass over a new snapshot, fed event by event like OddsFrameBuilder.
+    Bookmakers whose signature is unchanged reuse their previously projected
+    quotes and known matches reuse their id; the frame is only rebuilt when
+    something changed. build() commits the pass to its IncrementalPreprocessor.
+    """
+
+    def __init__(self, owner: 'IncrementalPreprocessor', key: Hashable, league: str, previous: _FeedState):
+        self.owner = owner
+        self.key = key
+        self.league = league
+        self.previous = previous
+        # (match key, previous state or None, quotes, bookmakers that changed)
+        self._pending: List[Tuple[MatchKey, Optional[_MatchState], Dict[str, Tuple[Signature, Quotes]], List[str]]] = []
+        self._dirty = False
+        self.quotes = 0
+        self.reprojected = 0
+        self.changes: Optional[ChangeSet] = None
+
+    @property
+    def reused(self) -> int:
+        return self.quotes - self.reprojected
+
+    def add_match(self, match: Dict[str, Any]) -> None:
+        """Queue one raw API match; acceptance is decided in build()."""
+        home_team = match.get('home_team', 'Unknown')
+        away_team = match.get('away_team', 'Unknown')
+        match_key = (home_team, away_team, match.get('commence_time', ''))
+        before = self.previous.matches.get(match_key)
+        old_quotes = before.quotes if before is not None else {}
+
+        quotes = {}
+        changed = []
+        for bookmaker in match.get('bookmakers', []):
+            key = bookmaker.get('key', 'unknown')
+            old = old_quotes.get(key)
+            if old is not None:
+                stamp = _stamp(bookmaker)
+                if stamp is not None and stamp == old[0]:
+                    quotes[key] = old
+                    continue
+            stamp, prices = h2h_quotes(bookmaker, home_team, away_team)
+            signature = stamp or tuple(prices)
+            quotes[key] = (signature, prices)
+            self.reprojected += 1
+            if old is None or old[0] != signature:
+                changed.append(key)
+        self.quotes += len(quotes)
+
+        if before is not None and len(quotes) != len(old_quotes):
+            changed.extend(key for key in old_quotes if key not in quotes)
+        if before is None or changed:
+            self._dirty = True
+        self._pending.append((match_key, before, quotes, changed))
+
+    def build(self) -> OddsFrame:
+        """
+        Materialise the snapshot and record it as the feed's latest state.
+        When nothing changed the previous frame object itself is returned, so
+        its derived values and everything cached against it stay valid.
+        """
+        previous = self.previous
+        state = _FeedState()
+        changes = ChangeSet(key=self.key, version=previous.version, full=previous.frame is None)
+        frame = None
+
+        if previous.frame is not None and all(before is not None for _, before, _, _ in self._pending):
+            order = [before.match_id for _, before, _, _ in self._pending]
+            if order == previous.order:
+                if not self._dirty:
+                    # Every match is unchanged: keep the old states and frame as they are
+                    state.matches = {match_key: before for match_key, before, _, _ in self._pending}
+                    frame = previous.frame
+                else:
+                    frame = self._patch(previous.frame, state, changes)
+                if frame is not None:
+                    state.order = order
+
+        if frame is None:
+            state.matches = {}
+            changes.updated = {}
+            builder = OddsFrameBuilder(self.league)
+            for match_key, before, quotes, changed in self._pending:
+                match_id = before.match_id if before is not None else make_match_id(*match_key)
+                accepted = builder.add_quotes(
+                    *match_key,
+                    [(key, prices) for key, (_, prices) in quotes.items()],
+                    match_id=match_id,
+                    last_updates={key: sig for key, (sig, _) in quotes.items() if isinstance(sig, str)}
+                )
+                if not accepted:
+                    continue
+                state.matches[match_key] = _MatchState(match_id, quotes)
+                state.order.append(match_id)
+                if before is None:
+                    changes.added.append(match_id)
+                elif changed:
+                    changes.updated[match_id] = changed
+
+            kept = set(state.order)
+            changes.removed = [match_id for match_id in previous.order if match_id not in kept]
+            # Only rejected newcomers differed: the previous frame still holds
+            if not changes and previous.frame is not None and state.order == previous.order:
+                frame = previous.frame
+            else:
+                frame = builder.build()
+
+        if changes:
+            changes.version += 1
+
+        state.frame = frame
+        state.version = changes.version
+        self.changes = changes
+        self.owner._commit(self, state)
+        return frame
+
+    def _patch(self, base: OddsFrame, state: _FeedState, changes: ChangeSet) -> Optional[OddsFrame]:
+        """
+        Copy of base with only the updated matches rewritten, for snapshots
+        with the same matches in the same order. Returns None when the layout
+        would change (a new bookmaker, a rejected match or an emptied
+        bookmaker column), leaving the full rebuild to the caller.
+        """
+        prices = allocate_prices(base.n_matches, base.n_bookmakers)
+        prices[:] = base.prices
+        last_updates = dict(base.last_updates)
+        row_prices = np.empty((base.n_bookmakers, len(OUTCOMES)))
+
+        for row, (match_key, before, quotes, changed) in enumerate(self._pending):
+            if not changed:
+                state.matches[match_key] = before
+                continue
+            row_prices.fill(np.nan)
+            counts = [0] * len(OUTCOMES)
+            for bookmaker, (_, quoted) in quotes.items():
+                col = base.bookmaker_index.get(bookmaker)
+                if col is None:
+                    return None
+                for outcome, price in quoted:
+                    row_prices[col, outcome] = price
+                    counts[outcome] += 1
+            if min(counts) < MIN_PRICES_PER_OUTCOME:
+                return None
+            prices[row] = row_prices
+            stamps = {key: sig for key, (sig, _) in quotes.items() if isinstance(sig, str)}
+            if stamps:
+                last_updates[before.match_id] = stamps
+            else:
+                last_updates.pop(before.match_id, None)
+            state.matches[match_key] = _MatchState(before.match_id, quotes)
+            changes.updated[before.match_id] = changed
+
+        if np.isnan(prices).all(axis=(0, 2)).any():
+            return None
+        return OddsFrame(
+            prices=prices,
+            match_ids=base.match_ids,
+            home_teams=base.home_teams,
+            away_teams=base.away_teams,
+            commence_times=base.commence_times,
+            leagues=base.leagues,
+            bookmakers=base.bookmakers,
+            bookmaker_index=base.bookmaker_index,
+            last_updates=last_updates
+        )
+
+def _stamp(bookmaker: Dict[str, Any]) -> Optional[str]:
+    """h2h last_update of a raw bookmaker entry, found without projecting its prices."""
+    for market in bookmaker.get('markets', []):
+        if market.get('key') == 'h2h':
+            return market.get('last_update') or bookmaker.get('last_update')
+    return None
+
+class IncrementalPreprocessor:
+    """
+    Keeps the last processed state of every feed (one per odds cache key) and
+    turns each new snapshot into an OddsFrame plus the ChangeSet against the
+    previous one. Listeners are called with every non-empty ChangeSet.
+    A bookmaker is considered unchanged while its h2h last_update is; the API
+    stamps to the second, so feeds without stamps fall back to comparing prices.
+    """
+
+    def __init__(self):
+        self._feeds: Dict[Hashable, _FeedState] = {}
+        self._listeners: List[Callable[[ChangeSet, OddsFrame], None]] = []
+        self.snapshots = 0
+        self.unchanged = 0
+        self.reused = 0
+        self.reprojected = 0
+
+    def begin(self, key: Hashable, league: str = '') -> IncrementalBuild:
+        """Start a pass over a new snapshot of the feed stored under key."""
+        return IncrementalBuild(self, key, league, self._feeds.get(key) or _FeedState())
+
+    def add_listener(self, callback: Callable[[ChangeSet, OddsFrame], None]) -> None:
+        """Call callback(changes, frame) whenever a feed snapshot differs from the previous one."""
+        self._listeners.append(callback)
+
+    def _commit(self, build: IncrementalBuild, state: _FeedState) -> None:
+        self._feeds[build.key] = state
+        self.snapshots += 1
+        self.reused += build.reused
+        self.reprojected += build.reprojected
+        if not build.changes:
+            self.unchanged += 1
+            return
+        for callback in self._listeners:
+            try:
+                callback(build.changes, state.frame)
+            except Exception as e:
+                logger.error(f"Change set listener failed: {str(e)}")
+
+    def version(self, key: Hashable) -> int:
+        """Number of changed snapshots seen for a feed."""
+        state = self._feeds.get(key)
+        return state.version if state is not None else 0
+
+    def reset(self, key: Optional[Hashable] = None) -> None:
+        """Forget one feed, or all of them, so the next snapshot is processed in full."""
+        if key is None:
+            self._feeds.clear()
+        else:
+            self._feeds.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'feeds': len(self._feeds),
+            'snapshots': self.snapshots,
+            'unchanged': self.unchanged,
+            'reused': self.reused,
+            'reprojected': self.reprojected
+        }
+
+# Shared instance used when loading odds
+incremental_preprocessor = IncrementalPreprocessor()
+
+registry.callback(
+    'betsage_incremental_quotes_total',
+    'Bookmaker quotes reused or re-projected by incremental preprocessing',
+    'counter',
+    lambda: {
+        ('reused',): incremental_preprocessor.reused,
+        ('reprojected',): incremental_preprocessor.reprojected
+    },
+    ('outcome',)
+)
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+from app.features.data_processing import load_odds_frame
+from app.features.odds_cache import odds_cache
+from app.features.odds_frame import OddsFrame
+from app.features.opportunity_index import ARBITRAGE, VALUE, opportunity_index
+from app.interactions.league_selection import LeagueManager
+from config.settings import (
+    LEAGUE_SCAN_CONCURRENCY,
+    LEAGUE_SCAN_MIN_EDGE,
+    LEAGUE_SCAN_TIMEOUT,
+    LEAGUE_SCAN_TOP
+)
+from utils.metrics import errors, stage_seconds
+
+logger = logging.getLogger('OddsBot')
+
+# Per-league outcome of a scan
+OK, EMPTY, NO_DATA, TIMEOUT, FAILED = 'ok', 'empty', 'no_data', 'timeout', 'failed'
+
+async def _fetch_league(
+    api_key: str,
+    base_url: str,
+    league_key: str,
+    semaphore: asyncio.Semaphore,
+    timeout: float
+) -> Tuple[str, Optional[OddsFrame], str, float]:
+    """
+    Load one league through the shared odds cache, never raising.
+    Returns: (league key, frame or None, status, seconds spent fetching)
+    """
+    api_league_key = LeagueManager.get_api_key(league_key)
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            # The cache shields the fetch, so a timeout here leaves it running
+            # to completion and the next scan picks the league up from the cache
+            frame = await asyncio.wait_for(
+                odds_cache.get_or_fetch(
+                    odds_cache.make_key(api_league_key),
+                    lambda: load_odds_frame(api_key, base_url, api_league_key)
+                ),
+                timeout
+            )
+        except asyncio.TimeoutError:
+            errors.inc('league_scan_timeout')
+            logger.warning(f"League scan: {league_key} timed out after {timeout:.0f}s")
+            return league_key, None, TIMEOUT, time.perf_counter() - started
+        except Exception as e:
+            errors.inc('league_scan')
+            logger.error(f"League scan: {league_key} failed: {str(e)}")
+            return league_key, None, FAILED, time.perf_counter() - started
+
+    seconds = time.perf_counter() - started
+    if frame is None:
+        return league_key, None, NO_DATA, seconds
+    if not frame.n_matches:
+        return league_key, None, EMPTY, seconds
+    return league_key, frame, OK, seconds
+
+async def scan_all_leagues(
+    api_key: str,
+    base_url: str,
+    leagues: Optional[Iterable[str]] = None,
+    concurrency: int = LEAGUE_SCAN_CONCURRENCY,
+    timeout: float = LEAGUE_SCAN_TIMEOUT,
+    top: int = LEAGUE_SCAN_TOP,
+    min_edge: float = LEAGUE_SCAN_MIN_EDGE
+) -> Dict[str, Any]:
+    """
+    Fetch every league concurrently, so total latency tracks the slowest
+    fetch rather than the sum, then rank the loaded leagues' opportunities
+    from the opportunity index, which every processed snapshot keeps current.
+    Slow or failing leagues are skipped after timeout and reported in
+    league_status; the other leagues' results are still returned.
+    Returns: {arbitrage_opportunities, value_opportunities, league_status}
+    ranked across leagues, or {error, league_status} when no league loaded
+    """
+    leagues = [key for key in (leagues or LeagueManager.LEAGUE_DB) if LeagueManager.get_api_key(key)]
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    status: Dict[str, Dict[str, Any]] = {}
+    # API league key -> display name of every league that loaded
+    loaded: Dict[str, str] = {}
+    frames: Dict[Tuple[str, str, str], OddsFrame] = {}
+    started = time.perf_counter()
+
+    tasks = [
+        asyncio.ensure_future(_fetch_league(api_key, base_url, key, semaphore, timeout))
+        for key in leagues
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            league_key, frame, outcome, seconds = await next_done
+            name = LeagueManager.get_display_name(league_key)
+            status[league_key] = {'name': name, 'status': outcome, 'matches': 0, 'seconds': round(seconds, 3)}
+            if frame is None:
+                continue
+            api_league_key = LeagueManager.get_api_key(league_key)
+            frames[odds_cache.make_key(api_league_key)] = frame
+            loaded[api_league_key] = name
+            status[league_key]['matches'] = frame.n_matches
+    finally:
+        # Only reached early on cancellation; shielded cache fetches keep going
+        for task in tasks:
+            task.cancel()
+
+    # Frames reach the index as they are built, scanned on the algorithm
+    # executor; wait for those scans (or index a frame first seen here)
+    await asyncio.gather(*(opportunity_index.sync(feed, frame) for feed, frame in frames.items()))
+
+    if not loaded:
+        logger.info(f"League scan: 0/{len(leagues)} leagues in {time.perf_counter() - started:.2f}s")
+        return {'error': 'No league data available', 'league_status': status}
+
+    arbitrage = [
+        dict(item, league_name=loaded[item['league']])
+        for item in opportunity_index.top(ARBITRAGE, top, leagues=loaded)
+    ]
+    value = [
+        dict(item, league_name=loaded[item['league']])
+        for item in opportunity_index.top(VALUE, top, leagues=loaded, min_score=min_edge * 100)
+    ]
+    elapsed = time.perf_counter() - started
+    stage_seconds.observe(elapsed, 'scan', 'all', '')
+    logger.info(f"League scan: {len(loaded)}/{len(leagues)} leagues in {elapsed:.2f}s, "
+                f"top {len(arbitrage)} arbitrage, {len(value)} value")
+    return {
+        'arbitrage_opportunities': arbitrage,
+        'value_opportunities': value,
+        'league_status': status
+    }
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+from config.settings import ODDS_CACHE_TTL, ODDS_CACHE_MAX_ENTRIES
+from utils.metrics import registry
+
+logger = logging.getLogger('OddsBot')
+
+class OddsCache:
+    """
+    Process-wide TTL cache for upstream odds with single-flight fetching.
+    Concurrent misses for the same key share one in-flight fetch. Every stored
+    value gets a new per-key version, and listeners are told when it changes.
+    """
+
+    def __init__(self, ttl: float = ODDS_CACHE_TTL, max_entries: int = ODDS_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._versions: Dict[Hashable, int] = {}
+        # Last value of keys that expired, so reloading the same object keeps its version
+        self._expired: Dict[Hashable, Any] = {}
+        self._listeners: List[Callable[[Hashable], None]] = []
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.refreshes = 0
+
+    @staticmethod
+    def make_key(league_key: str, regions: str = "eu", markets: str = "h2h") -> Tuple[str, str, str]:
+        """Build the cache key for a league request."""
+        return (league_key, regions, markets)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a fresh cached value or None, dropping it if expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self._expired[key] = value
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def version(self, key: Hashable) -> Optional[int]:
+        """Version of the fresh value stored under key, or None if there is none."""
+        if self.get(key) is None:
+            return None
+        return self._versions.get(key)
+
+    def add_listener(self, callback: Callable[[Hashable], None]) -> None:
+        """Call callback(key) whenever a new value is stored or a key is invalidated."""
+        self._listeners.append(callback)
+
+    def _notify(self, key: Optional[Hashable]) -> None:
+        for callback in self._listeners:
+            try:
+                callback(key)
+            except Exception as e:
+                logger.error(f"Odds cache listener failed: {str(e)}")
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a value, evicting the least recently used entries over capacity.
+        Storing the object already cached under key only extends its lifetime;
+        its version stays and listeners are not called.
+        """
+        previous = self._entries.get(key)
+        previous_value = previous[1] if previous is not None else self._expired.get(key)
+        self._expired.pop(key, None)
+        self._entries[key] = (time.monotonic() + (ttl if ttl is not None else self.ttl), value)
+        self._entries.move_to_end(key)
+        if value is not None and previous_value is value:
+            return
+        self._versions[key] = self._versions.get(key, 0) + 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        self._notify(key)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one key, or everything when no key is given."""
+        if key is None:
+            self._entries.clear()
+            self._expired.clear()
+        else:
+            self._entries.pop(key, None)
+            self._expired.pop(key, None)
+        self._notify(key)
+
+    async def get_or_fetch(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the cached value for key, or run loader once for all concurrent callers.
+        Empty results are returned but not cached so failed fetches are retried.
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = self._start_load(key, loader)
+
+        # Shield so a cancelled caller doesn't abort the fetch other callers wait on
+        return await asyncio.shield(task)
+
+    async def refresh(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None
+    ) -> Any:
+        """
+        Reload key regardless of freshness, joining a fetch already in flight.
+        ttl overrides the default lifetime of the stored value.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            self.refreshes += 1
+            task = self._start_load(key, loader, ttl)
+        return await asyncio.shield(task)
+
+    def _start_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: Optional[float] = None) -> asyncio.Task:
+        task = asyncio.ensure_future(self._load(key, loader, ttl))
+        self._inflight[key] = task
+        return task
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: Optional[float] = None) -> Any:
+        try:
+            value = await loader()
+            if value:
+                self.put(key, value, ttl)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Cache counters for monitoring."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'evictions': self.evictions,
+            'refreshes': self.refreshes,
+            'entries': len(self._entries),
+            'inflight': len(self._inflight)
+        }
+
+# Shared instance used by the processing pipeline
+odds_cache = OddsCache()
+
+registry.callback(
+    'betsage_odds_cache_total',
+    'Odds cache lookups by outcome',
+    'counter',
+    lambda: {(outcome,): odds_cache.stats()[outcome] for outcome in ('hits', 'misses', 'coalesced', 'evictions', 'refreshes')},
+    ('outcome',)
+)
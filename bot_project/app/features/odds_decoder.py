@@ -0,0 +1,117 @@
+import codecs
+import json
+from typing import Any, Iterable, List, Optional
+from app.features.odds_frame import OddsFrame, OddsFrameBuilder
+
+# Bytes read from the response per step
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = ' \t\n\r'
+
+class OddsStreamDecoder:
+    """
+    Incremental decoder for the-odds-api's top-level JSON array of events.
+    Bytes are fed in chunks as they arrive; every event is decoded as soon as
+    its closing brace is in the buffer, projected into an OddsFrameBuilder
+    (h2h prices, teams, commence time, bookmaker keys and timestamps) and
+    dropped. Any builder with add_match() and build() can stand in for
+    OddsFrameBuilder, e.g. an incremental pass. Memory is bounded by one
+    event plus the packed builder arrays, never by the whole payload or its
+    full object tree.
+    """
+
+    def __init__(self, league: str = '', builder: Optional[Any] = None):
+        self.builder = builder if builder is not None else OddsFrameBuilder(league)
+        self.events = 0
+        self._json = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        # Text received since the last decode attempt, joined lazily
+        self._pending: List[str] = []
+        self._pending_size = 0
+        # Buffered characters needed before retrying an incomplete event
+        self._retry_at = 0
+        self._started = False
+        self._finished = False
+
+    def feed(self, chunk: bytes) -> None:
+        """Decode every event completed by this chunk."""
+        text = self._text.decode(chunk)
+        if not text:
+            return
+        self._pending.append(text)
+        self._pending_size += len(text)
+        if len(self._buffer) + self._pending_size >= self._retry_at:
+            self._drain()
+
+    def _drain(self) -> None:
+        if self._pending:
+            self._buffer += ''.join(self._pending)
+            self._pending.clear()
+            self._pending_size = 0
+        buffer = self._buffer
+        size = len(buffer)
+        pos = 0
+        while True:
+            while pos < size and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos == size:
+                break
+            char = buffer[pos]
+            if self._finished:
+                raise ValueError(f"Unexpected data after odds array at {buffer[pos:pos + 20]!r}")
+            if not self._started:
+                if char != '[':
+                    raise ValueError(f"Expected a JSON array of events, got {buffer[pos:pos + 80]!r}")
+                self._started = True
+                pos += 1
+            elif char == ',':
+                pos += 1
+            elif char == ']':
+                self._finished = True
+                pos += 1
+            else:
+                if size - pos < self._retry_at:
+                    break
+                try:
+                    event, end = self._json.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    # Event not complete yet. Retry once the buffered part has
+                    # doubled, so small chunks don't re-parse it over and over
+                    self._retry_at = 2 * (size - pos)
+                    break
+                self._retry_at = 0
+                if not isinstance(event, dict):
+                    raise ValueError(f"Expected an event object, got {type(event).__name__}")
+                self.builder.add_match(event)
+                self.events += 1
+                pos = end
+        self._buffer = buffer[pos:]
+
+    def finish(self) -> int:
+        """
+        Flush the decoder without building; raises ValueError on truncated or malformed input.
+        Returns: number of events decoded
+        """
+        self._pending.append(self._text.decode(b'', final=True))
+        self._retry_at = 0
+        self._drain()
+        if not self._finished:
+            snippet = self._buffer[:80]
+            raise ValueError(f"Truncated or malformed odds payload near {snippet!r}" if snippet else "Truncated odds payload")
+        return self.events
+
+    def close(self) -> OddsFrame:
+        """Flush the decoder and build the frame; raises ValueError on truncated or malformed input."""
+        self.finish()
+        return self.builder.build()
+
+def decode_odds(chunks: Iterable[bytes], league: str = '') -> OddsFrame:
+    """Build an OddsFrame from the raw response bytes, given as one bytes object or an iterable of chunks."""
+    if isinstance(chunks, (bytes, bytearray)):
+        data = memoryview(chunks)
+        chunks = (data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE))
+    decoder = OddsStreamDecoder(league)
+    for chunk in chunks:
+        decoder.feed(chunk)
+    return decoder.close()
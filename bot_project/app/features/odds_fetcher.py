@@ -1,32 +1,81 @@
-import aiohttp
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from app.features.odds_decoder import CHUNK_SIZE, OddsStreamDecoder
+from app.features.odds_frame import OddsFrame
+from integrations.upstream_client import UpstreamError, upstream_client
 
 logger = logging.getLogger('OddsBot')
 
-async def fetch_odds_for_league(api_key: str, base_url: str, league_key: str) -> List[Dict[str, Any]]:
+def _odds_params(api_key: str, regions: str, markets: str) -> Dict[str, str]:
+    return {
+        "apiKey": api_key,
+        "regions": regions,
+        "markets": markets,
+        "oddsFormat": "decimal"
+    }
+
+async def fetch_odds_for_league(
+    api_key: str,
+    base_url: str,
+    league_key: str,
+    regions: str = "eu",
+    markets: str = "h2h"
+) -> List[Dict[str, Any]]:
     """
     Fetch raw odds data from API
     Returns list of matches with complete bookmaker data
     """
     url = f"{base_url}/sports/{league_key}/odds"
-    params = {
-        "apiKey": api_key,
-        "regions": "eu",
-        "markets": "h2h",
-        "oddsFormat": "decimal"
-    }
-    
+    params = _odds_params(api_key, regions, markets)
+
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    logger.info(f"Fetched {len(data)} matches for {league_key}")
-                    return data
-                logger.error(f"API Error: {response.status}")
-                return []
-                
+        async with upstream_client.get(url, label=league_key, params=params) as response:
+            data = await response.json()
+            logger.info(f"Fetched {len(data)} matches for {league_key}")
+            return data
+
+    except UpstreamError as e:
+        logger.error(f"API Error for {league_key}: {str(e)}")
+        return []
     except Exception as e:
         logger.error(f"Fetch failed: {str(e)}")
-        return []
\ No newline at end of file
+        return []
+
+async def fetch_odds_frame(
+    api_key: str,
+    base_url: str,
+    league_key: str,
+    regions: str = "eu",
+    markets: str = "h2h",
+    builder: Optional[Any] = None
+) -> Optional[OddsFrame]:
+    """
+    Fetch a league and decode the response body chunk by chunk straight into
+    an OddsFrame, without materialising the JSON document. builder replaces
+    the default OddsFrameBuilder (e.g. an incremental pass).
+    Returns None on API errors, malformed payloads or when no match was returned.
+    """
+    url = f"{base_url}/sports/{league_key}/odds"
+    params = _odds_params(api_key, regions, markets)
+
+    try:
+        async with upstream_client.get(url, label=league_key, params=params) as response:
+            decoder = OddsStreamDecoder(league_key, builder)
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                decoder.feed(chunk)
+            # An empty snapshot is not returned, so it must not be built either: an
+            # incremental pass would commit it and report every match as removed
+            frame = decoder.builder.build() if decoder.finish() else None
+
+    except UpstreamError as e:
+        logger.error(f"API Error for {league_key}: {str(e)}")
+        return None
+    except ValueError as e:
+        logger.error(f"Malformed odds payload for {league_key}: {str(e)}")
+        return None
+    except Exception as e:
+        logger.error(f"Fetch failed: {str(e)}")
+        return None
+
+    logger.info(f"Fetched {decoder.events} matches for {league_key}")
+    return frame
@@ -0,0 +1,342 @@
+import hashlib
+import logging
+import numpy as np
+from array import array
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger('OddsBot')
+
+# Outcome axis layout of OddsFrame.prices
+OUTCOMES = ('home', 'away', 'draw')
+HOME, AWAY, DRAW = range(len(OUTCOMES))
+
+# Same acceptance rule as preprocess_odds: at least this many prices per outcome
+MIN_PRICES_PER_OUTCOME = 2
+
+def allocate_prices(n_matches: int, n_bookmakers: int) -> np.ndarray:
+    """
+    NaN-filled (matches x bookmakers x outcomes) tensor stored bookmaker-major.
+    Reductions across bookmakers then run as element-wise ops over contiguous
+    match rows, which is several times faster than reducing a short inner axis.
+    """
+    return np.full((n_bookmakers, n_matches, len(OUTCOMES)), np.nan).transpose(1, 0, 2)
+
+def h2h_quotes(bookmaker: Dict[str, Any], home_team: str, away_team: str) -> Tuple[Optional[str], List[Tuple[int, float]]]:
+    """
+    Project one raw bookmaker entry onto its h2h prices.
+    Returns: (h2h last_update or None, [(outcome, price), ...])
+    """
+    stamp = None
+    prices = []
+    for market in bookmaker.get('markets', []):
+        if market.get('key') != 'h2h':
+            continue
+        stamp = market.get('last_update') or bookmaker.get('last_update') or stamp
+        for outcome in market.get('outcomes', []):
+            name = outcome.get('name', '')
+            price = outcome.get('price')
+            if price is None:
+                continue
+            if name == home_team:
+                prices.append((HOME, price))
+            elif name == away_team:
+                prices.append((AWAY, price))
+            elif name == 'Draw':
+                prices.append((DRAW, price))
+    return stamp, prices
+
+def make_match_id(home_team: str, away_team: str, commence_time: str) -> str:
+    """Stable short match identifier, identical to the one preprocess_odds produces."""
+    return hashlib.md5(
+        f"{home_team}|{away_team}|{commence_time}".encode()
+    ).hexdigest()[:8]
+
+@dataclass
+class OddsFrame:
+    """
+    Columnar odds snapshot.
+    prices is a dense (matches x bookmakers x outcomes) array with NaN for missing
+    prices; match metadata lives in parallel per-match arrays and bookmaker
+    columns are resolved through bookmaker_index. last_updates maps match id to
+    {bookmaker: h2h last_update} when the source carried timestamps.
+    """
+    prices: np.ndarray
+    match_ids: np.ndarray
+    home_teams: np.ndarray
+    away_teams: np.ndarray
+    commence_times: np.ndarray
+    leagues: np.ndarray
+    bookmakers: List[str]
+    bookmaker_index: Dict[str, int] = field(default_factory=dict)
+    last_updates: Dict[str, Dict[str, str]] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if not self.bookmaker_index:
+            self.bookmaker_index = {bm: i for i, bm in enumerate(self.bookmakers)}
+
+    def __len__(self) -> int:
+        return self.prices.shape[0]
+
+    @property
+    def n_matches(self) -> int:
+        return self.prices.shape[0]
+
+    @property
+    def n_bookmakers(self) -> int:
+        return self.prices.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the price tensor."""
+        return self.prices.nbytes
+
+    @cached_property
+    def valid(self) -> np.ndarray:
+        """Boolean (matches x bookmakers x outcomes) mask of quoted prices."""
+        return ~np.isnan(self.prices)
+
+    @cached_property
+    def best_prices(self) -> np.ndarray:
+        """Best (highest) price per match and outcome, shape (matches, outcomes)."""
+        return np.fmax.reduce(self.prices, axis=1)
+
+    @cached_property
+    def best_columns(self) -> np.ndarray:
+        """First bookmaker column quoting the best price, shape (matches, outcomes)."""
+        return np.argmax(self.prices == self.best_prices[:, None, :], axis=1)
+
+    @cached_property
+    def derived(self) -> Dict[Any, Any]:
+        """Results computed from this snapshot (e.g. fair odds), kept as long as the frame lives."""
+        return {}
+
+    def team(self, row: int, outcome: int) -> str:
+        """Display name for an outcome of a match."""
+        if outcome == HOME:
+            return self.home_teams[row]
+        if outcome == AWAY:
+            return self.away_teams[row]
+        return 'Draw'
+
+    def outcome_prices(self, row: int, outcome: int) -> np.ndarray:
+        """Quoted prices for one match outcome, in bookmaker column order."""
+        prices = self.prices[row, :, outcome]
+        return prices[~np.isnan(prices)]
+
+    def match_info(self, row: int) -> Dict[str, str]:
+        """Metadata for one match row."""
+        return {
+            'match_id': self.match_ids[row],
+            'home_team': self.home_teams[row],
+            'away_team': self.away_teams[row],
+            'commence_time': self.commence_times[row],
+            'league': self.leagues[row]
+        }
+
+    def to_processed(self) -> List[Dict[str, Any]]:
+        """Expand back into the legacy ProcessedMatch dict layout."""
+        processed = []
+        for row in range(self.n_matches):
+            match = self.match_info(row)
+            del match['league']
+            match['bookmakers'] = {}
+            for col in np.flatnonzero(self.valid[row].any(axis=1)):
+                quotes = self.prices[row, col]
+                match['bookmakers'][self.bookmakers[col]] = {
+                    name: (None if np.isnan(quotes[k]) else float(quotes[k]))
+                    for k, name in enumerate(OUTCOMES)
+                }
+            for k, name in enumerate(OUTCOMES):
+                match[f'{name}_odds'] = self.outcome_prices(row, k).tolist()
+            processed.append(match)
+        return processed
+
+    @classmethod
+    def empty(cls) -> 'OddsFrame':
+        return OddsFrameBuilder().build()
+
+    @classmethod
+    def from_raw(cls, raw_odds: Iterable[Dict], league: str = '') -> 'OddsFrame':
+        """Build a frame in one pass over the-odds-api JSON."""
+        builder = OddsFrameBuilder(league)
+        for match in raw_odds:
+            builder.add_match(match)
+        return builder.build()
+
+    @classmethod
+    def from_processed(cls, matches: Sequence[Dict[str, Any]], league: str = '') -> 'OddsFrame':
+        """Build a frame from legacy ProcessedMatch dicts."""
+        builder = OddsFrameBuilder(league)
+        for match in matches:
+            quotes = [
+                (bm, [(k, odds[name]) for k, name in enumerate(OUTCOMES) if odds.get(name) is not None])
+                for bm, odds in match.get('bookmakers', {}).items()
+            ]
+            builder.add_quotes(
+                match['home_team'], match['away_team'], match.get('commence_time', ''),
+                quotes, match_id=match.get('match_id')
+            )
+        return builder.build()
+
+    def take(self, rows: Sequence[int]) -> 'OddsFrame':
+        """Frame of the given match rows only, over the same bookmaker columns."""
+        rows = np.asarray(rows, dtype=np.intp)
+        prices = allocate_prices(len(rows), self.n_bookmakers)
+        prices[:] = self.prices[rows]
+        match_ids = self.match_ids[rows]
+        return OddsFrame(
+            prices=prices,
+            match_ids=match_ids,
+            home_teams=self.home_teams[rows],
+            away_teams=self.away_teams[rows],
+            commence_times=self.commence_times[rows],
+            leagues=self.leagues[rows],
+            bookmakers=self.bookmakers,
+            bookmaker_index=self.bookmaker_index,
+            last_updates={mid: self.last_updates[mid] for mid in match_ids.tolist() if mid in self.last_updates}
+        )
+
+    @classmethod
+    def concat(cls, frames: Sequence['OddsFrame']) -> 'OddsFrame':
+        """Stack frames (e.g. several leagues) over the union of their bookmakers."""
+        frames = [f for f in frames if f.n_matches]
+        if not frames:
+            return cls.empty()
+        bookmakers: List[str] = []
+        index: Dict[str, int] = {}
+        for frame in frames:
+            for bm in frame.bookmakers:
+                if bm not in index:
+                    index[bm] = len(bookmakers)
+                    bookmakers.append(bm)
+
+        prices = allocate_prices(sum(f.n_matches for f in frames), len(bookmakers))
+        start = 0
+        for frame in frames:
+            cols = [index[bm] for bm in frame.bookmakers]
+            prices[start:start + frame.n_matches, cols] = frame.prices
+            start += frame.n_matches
+
+        return cls(
+            prices=prices,
+            match_ids=np.concatenate([f.match_ids for f in frames]),
+            home_teams=np.concatenate([f.home_teams for f in frames]),
+            away_teams=np.concatenate([f.away_teams for f in frames]),
+            commence_times=np.concatenate([f.commence_times for f in frames]),
+            leagues=np.concatenate([f.leagues for f in frames]),
+            bookmakers=bookmakers,
+            bookmaker_index=index,
+            last_updates={mid: stamps for f in frames for mid, stamps in f.last_updates.items()}
+        )
+
+class OddsFrameBuilder:
+    """Accumulates matches one at a time and materialises the dense tensor once."""
+
+    def __init__(self, league: str = ''):
+        self.league = league
+        self.bookmakers: List[str] = []
+        self.bookmaker_index: Dict[str, int] = {}
+        self._meta: List[Tuple[str, str, str, str]] = []
+        self._last_updates: Dict[str, Dict[str, str]] = {}
+        # Flat scatter coordinates into the final tensor, as packed C arrays
+        # (a few bytes per price instead of a boxed Python object each)
+        self._rows = array('i')
+        self._cols = array('i')
+        self._outcomes = array('b')
+        self._prices = array('d')
+
+    def _column(self, bookmaker: str) -> int:
+        col = self.bookmaker_index.get(bookmaker)
+        if col is None:
+            col = self.bookmaker_index[bookmaker] = len(self.bookmakers)
+            self.bookmakers.append(bookmaker)
+        return col
+
+    def add_match(self, match: Dict[str, Any]) -> bool:
+        """Add one raw API match, keeping only h2h prices. Returns whether it was accepted."""
+        home_team = match.get('home_team', 'Unknown')
+        away_team = match.get('away_team', 'Unknown')
+        quotes = []
+        stamps = {}
+        for bookmaker in match.get('bookmakers', []):
+            key = bookmaker.get('key', 'unknown')
+            stamp, prices = h2h_quotes(bookmaker, home_team, away_team)
+            if stamp:
+                stamps[key] = stamp
+            quotes.append((key, prices))
+        return self.add_quotes(home_team, away_team, match.get('commence_time', ''), quotes, last_updates=stamps)
+
+    def add_quotes(
+        self,
+        home_team: str,
+        away_team: str,
+        commence_time: str,
+        quotes: Iterable[Tuple[str, Iterable[Tuple[int, float]]]],
+        match_id: Optional[str] = None,
+        last_updates: Optional[Dict[str, str]] = None
+    ) -> bool:
+        """
+        Add one match from (bookmaker, [(outcome, price), ...]) pairs, with
+        optional {bookmaker: last_update} stamps kept if it is accepted.
+        """
+        row = len(self._meta)
+        counts = [0] * len(OUTCOMES)
+        cells = []
+        for bookmaker, prices in quotes:
+            col = self._column(bookmaker)
+            for outcome, price in prices:
+                cells.append((col, outcome, float(price)))
+                counts[outcome] += 1
+
+        match_id = match_id or make_match_id(home_team, away_team, commence_time)
+        if min(counts) < MIN_PRICES_PER_OUTCOME:
+            logger.warning(f"Insufficient odds for {match_id}")
+            return False
+
+        for col, outcome, price in cells:
+            self._rows.append(row)
+            self._cols.append(col)
+            self._outcomes.append(outcome)
+            self._prices.append(price)
+        self._meta.append((match_id, home_team, away_team, commence_time))
+        if last_updates:
+            self._last_updates[match_id] = last_updates
+        return True
+
+    def build(self) -> OddsFrame:
+        prices = allocate_prices(len(self._meta), len(self.bookmakers))
+        if self._prices:
+            prices[
+                np.frombuffer(self._rows, dtype=np.intc),
+                np.frombuffer(self._cols, dtype=np.intc),
+                np.frombuffer(self._outcomes, dtype=np.int8)
+            ] = np.frombuffer(self._prices, dtype=np.float64)
+
+        # Drop bookmaker columns that only quoted rejected matches
+        used = ~np.isnan(prices).all(axis=(0, 2)) if prices.size else np.zeros(len(self.bookmakers), bool)
+        bookmakers = self.bookmakers
+        if not used.all():
+            kept = allocate_prices(len(self._meta), int(used.sum()))
+            kept[:] = prices[:, used]
+            prices = kept
+            bookmakers = [bm for bm, keep in zip(self.bookmakers, used) if keep]
+
+        meta = list(zip(*self._meta)) if self._meta else [(), (), (), ()]
+        return OddsFrame(
+            prices=prices,
+            match_ids=np.array(meta[0], dtype=object),
+            home_teams=np.array(meta[1], dtype=object),
+            away_teams=np.array(meta[2], dtype=object),
+            commence_times=np.array(meta[3], dtype=object),
+            leagues=np.full(len(self._meta), self.league, dtype=object),
+            bookmakers=bookmakers,
+            last_updates=self._last_updates
+        )
+
+def ensure_frame(data: Union[OddsFrame, Sequence[Dict[str, Any]]]) -> OddsFrame:
+    """Accept either an OddsFrame or a list of ProcessedMatch dicts."""
+    if isinstance(data, OddsFrame):
+        return data
+    return OddsFrame.from_processed(data)
@@ -0,0 +1,351 @@
+import asyncio
+import heapq
+import logging
+import math
+import numpy as np
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from app.features.algorithms.dfs import scan_arbitrage
+from app.features.algorithms.ocm import scan_value
+from app.features.executor import algorithm_executor
+from app.features.incremental import ChangeSet, incremental_preprocessor
+from app.features.odds_frame import OUTCOMES, OddsFrame
+from config.settings import OPPORTUNITY_INDEX_MIN_EDGE
+from utils.metrics import errors, registry, stage_seconds
+
+logger = logging.getLogger('OddsBot')
+
+# Opportunity kinds and the field each one is ranked by
+ARBITRAGE, VALUE = 'arbitrage', 'value'
+SCORE_FIELDS = {ARBITRAGE: 'potential_return', VALUE: 'edge_percentage'}
+
+# (kind, match id, market)
+EntryKey = Tuple[str, str, str]
+# Sort key: highest score first, ties broken by entry key
+Rank = Tuple[float, EntryKey]
+
+_ALL_MARKETS = frozenset(name.upper() for name in OUTCOMES)
+
+def _kickoff(commence_time: str) -> float:
+    """Epoch seconds of an API commence_time; unknown times sort as far in the future."""
+    try:
+        return datetime.fromisoformat(commence_time).timestamp()
+    except (TypeError, ValueError):
+        return math.inf
+
+def scan_opportunities(frame: OddsFrame, min_edge: float) -> Tuple[List[Dict], List[Dict]]:
+    """Arbitrage and value results of a frame; module level so any executor backend can run it."""
+    return scan_arbitrage(frame), scan_value(frame, min_edge)
+
+class _PendingUpdate:
+    """Change sets of one feed received while its previous ones were being scanned."""
+    __slots__ = ('frame', 'full', 'matches')
+
+    def __init__(self, frame: OddsFrame):
+        self.frame = frame
+        self.full = False
+        # Added, updated or removed since the last scan
+        self.matches: Set[str] = set()
+
+class Opportunity:
+    __slots__ = ('key', 'kind', 'match_id', 'league', 'markets', 'score', 'kickoff', 'feed', 'data')
+
+    def __init__(self, kind: str, market: str, feed: Hashable, data: Dict[str, Any]):
+        self.kind = kind
+        self.match_id = data['match_id']
+        self.key: EntryKey = (kind, self.match_id, market)
+        self.league = data.get('league', '')
+        # An arbitrage backs every outcome, so it matches any market filter
+        self.markets: FrozenSet[str] = _ALL_MARKETS if kind == ARBITRAGE else frozenset((market,))
+        self.score = float(data[SCORE_FIELDS[kind]])
+        self.kickoff = _kickoff(data.get('commence_time', ''))
+        self.feed = feed
+        self.data = data
+
+    @property
+    def rank(self) -> Rank:
+        return (-self.score, self.key)
+
+class OpportunityIndex:
+    """
+    Current arbitrage and value opportunities of every league, kept ranked by
+    score (arbitrage ROI or value edge, in percent) as snapshots change.
+    Fed by the incremental preprocessor's change sets: only the added and
+    updated matches are rescanned, on the algorithm executor, and their
+    entries are then moved within sorted lists (one per kind, one per kind
+    and league) on the event loop instead of re-ranking everything. Change
+    sets arriving while a feed is being scanned are merged and applied in
+    order by that feed's next pass. top() walks those lists from the best entry and stops after k
+    matches, so a query costs about k entries plus the ones its filters skip.
+    """
+
+    def __init__(self, min_edge: float = OPPORTUNITY_INDEX_MIN_EDGE):
+        self.min_edge = min_edge
+        self._entries: Dict[EntryKey, Opportunity] = {}
+        self._by_match: Dict[str, Set[EntryKey]] = {}
+        self._feeds: Dict[Hashable, Set[str]] = {}
+        self._ranked: Dict[str, List[Rank]] = {kind: [] for kind in SCORE_FIELDS}
+        self._by_league: Dict[Tuple[str, str], List[Rank]] = {}
+        self._pending: Dict[Hashable, _PendingUpdate] = {}
+        self._workers: Dict[Hashable, asyncio.Task] = {}
+        self.updates = 0
+        self.rescanned = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _insert(self, entry: Opportunity) -> None:
+        self._entries[entry.key] = entry
+        self._by_match.setdefault(entry.match_id, set()).add(entry.key)
+        rank = entry.rank
+        insort(self._ranked[entry.kind], rank)
+        insort(self._by_league.setdefault((entry.kind, entry.league), []), rank)
+
+    def _remove(self, key: EntryKey) -> None:
+        entry = self._entries.pop(key)
+        rank = entry.rank
+        for ranked in (self._ranked[entry.kind], self._by_league[(entry.kind, entry.league)]):
+            del ranked[bisect_left(ranked, rank)]
+
+    def _set_match(self, feed: Hashable, match_id: str, entries: List[Opportunity]) -> None:
+        """Replace every entry of a match, leaving unmoved the ones whose score is unchanged."""
+        old_keys = self._by_match.pop(match_id, set())
+        new_keys = set()
+        for entry in entries:
+            new_keys.add(entry.key)
+            old = self._entries.get(entry.key)
+            if old is not None and old.score == entry.score and old.league == entry.league:
+                old.data, old.feed, old.kickoff = entry.data, feed, entry.kickoff
+                continue
+            if old is not None:
+                self._remove(entry.key)
+            self._insert(entry)
+        for key in old_keys - new_keys:
+            self._remove(key)
+        if new_keys:
+            self._by_match[match_id] = new_keys
+        self._feeds.setdefault(feed, set()).add(match_id)
+
+    def _drop_match(self, feed: Hashable, match_id: str) -> None:
+        keys = self._by_match.get(match_id, set())
+        # A match listed by another feed since then belongs to that feed now
+        if any(self._entries[key].feed != feed for key in keys):
+            return
+        for key in self._by_match.pop(match_id, set()):
+            self._remove(key)
+
+    def _apply(self, feed: Hashable, part: OddsFrame, arbitrage: List[Dict], value: List[Dict]) -> None:
+        """Replace the entries of every match of part with the given scan results."""
+        found: Dict[str, List[Opportunity]] = {}
+        for item in arbitrage:
+            found.setdefault(item['match_id'], []).append(Opportunity(ARBITRAGE, '', feed, item))
+        for item in value:
+            found.setdefault(item['match_id'], []).append(Opportunity(VALUE, item['market'], feed, item))
+        for match_id in part.match_ids.tolist():
+            self._set_match(feed, match_id, found.get(match_id, []))
+        self.rescanned += part.n_matches
+        self.updates += 1
+
+    @staticmethod
+    def _part(frame: OddsFrame, match_ids: Optional[Iterable[str]]) -> OddsFrame:
+        """The frame limited to the given matches (all of them when match_ids is None)."""
+        if match_ids is None:
+            return frame
+        wanted = set(match_ids)
+        rows = np.flatnonzero([mid in wanted for mid in frame.match_ids.tolist()])
+        return frame if len(rows) == frame.n_matches else frame.take(rows)
+
+    def update(self, feed: Hashable, frame: OddsFrame, match_ids: Optional[Iterable[str]] = None) -> None:
+        """
+        Rescan the given matches of a feed's frame (all of them when match_ids
+        is None) on the calling thread and replace their entries.
+        """
+        part = self._part(frame, match_ids)
+        self._apply(feed, part, *scan_opportunities(part, self.min_edge))
+
+    def covers(self, feed: Hashable) -> bool:
+        """Whether a snapshot of the feed has been indexed."""
+        return feed in self._feeds
+
+    def remove(self, feed: Hashable, match_ids: Iterable[str]) -> None:
+        listed = self._feeds.get(feed, set())
+        for match_id in match_ids:
+            listed.discard(match_id)
+            self._drop_match(feed, match_id)
+
+    def forget(self, feed: Hashable) -> None:
+        """Drop every entry of a feed, so its next snapshot is indexed in full."""
+        self.remove(feed, list(self._feeds.get(feed, ())))
+        self._feeds.pop(feed, None)
+
+    def on_change(self, changes: ChangeSet, frame: OddsFrame) -> None:
+        """
+        Incremental preprocessor listener: queue one snapshot's change set for
+        the feed's next scan. Without a running event loop it is applied at once.
+        """
+        pending = self._pending.get(changes.key)
+        if pending is None:
+            pending = self._pending[changes.key] = _PendingUpdate(frame)
+        pending.frame = frame
+        # First snapshot of the feed (or after a reset): forget whatever it listed before
+        pending.full = pending.full or changes.full
+        pending.matches.update(changes.changed_matches, changes.removed)
+        logger.debug(f"Opportunity index: {changes.summary()} queued for {changes.key}")
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._apply_now(changes.key)
+            return
+        if changes.key not in self._workers:
+            self._workers[changes.key] = loop.create_task(self._drain(changes.key))
+
+    def _take_pending(self, feed: Hashable) -> Tuple[OddsFrame, Optional[Set[str]], List[str]]:
+        """
+        Pop a feed's queued changes.
+        Returns: (latest frame, matches to rescan or None for all, matches to drop)
+        """
+        pending = self._pending.pop(feed)
+        current = set(pending.frame.match_ids.tolist())
+        if pending.full:
+            return pending.frame, None, [mid for mid in self._feeds.get(feed, set()) if mid not in current]
+        return pending.frame, pending.matches & current, list(pending.matches - current)
+
+    def _apply_now(self, feed: Hashable) -> None:
+        frame, rescan, dropped = self._take_pending(feed)
+        self.remove(feed, dropped)
+        if rescan is None or rescan:
+            self.update(feed, frame, rescan)
+
+    async def _drain(self, feed: Hashable) -> None:
+        """Scan a feed's queued changes off the loop and apply them, until none are left."""
+        try:
+            while feed in self._pending:
+                frame, rescan, dropped = self._take_pending(feed)
+                part = self._part(frame, rescan)
+                try:
+                    with stage_seconds.time('index_scan', frame.leagues[0] if frame.n_matches else '', ''):
+                        arbitrage, value = await algorithm_executor.run(scan_opportunities, part, self.min_edge)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # The skipped changes would leave stale entries: start the feed over.
+                    # Later change sets only list what changed since, so the retry
+                    # (on the next change set or sync) must rescan the whole feed
+                    errors.inc('opportunity_index')
+                    logger.error(f"Opportunity index scan failed for {feed}: {str(e) or type(e).__name__}")
+                    self.forget(feed)
+                    self._pending.setdefault(feed, _PendingUpdate(frame)).full = True
+                    return
+                self.remove(feed, dropped)
+                self._apply(feed, part, arbitrage, value)
+                logger.debug(f"Opportunity index: {part.n_matches} matches rescanned for {feed}, {len(self._entries)} entries")
+        finally:
+            self._workers.pop(feed, None)
+
+    async def sync(self, feed: Hashable, frame: OddsFrame) -> None:
+        """
+        Wait until the index reflects the feed's frame, queueing a full scan
+        of it if the feed was never indexed (e.g. its frame came from elsewhere)
+        and retrying changes left queued by a failed scan.
+        """
+        if feed not in self._workers:
+            if not self.covers(feed) and feed not in self._pending:
+                self._pending[feed] = _PendingUpdate(frame)
+                self._pending[feed].full = True
+            if feed in self._pending:
+                # Queued by a failed scan, or just above
+                self._workers[feed] = asyncio.get_running_loop().create_task(self._drain(feed))
+        worker = self._workers.get(feed)
+        if worker is not None:
+            # Shielded: a cancelled caller must not abandon the feed's queued changes
+            await asyncio.shield(worker)
+
+    def _candidates(self, kind: str, leagues: Optional[Union[str, Iterable[str]]]) -> Iterator[Rank]:
+        if leagues is None:
+            return iter(self._ranked[kind])
+        if isinstance(leagues, str):
+            return iter(self._by_league.get((kind, leagues), ()))
+        # Lazily merge the per-league lists, best first
+        return heapq.merge(*(self._by_league.get((kind, league), ()) for league in set(leagues)))
+
+    def top(
+        self,
+        kind: str,
+        k: int = 10,
+        leagues: Optional[Union[str, Iterable[str]]] = None,
+        market: Optional[str] = None,
+        min_score: Optional[float] = None,
+        kickoff_from: Optional[float] = None,
+        kickoff_to: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Best k opportunities of a kind, optionally limited to some leagues, an
+        outcome market ('HOME', 'AWAY', 'DRAW'), a minimum score in percent and
+        a kickoff window in epoch seconds.
+        Returns: the opportunities' result dicts, best first (shared, do not modify)
+        """
+        results = []
+        if k <= 0:
+            return results
+        for rank in self._candidates(kind, leagues):
+            if min_score is not None and -rank[0] < min_score:
+                break
+            entry = self._entries[rank[1]]
+            if market is not None and market.upper() not in entry.markets:
+                continue
+            if kickoff_from is not None and entry.kickoff < kickoff_from:
+                continue
+            if kickoff_to is not None and entry.kickoff > kickoff_to:
+                continue
+            results.append(entry.data)
+            if len(results) == k:
+                break
+        return results
+
+    def prune(self, before: float) -> int:
+        """Drop opportunities on matches that kicked off before the given time. Returns: entries dropped"""
+        stale = {entry.match_id: entry.feed for entry in self._entries.values() if entry.kickoff < before}
+        dropped = 0
+        for match_id, feed in stale.items():
+            keys = self._by_match.pop(match_id, set())
+            for key in keys:
+                self._remove(key)
+            dropped += len(keys)
+            self._feeds.get(feed, set()).discard(match_id)
+        return dropped
+
+    def clear(self) -> None:
+        for worker in self._workers.values():
+            worker.cancel()
+        self._workers.clear()
+        self._pending.clear()
+        self._entries.clear()
+        self._by_match.clear()
+        self._feeds.clear()
+        self._by_league.clear()
+        for ranked in self._ranked.values():
+            ranked.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'arbitrage': len(self._ranked[ARBITRAGE]),
+            'value': len(self._ranked[VALUE]),
+            'matches': len(self._by_match),
+            'pending': len(self._pending),
+            'updates': self.updates,
+            'rescanned': self.rescanned
+        }
+
+# Shared index, kept in step with every processed feed snapshot
+opportunity_index = OpportunityIndex()
+incremental_preprocessor.add_listener(opportunity_index.on_change)
+
+registry.callback(
+    'betsage_opportunity_index_entries',
+    'Opportunities currently held in the ranked index',
+    'gauge',
+    lambda: {(kind,): len(ranked) for kind, ranked in opportunity_index._ranked.items()},
+    ('kind',)
+)
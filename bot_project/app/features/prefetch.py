@@ -0,0 +1,122 @@
+import logging
+import random
+import time
+from collections import deque
+from typing import Dict, Optional
+from telegram.ext import ContextTypes, JobQueue
+from app.features.data_processing import load_odds_frame
+from app.features.odds_cache import odds_cache
+from app.features.odds_frame import OddsFrame
+from app.interactions.league_selection import LeagueManager
+from config.settings import (
+    PREFETCH_DEFAULT_INTERVAL,
+    PREFETCH_INTERVALS,
+    PREFETCH_JITTER,
+    PREFETCH_MAX_CALLS_PER_HOUR
+)
+from integrations.upstream_client import upstream_client
+
+logger = logging.getLogger('OddsBot')
+
+class PrefetchScheduler:
+    """
+    Keeps every league in LeagueManager.LEAGUE_DB warm in the shared odds cache.
+    Each league runs as a self-rescheduling JobQueue job with its own interval and
+    a jittered first start; all upstream calls share an hourly budget.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        default_interval: float = PREFETCH_DEFAULT_INTERVAL,
+        intervals: Optional[Dict[str, float]] = None,
+        jitter: float = PREFETCH_JITTER,
+        max_calls_per_hour: int = PREFETCH_MAX_CALLS_PER_HOUR
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.default_interval = default_interval
+        self.intervals = intervals if intervals is not None else PREFETCH_INTERVALS
+        self.jitter = jitter
+        self.max_calls_per_hour = max_calls_per_hour
+        self.job_queue: Optional[JobQueue] = None
+        self._calls = deque()
+        self.refreshed = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def interval(self, league_key: str) -> float:
+        """Refresh interval for a league in seconds, stretched while upstream quota runs low."""
+        return self.intervals.get(league_key, self.default_interval) * upstream_client.interval_multiplier()
+
+    def start(self, job_queue: JobQueue) -> None:
+        """Schedule the first refresh of every league at a jittered offset."""
+        self.job_queue = job_queue
+        for league_key in LeagueManager.LEAGUE_DB:
+            job_queue.run_once(
+                self._job,
+                when=random.uniform(0, self.jitter),
+                data=league_key,
+                name=f"prefetch:{league_key}"
+            )
+        logger.info(f"Prefetch scheduled for {len(LeagueManager.LEAGUE_DB)} leagues")
+
+    async def _job(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        league_key = context.job.data
+        try:
+            await self.refresh(league_key)
+        finally:
+            context.job_queue.run_once(
+                self._job,
+                when=self.interval(league_key),
+                data=league_key,
+                name=f"prefetch:{league_key}"
+            )
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        while self._calls and now - self._calls[0] >= 3600:
+            self._calls.popleft()
+
+    def _take_budget(self) -> bool:
+        """Reserve one upstream call from the hourly budget."""
+        self._prune()
+        if len(self._calls) >= self.max_calls_per_hour:
+            return False
+        self._calls.append(time.monotonic())
+        return True
+
+    async def refresh(self, league_key: str) -> Optional[OddsFrame]:
+        """
+        Fetch a league now and publish it to the odds cache.
+        Returns the new frame, or None when skipped for budget or the fetch failed.
+        """
+        api_league_key = LeagueManager.get_api_key(league_key)
+        if not api_league_key:
+            return None
+        if not self._take_budget():
+            self.skipped += 1
+            logger.warning(f"Prefetch budget exhausted, skipping {league_key}")
+            return None
+
+        # Keep prefetched data valid until shortly after the next scheduled refresh
+        frame = await odds_cache.refresh(
+            odds_cache.make_key(api_league_key),
+            lambda: load_odds_frame(self.api_key, self.base_url, api_league_key),
+            ttl=self.interval(league_key) + self.jitter + 60
+        )
+        if frame:
+            self.refreshed += 1
+        else:
+            self.failed += 1
+        return frame
+
+    def stats(self) -> Dict[str, int]:
+        self._prune()
+        return {
+            'refreshed': self.refreshed,
+            'skipped': self.skipped,
+            'failed': self.failed,
+            'calls_last_hour': len(self._calls)
+        }
@@ -0,0 +1,124 @@
+import logging
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+from telegram import InlineKeyboardMarkup
+from app.features.odds_cache import odds_cache
+from config.settings import RENDER_CACHE_MAX_ENTRIES
+from utils.metrics import registry
+
+logger = logging.getLogger('OddsBot')
+
+# Telegram rejects messages longer than this
+MESSAGE_LIMIT = 4096
+
+# (odds cache key, algorithm, snapshot version, paid tier)
+RenderKey = Tuple[Hashable, str, int, bool]
+Page = Tuple[str, InlineKeyboardMarkup]
+
+def paginate(text: str, limit: int = MESSAGE_LIMIT) -> List[str]:
+    """
+    Split text into chunks of at most limit characters, breaking between lines
+    where possible and inside a line only when it is longer than limit.
+    """
+    if len(text) <= limit:
+        return [text]
+
+    pages = []
+    current = ''
+    for line in text.split('\n'):
+        while len(line) > limit:
+            if current:
+                pages.append(current)
+                current = ''
+            pages.append(line[:limit])
+            line = line[limit:]
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > limit:
+            pages.append(current)
+            current = line
+        else:
+            current = candidate
+    if current:
+        pages.append(current)
+    return pages
+
+class RenderCache:
+    """
+    Rendered result pages shared by every user who views the same league,
+    algorithm and paid tier on the same odds snapshot. Entries are dropped as
+    soon as the odds cache stores a newer snapshot for their league.
+    """
+
+    def __init__(self, max_entries: int = RENDER_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[RenderKey, List[Page]]" = OrderedDict()
+        self._by_snapshot: Dict[Hashable, Set[RenderKey]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(odds_key: Hashable, algorithm: str, version: int, paid: bool) -> RenderKey:
+        return (odds_key, algorithm, version, paid)
+
+    def get(self, key: RenderKey) -> Optional[List[Page]]:
+        pages = self._entries.get(key)
+        if pages is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return pages
+
+    def page(self, key: RenderKey, index: int) -> Optional[Page]:
+        """One page of a cached render, or None if it is gone."""
+        pages = self._entries.get(key)
+        if pages is None or not 0 <= index < len(pages):
+            return None
+        return pages[index]
+
+    def put(self, key: RenderKey, pages: List[Page]) -> None:
+        self._entries[key] = pages
+        self._entries.move_to_end(key)
+        self._by_snapshot.setdefault(key[0], set()).add(key)
+        while len(self._entries) > self.max_entries:
+            old_key, _ = self._entries.popitem(last=False)
+            self._unindex(old_key)
+
+    def _unindex(self, key: RenderKey) -> None:
+        keys = self._by_snapshot.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_snapshot[key[0]]
+
+    def invalidate(self, odds_key: Optional[Hashable] = None) -> None:
+        """Drop renders of one odds snapshot key, or all of them."""
+        if odds_key is None:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._by_snapshot.clear()
+            return
+        for key in self._by_snapshot.pop(odds_key, ()):
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'entries': len(self._entries)
+        }
+
+# Shared instance, kept in step with the odds cache
+render_cache = RenderCache()
+odds_cache.add_listener(render_cache.invalidate)
+
+registry.callback(
+    'betsage_render_cache_total',
+    'Rendered result cache lookups by outcome',
+    'counter',
+    lambda: {(outcome,): render_cache.stats()[outcome] for outcome in ('hits', 'misses', 'invalidations')},
+    ('outcome',)
+)
@@ -38,7 +38,9 @@ def format_results(processed_data: Dict[str, Any]) -> str:
         lambda x: (
             f"{safe_get(x, 'home_team')} vs {safe_get(x, 'away_team')}\n"
             f"  🎯 Market: {safe_get(x, 'recommended_market')} ({safe_get(x, 'recommended_team')})\n"
-            f"  📈 Trend: {safe_get(x, 'trend').capitalize()} | Odds: {format_odds(x.get('current_odds', 0))}\n"
+            f"  📈 Trend: {safe_get(x, 'trend').capitalize()} | Odds: {format_odds(x.get('current_odds', 0))}"
+            + (f" → {format_odds(x['forecast_odds'])} forecast" if x.get('forecast_odds') else "")
+            + "\n"
             f"  📉 Volatility: {float(x.get('volatility', 0)):.2f} | Rec: {safe_get(x, 'recommendation').replace('_', ' ').title()}"
         )
     )
@@ -50,7 +52,11 @@ def format_results(processed_data: Dict[str, Any]) -> str:
         lambda x: (
             f"{safe_get(x, 'home_team')} vs {safe_get(x, 'away_team')}\n"
             f"  🎯 Market: {safe_get(x, 'market')} ({safe_get(x, 'team')})\n"
-            f"  📈 Odds: {format_odds(x.get('odds', 0))} | Win Prob: {format_percentage(x.get('win_probability', 0))}\n"
+            f"  📈 Odds: {format_odds(x.get('odds', 0))} | Win Prob: {format_percentage(x.get('win_probability', 0))}"
+            + (f" (95% CI {format_percentage(x['confidence_interval'][0])}-"
+               f"{format_percentage(x['confidence_interval'][1])}, n={x.get('samples', 0)})"
+               if x.get('confidence_interval') else "")
+            + "\n"
             f"  💰 Stake: {x.get('recommended_stake_pct', 0):.1f}% | Value: {safe_get(x, 'value_rating').title()}"
         )
     )
@@ -61,19 +67,43 @@ def format_results(processed_data: Dict[str, Any]) -> str:
         processed_data.get('recommended_parlays', []),
         lambda x: (
             f"{safe_get(x, 'home_team')} vs {safe_get(x, 'away_team')}\n"
-            f"  📊 Market: {safe_get(x, 'market', 'N/A')} @ {format_odds(x.get('odds', 0))}\n"
-            f"  💰 Stake: {x.get('recommended_stake_pct', 0):.1f}% | Edge: {x.get('edge_percentage', 0):.1f}%"
+            f"  📊 Market: {safe_get(x, 'market', 'N/A')} ({safe_get(x, 'team')}) @ {format_odds(x.get('odds', 0))}"
+            f" ({safe_get(x, 'bookmaker')})\n"
+            f"  💰 Stake: {x.get('recommended_stake', 0):.2f} ({x.get('recommended_stake_pct', 0):.1f}%) | "
+            f"Edge: {x.get('edge_percentage', 0):.1f}%"
         )
     )
+    portfolio = processed_data.get('portfolio')
+    if portfolio and processed_data.get('recommended_parlays'):
+        output.append(
+            f"📦 Portfolio: {portfolio.get('total_stake', 0):.2f} of {portfolio.get('bankroll', 0):.0f} staked "
+            f"({portfolio.get('exposure_pct', 0):.1f}%) | Expected growth: {portfolio.get('expected_growth_pct', 0):.2f}%"
+        )
     
     # Arbitrage Opportunities
     add_section(
         "🔍 Arbitrage Opportunities",
         processed_data.get('arbitrage_opportunities', []),
         lambda x: (
-            f"{safe_get(x, 'match_ids', 'Multiple')}\n"
-            f"  💰 ROI: {format_percentage(x.get('potential_return', 0)/100)}\n"
-            f"  📈 Markets: {safe_get(x, 'markets', 'N/A')}"
+            (f"[{x['league_name']}] " if x.get('league_name') else "")
+            + f"{safe_get(x, 'home_team')} vs {safe_get(x, 'away_team')}\n"
+            f"  💰 ROI: {x.get('potential_return', 0):.2f}% | Payout: {x.get('guaranteed_payout', 0):.2f}\n"
+            + "\n".join(
+                f"  📈 {safe_get(s, 'market')} @ {format_odds(s.get('odds', 0))} ({safe_get(s, 'bookmaker')}): "
+                f"stake {s.get('stake', 0):.2f}"
+                for s in x.get('stakes', [])
+            )
+        )
+    )
+    
+    # Implied Probability Threshold
+    add_section(
+        "⚖️ Implied Probability Picks",
+        processed_data.get('predictions', []),
+        lambda x: (
+            f"{safe_get(x, 'home_team')} vs {safe_get(x, 'away_team')}\n"
+            f"  🎯 Prediction: {safe_get(x, 'prediction')}\n"
+            f"  📊 Home: {format_percentage(x.get('home_prob', 0))} | Away: {format_percentage(x.get('away_prob', 0))}"
         )
     )
     
@@ -85,7 +115,28 @@ def format_results(processed_data: Dict[str, Any]) -> str:
             f"{safe_get(x, 'home_team')} vs {safe_get(x, 'away_team')}\n"
             f"  🏆 Market: {safe_get(x, 'recommended_market')}\n"
             f"  📈 Odds: {format_odds(x.get('best_odds', 0))} | Value: {safe_get(x, 'value_rating')}"
+            + (f" ({x['edge_percentage']:+.1f}% vs fair)" if 'edge_percentage' in x else "")
         )
     )
     
+    # Cross-league value (all-leagues scan)
+    add_section(
+        "🌍 Top Value Bets Across Leagues",
+        processed_data.get('value_opportunities', []),
+        lambda x: (
+            f"[{safe_get(x, 'league_name')}] {safe_get(x, 'home_team')} vs {safe_get(x, 'away_team')}\n"
+            f"  🎯 Market: {safe_get(x, 'market')} ({safe_get(x, 'team')}) @ {format_odds(x.get('odds', 0))} ({safe_get(x, 'bookmaker')})\n"
+            f"  📈 Edge: {x.get('edge_percentage', 0):.2f}% | Fair odds: {format_odds(x.get('fair_odds', 0))}"
+        )
+    )
+
+    # Leagues an all-leagues scan had to skip
+    skipped = [
+        f"{safe_get(entry, 'name', league)} ({entry['status'].replace('_', ' ')})"
+        for league, entry in processed_data.get('league_status', {}).items()
+        if entry.get('status') != 'ok'
+    ]
+    if skipped and output:
+        output.append(f"\n⚠️ Partial results, skipped: {', '.join(skipped)}")
+
     return "\n".join(output) if output else "❌ No actionable insights found"
\ No newline at end of file
@@ -34,8 +34,20 @@ class ButtonGenerator:
             [InlineKeyboardButton("🔄 Refresh Data", callback_data="action:refresh")]
         ])
 
-    def league_selector(self):
+    def result_pages(self, page: int, total: int):
+        """Main menu with pager controls for multi-page results"""
+        nav = []
+        if page > 0:
+            nav.append(InlineKeyboardButton("◀️ Prev", callback_data=f"page:{page - 1}"))
+        nav.append(InlineKeyboardButton(f"{page + 1}/{total}", callback_data=f"page:{page}"))
+        if page < total - 1:
+            nav.append(InlineKeyboardButton("Next ▶️", callback_data=f"page:{page + 1}"))
+        return InlineKeyboardMarkup([nav, *self.main_menu().inline_keyboard])
+
+    def league_selector(self, paid_user: bool):
         buttons = self._create_grid(self.league_data.items(), 'league')
+        if paid_user:
+            buttons.append([InlineKeyboardButton("🌍 Scan All Leagues", callback_data="scan:all")])
         buttons.append([InlineKeyboardButton("🔙 Main Menu", callback_data="menu:main")])
         return InlineKeyboardMarkup(buttons)
 
@@ -47,6 +59,7 @@ class ButtonGenerator:
             ])
         
         buttons = self._create_grid(self.algorithm_data.items(), 'algo')
+        buttons.append([InlineKeyboardButton("🧮 Run All", callback_data="algo:all")])
         buttons.append([
             InlineKeyboardButton("🔙 Back", callback_data="menu:leagues"),
             InlineKeyboardButton("🏠 Home", callback_data="menu:main")
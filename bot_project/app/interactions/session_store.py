@@ -0,0 +1,156 @@
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+from config.settings import SESSION_TTL, SESSION_MAX_ENTRIES
+
+logger = logging.getLogger('OddsBot')
+
+class Session:
+    """Per-user interaction state."""
+    __slots__ = ('league', 'expires_at', 'render_key')
+
+    def __init__(self, league: str, expires_at: float):
+        self.league = league
+        self.expires_at = expires_at
+        self.render_key = None  # last rendered result, for paging
+
+class SessionStore:
+    """
+    Bounded user session map with a sliding TTL and an LRU size cap.
+    Entries are kept in recency order; since every access also extends the
+    expiry, the oldest entries are always at the front, so sweeps stop at the
+    first live one. Expiry uses wall-clock time so snapshots survive restarts.
+    """
+
+    def __init__(self, ttl: float = SESSION_TTL, max_entries: int = SESSION_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Session]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: Hashable) -> Optional[Session]:
+        """Return a live session and extend its lifetime, or None."""
+        session = self._entries.get(user_id)
+        now = time.time()
+        if session is None:
+            self.misses += 1
+            return None
+        if session.expires_at <= now:
+            del self._entries[user_id]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        session.expires_at = now + self.ttl
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return session
+
+    def set(self, user_id: Hashable, league: str) -> Session:
+        """Create or replace a session, evicting the least recently used over capacity."""
+        session = self._entries.get(user_id)
+        if session is None:
+            session = self._entries[user_id] = Session(league, time.time() + self.ttl)
+        else:
+            session.league = league
+            session.expires_at = time.time() + self.ttl
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return session
+
+    def pop(self, user_id: Hashable) -> Optional[Session]:
+        return self._entries.pop(user_id, None)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """
+        Drop expired sessions from the front of the recency order.
+        Returns: number of sessions removed
+        """
+        now = now if now is not None else time.time()
+        removed = 0
+        while self._entries:
+            user_id, session = next(iter(self._entries.items()))
+            if session.expires_at > now:
+                break
+            del self._entries[user_id]
+            removed += 1
+        self.expirations += removed
+        return removed
+
+    def snapshot(self) -> Dict[str, list]:
+        """Live sessions in recency order, as JSON-serializable data."""
+        now = time.time()
+        return {
+            'sessions': [
+                [user_id, session.league, session.expires_at]
+                for user_id, session in self._entries.items()
+                if session.expires_at > now
+            ]
+        }
+
+    def save(self, path: str, data: Optional[Dict[str, list]] = None) -> int:
+        """
+        Atomically write live sessions to path (temp file, rename). Pass a
+        snapshot() taken on the event loop when writing from another thread,
+        since the store itself is not thread-safe.
+        Returns: number of sessions written
+        """
+        if data is None:
+            data = self.snapshot()
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.sessions.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return len(data['sessions'])
+
+    def load(self, path: str) -> int:
+        """
+        Restore sessions saved by save(), skipping any that expired meanwhile.
+        Returns: number of sessions restored
+        """
+        try:
+            with open(path) as f:
+                rows = json.load(f).get('sessions', [])
+        except FileNotFoundError:
+            return 0
+        except (json.JSONDecodeError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable session snapshot {path}: {str(e)}")
+            return 0
+
+        now = time.time()
+        restored = 0
+        for user_id, league, expires_at in rows:
+            if expires_at <= now:
+                continue
+            self._entries[user_id] = Session(league, expires_at)
+            self._entries.move_to_end(user_id)
+            restored += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return restored
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'expirations': self.expirations,
+            'evictions': self.evictions
+        }
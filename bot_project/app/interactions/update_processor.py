@@ -0,0 +1,64 @@
+import asyncio
+from typing import Any, Awaitable, Dict, List, Optional
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processes up to max_concurrent_updates updates at once while keeping the
+    updates of any single user strictly in arrival order, so session state is
+    never touched by two of that user's updates at the same time.
+    PTB's own semaphore is taken before do_process_update and would let one
+    user's queued burst hold every slot while waiting on that user's lock, so
+    it is left unbounded and the limit is applied only once the lock is held.
+    """
+    __slots__ = ('_user_locks', '_limit', 'limit')
+
+    # Effectively unbounded; the real limit is self._limit
+    UNBOUNDED = 2 ** 30
+
+    def __init__(self, max_concurrent_updates: int):
+        if max_concurrent_updates < 1:
+            raise ValueError("max_concurrent_updates must be a positive integer")
+        super().__init__(self.UNBOUNDED)
+        self.limit = max_concurrent_updates
+        self._limit = asyncio.BoundedSemaphore(max_concurrent_updates)
+        # user id -> [lock, updates holding or waiting for it]
+        self._user_locks: Dict[int, List[Any]] = {}
+
+    @staticmethod
+    def _user_key(update: object) -> Optional[int]:
+        if not isinstance(update, Update):
+            return None
+        if update.effective_user is not None:
+            return update.effective_user.id
+        if update.effective_chat is not None:
+            return update.effective_chat.id
+        return None
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = self._user_key(update)
+        if key is None:
+            async with self._limit:
+                await coroutine
+            return
+
+        entry = self._user_locks.get(key)
+        if entry is None:
+            entry = self._user_locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            # asyncio.Lock wakes waiters first-in first-out
+            async with entry[0]:
+                async with self._limit:
+                    await coroutine
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._user_locks[key]
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
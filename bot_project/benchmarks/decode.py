@@ -0,0 +1,196 @@
+"""
+Check the streaming odds decoder against the json + OddsFrame.from_raw path
+and compare their parse time and peak memory.
+
+Run from bot_project/:
+    python -m benchmarks.decode
+    python -m benchmarks.decode --matches 5000 --bookmakers 40 --markets 3
+
+The payload is written to a temporary file once; each path is then timed in
+its own interpreter so its peak RSS is not masked by the other one.
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List
+
+# Settings refuse to load without these; benchmarks never talk to Telegram or the API
+for var in ("BOT_TOKEN", "SCRAPING_API_KEY", "SCRAPING_BASE_URL"):
+    os.environ.setdefault(var, "benchmark")
+
+import numpy as np
+from app.features.data_processing import preprocess_odds
+from app.features.odds_decoder import CHUNK_SIZE, OddsStreamDecoder, decode_odds
+from app.features.odds_frame import OddsFrame
+from benchmarks.synthetic import generate_odds
+
+MODES = ('json', 'stream')
+
+def frames_equal(a: OddsFrame, b: OddsFrame) -> bool:
+    return (
+        a.bookmakers == b.bookmakers
+        and np.array_equal(a.prices, b.prices, equal_nan=True)
+        and all(
+            list(getattr(a, name)) == list(getattr(b, name))
+            for name in ('match_ids', 'home_teams', 'away_teams', 'commence_times', 'leagues')
+        )
+    )
+
+def check(payload: bytes, league: str) -> List[str]:
+    """
+    Decode payload every way the bot can and report any difference.
+    Returns: list of failure descriptions (empty when all paths agree)
+    """
+    failures = []
+    reference = OddsFrame.from_raw(json.loads(payload), league=league)
+    legacy = OddsFrame.from_processed(preprocess_odds(json.loads(payload)), league=league)
+    if not frames_equal(reference, legacy):
+        failures.append('from_raw differs from preprocess_odds')
+
+    streamed = decode_odds(payload, league=league)
+    if not frames_equal(reference, streamed):
+        failures.append('stream decoder differs from from_raw')
+    if streamed.last_updates != reference.last_updates:
+        failures.append('stream decoder last_updates differ from from_raw')
+
+    # Tiny chunks split tokens, escapes and multi-byte characters
+    sample = json.dumps(json.loads(payload)[:5], ensure_ascii=False, indent=1).encode()
+    small = OddsFrame.from_raw(json.loads(sample), league=league)
+    for size in (1, 3, 7):
+        chunked = decode_odds((sample[i:i + size] for i in range(0, len(sample), size)), league=league)
+        if not frames_equal(small, chunked):
+            failures.append(f'stream decoder differs with {size}-byte chunks')
+
+    for broken in (payload[:len(payload) // 2], b'{"message": "API key is missing"}', payload + b'[]'):
+        try:
+            decode_odds(broken, league=league)
+            failures.append(f'accepted malformed payload {broken[:40]!r}')
+        except ValueError:
+            pass
+    return failures
+
+def _status_kib(field: str) -> int:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    raise ValueError(field)
+
+def _reset_peak_rss() -> int:
+    """
+    Start a fresh peak RSS window and return current RSS in KiB, so the import
+    peak does not hide parse growth. Linux only; elsewhere falls back to
+    ru_maxrss, which then only shows growth past the import peak.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return _status_kib('VmRSS')
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def _peak_rss() -> int:
+    try:
+        return _status_kib('VmHWM')
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def child(mode: str, path: str, league: str, repeat: int) -> Dict[str, float]:
+    """Decode the file repeat times with one path; runs in a fresh interpreter."""
+    def parse() -> OddsFrame:
+        with open(path, 'rb') as f:
+            if mode == 'json':
+                # What aiohttp's response.json() does: whole body, then the full tree
+                return OddsFrame.from_raw(json.loads(f.read().decode()), league=league)
+            decoder = OddsStreamDecoder(league)
+            while chunk := f.read(CHUNK_SIZE):
+                decoder.feed(chunk)
+            return decoder.close()
+
+    gc.collect()
+    rss_before = _reset_peak_rss()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frame = parse()
+        times.append(time.perf_counter() - start)
+        del frame
+        gc.collect()
+    rss_peak = _peak_rss()
+
+    tracemalloc.start()
+    parse()
+    traced_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'best_ms': min(times) * 1000,
+        'median_ms': float(np.median(times)) * 1000,
+        'rss_growth_mib': (rss_peak - rss_before) / 1024,
+        'traced_peak_mib': traced_peak / 2**20
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--matches', type=int, default=1000)
+    parser.add_argument('--bookmakers', type=int, default=40)
+    parser.add_argument('--markets', type=int, default=3, help='markets per bookmaker; only h2h is decoded')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--file', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    league = 'soccer_epl'
+    # Rejected thin matches would otherwise log a warning each
+    logging.getLogger('OddsBot').setLevel(logging.ERROR)
+
+    if args.child:
+        print(json.dumps(child(args.child, args.file, league, args.repeat)))
+        return 0
+
+    events = generate_odds(args.matches, args.bookmakers, args.markets, seed=args.seed, sport_key=league)
+    # Non-ASCII team names exercise multi-byte characters split across chunks
+    first = events[0]
+    renames = {first['home_team']: 'Bayern München', first['away_team']: 'Beşiktaş'}
+    first['home_team'], first['away_team'] = renames[first['home_team']], renames[first['away_team']]
+    for book in first['bookmakers']:
+        for market in book['markets']:
+            for outcome in market['outcomes']:
+                outcome['name'] = renames.get(outcome['name'], outcome['name'])
+    payload = json.dumps(events, ensure_ascii=False).encode()
+    del events
+
+    failures = check(payload, league)
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        return 1
+    print("Check passed: stream decoder matches from_raw and preprocess_odds")
+
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+        f.write(payload)
+        path = f.name
+    try:
+        print(f"Payload: {args.matches} matches x {args.bookmakers} bookmakers x {args.markets} markets, "
+              f"{len(payload) / 2**20:.1f} MiB")
+        print(f"{'path':<8} {'best ms':>9} {'median ms':>10} {'RSS growth MiB':>15} {'traced peak MiB':>16}")
+        for mode in MODES:
+            out = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.decode', '--child', mode, '--file', path, '--repeat', str(args.repeat)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            r = json.loads(out.strip().splitlines()[-1])
+            print(f"{mode:<8} {r['best_ms']:>9.1f} {r['median_ms']:>10.1f} {r['rss_growth_mib']:>15.1f} {r['traced_peak_mib']:>16.1f}")
+    finally:
+        os.unlink(path)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
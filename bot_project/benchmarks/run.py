@@ -0,0 +1,213 @@
+"""
+Benchmark preprocessing, every algorithm and result formatting on synthetic odds.
+
+Run from bot_project/:
+    python -m benchmarks.run                   # compare against baseline.json
+    python -m benchmarks.run --save-baseline   # record a new baseline
+    python -m benchmarks.run --scales small --threshold 0.5
+
+Baselines are machine specific; record one on the machine you compare on.
+"""
+import argparse
+import copy
+import functools
+import gc
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+# Settings refuse to load without these; benchmarks never talk to Telegram or the API
+for var in ("BOT_TOKEN", "SCRAPING_API_KEY", "SCRAPING_BASE_URL"):
+    os.environ.setdefault(var, "benchmark")
+# Keep ARIMA on the snapshot heuristic so runs don't depend on local history
+os.environ.setdefault("ODDS_HISTORY_ENABLED", "false")
+
+import numpy as np
+from app.features.data_processing import preprocess_odds
+from app.features.fair_odds import fair_odds_engine
+from app.features.odds_frame import OddsFrame
+from app.features.result_formatter import format_results
+from app.features.algorithms.arima import analyze_odds_movement
+from app.features.algorithms.demo import demo_analysis
+from app.features.algorithms.dfs import detect_arbitrage
+from app.features.algorithms.ipt import implied_probability_threshold_model
+from app.features.algorithms.kelly import calculate_parlay_stakes
+from app.features.algorithms.monte_carlo import simulate_outcomes
+from app.features.algorithms.ocm import odds_comparison_model
+from benchmarks.synthetic import generate_odds
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+# Timings below this are dominated by timer noise and never count as regressions
+NOISE_FLOOR_MS = 0.05
+
+# name: (matches, bookmakers, markets)
+SCALES = {
+    'small': (20, 10, 1),
+    'medium': (100, 30, 2),
+    'large': (500, 40, 3)
+}
+
+ALGORITHMS: Dict[str, Callable] = {
+    'arima': analyze_odds_movement,
+    'arb': detect_arbitrage,
+    'kelly': calculate_parlay_stakes,
+    'monte': functools.partial(simulate_outcomes, seed=0),
+    'ipt': implied_probability_threshold_model,
+    'value': odds_comparison_model,
+    'demo': demo_analysis
+}
+
+# A case prepares its input once (prepare), derives an untimed per-run input
+# from it (setup), then times func on that input
+Case = Tuple[Callable[[List[Dict]], object], Callable[[object], object], Callable[[object], object]]
+
+def _same(value):
+    return value
+
+def _uncached(frame: OddsFrame) -> OddsFrame:
+    """Shallow copy of a frame without its cached reductions, so they are timed too."""
+    clone = copy.copy(frame)
+    for name in ('valid', 'best_prices', 'best_columns', 'derived'):
+        clone.__dict__.pop(name, None)
+    return clone
+
+def _with_fair_odds(raw: List[Dict]) -> OddsFrame:
+    """
+    Frame with its fair odds already computed. They are worked out once per
+    snapshot and shared by every algorithm, so they are timed on their own
+    (fair_odds) rather than inside each algorithm.
+    """
+    frame = OddsFrame.from_raw(raw)
+    fair_odds_engine.get(frame)
+    return frame
+
+def _uncached_but_fair_odds(frame: OddsFrame) -> OddsFrame:
+    clone = _uncached(frame)
+    clone.derived.update(frame.derived)
+    return clone
+
+def build_cases() -> Dict[str, Case]:
+    cases: Dict[str, Case] = {
+        'preprocess_odds': (_same, _same, preprocess_odds),
+        'odds_frame': (_same, _same, OddsFrame.from_raw),
+        'fair_odds': (OddsFrame.from_raw, _uncached, fair_odds_engine.get)
+    }
+    for name, func in ALGORITHMS.items():
+        cases[f"algo:{name}"] = (_with_fair_odds, _uncached_but_fair_odds, func)
+        cases[f"format:{name}"] = (lambda raw, func=func: func(OddsFrame.from_raw(raw)), _same, format_results)
+    return cases
+
+def measure(setup: Callable, func: Callable, data: object, min_time: float, min_runs: int, max_runs: int) -> Dict[str, float]:
+    """
+    Time func over repeated runs, each on a freshly set-up input.
+    Returns: {p50_ms, p99_ms, runs, peak_kb}
+    """
+    samples = []
+    spent = 0.0
+    # As timeit does: keep collector pauses from landing in random samples
+    gc.collect()
+    gc.disable()
+    try:
+        while len(samples) < max_runs and (len(samples) < min_runs or spent < min_time):
+            arg = setup(data)
+            start = time.perf_counter()
+            func(arg)
+            elapsed = time.perf_counter() - start
+            samples.append(elapsed)
+            spent += elapsed
+    finally:
+        gc.enable()
+
+    # One extra traced run for peak memory; tracing distorts timings
+    arg = setup(data)
+    tracemalloc.start()
+    func(arg)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'p50_ms': float(np.percentile(samples, 50) * 1000),
+        'p99_ms': float(np.percentile(samples, 99) * 1000),
+        'runs': len(samples),
+        'peak_kb': peak / 1024
+    }
+
+def run(scales: List[str], min_time: float, min_runs: int, max_runs: int, seed: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    cases = build_cases()
+    for scale in scales:
+        matches, bookmakers, markets = SCALES[scale]
+        raw = generate_odds(matches, bookmakers, markets, seed=seed)
+        for case, (prepare, setup, func) in cases.items():
+            stats = measure(setup, func, prepare(raw), min_time, min_runs, max_runs)
+            stats['matches_per_s'] = matches / (stats['p50_ms'] / 1000) if stats['p50_ms'] else float('inf')
+            results[f"{scale}/{case}"] = stats
+            print(
+                f"{scale:<7} {case:<16} p50 {stats['p50_ms']:9.3f} ms  p99 {stats['p99_ms']:9.3f} ms  "
+                f"{stats['matches_per_s']:12.0f} matches/s  peak {stats['peak_kb']:9.1f} KiB",
+                flush=True
+            )
+    return results
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    """
+    Benchmarks whose p50 time or peak memory grew by more than threshold.
+    Returns: human-readable regression lines
+    """
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric in ('p50_ms', 'peak_kb'):
+            if metric == 'p50_ms' and stats[metric] < NOISE_FLOOR_MS:
+                continue
+            if base[metric] > 0 and stats[metric] > base[metric] * (1 + threshold):
+                regressions.append(
+                    f"{name} {metric}: {base[metric]:.3f} -> {stats[metric]:.3f} "
+                    f"(+{(stats[metric] / base[metric] - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', nargs='+', choices=list(SCALES), default=list(SCALES))
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='write results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.3, help='allowed relative growth (0.3 = 30%%)')
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds to spend per benchmark')
+    parser.add_argument('--min-runs', type=int, default=5)
+    parser.add_argument('--max-runs', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    logging.getLogger('OddsBot').setLevel(logging.ERROR)
+    results = run(args.scales, args.min_time, args.min_runs, args.max_runs, args.seed)
+
+    if args.save_baseline:
+        baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        baseline.update(results)
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print("No baseline found; run with --save-baseline first")
+        return 0
+
+    regressions = compare(results, json.loads(args.baseline.read_text()), args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\nNo regressions over {args.threshold:.0%}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import hashlib
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Sequence
+
+MARKETS = ('h2h', 'spreads', 'totals')
+
+TEAMS = [
+    'Arsenal', 'Aston Villa', 'Bournemouth', 'Brentford', 'Brighton', 'Chelsea',
+    'Crystal Palace', 'Everton', 'Fulham', 'Liverpool', 'Manchester City',
+    'Manchester United', 'Newcastle', 'Nottingham Forest', 'Tottenham',
+    'West Ham', 'Wolves', 'Real Madrid', 'Barcelona', 'Atletico Madrid',
+    'Bayern Munich', 'Borussia Dortmund', 'Inter', 'Juventus', 'Napoli',
+    'Paris Saint Germain', 'Marseille', 'Benfica', 'Porto', 'Ajax'
+]
+
+def generate_odds(
+    matches: int,
+    bookmakers: int,
+    markets: int = 1,
+    seed: int = 0,
+    sport_key: str = 'soccer_epl',
+    missing_rate: float = 0.05,
+    start: datetime = datetime(2026, 1, 3, 12, 30, tzinfo=timezone.utc)
+) -> List[Dict]:
+    """
+    Deterministic the-odds-api style /odds payload.
+    Each match has a true outcome distribution; every bookmaker quotes it with
+    its own margin and noise, and some bookmakers or outcomes are missing so
+    the data is as ragged as the real feed.
+    Returns: list of event dicts as decoded from the API's JSON
+    """
+    rng = random.Random(seed)
+    market_keys: Sequence[str] = MARKETS[:max(1, min(markets, len(MARKETS)))]
+    book_keys = [f"book{b:02d}" for b in range(bookmakers)]
+    events = []
+
+    for m in range(matches):
+        home, away = rng.sample(TEAMS, 2)
+        home = f"{home} {m // len(TEAMS)}" if m >= len(TEAMS) else home
+        away = f"{away} {m // len(TEAMS)}" if m >= len(TEAMS) else away
+        commence = start + timedelta(hours=3 * m + rng.randint(0, 2))
+
+        p_home = rng.uniform(0.2, 0.65)
+        p_draw = rng.uniform(0.15, min(0.32, 0.95 - p_home))
+        true_probs = {home: p_home, away: 1 - p_home - p_draw, 'Draw': p_draw}
+        spread = round(rng.uniform(-2, 2) * 2) / 2
+        total = rng.choice((1.5, 2.5, 3.5))
+
+        books = []
+        for key in book_keys:
+            if rng.random() < missing_rate:
+                continue
+            margin = rng.uniform(1.02, 1.10)
+            updated = (commence - timedelta(minutes=rng.randint(5, 600))).strftime('%Y-%m-%dT%H:%M:%SZ')
+            book_markets = []
+            for market in market_keys:
+                if market == 'h2h':
+                    outcomes = [
+                        {'name': name, 'price': round(max(1.01, rng.gauss(1, 0.015) / (p * margin)), 2)}
+                        for name, p in true_probs.items()
+                        if rng.random() >= missing_rate
+                    ]
+                elif market == 'spreads':
+                    price = lambda: round(max(1.01, 2 / margin * rng.gauss(1, 0.02)), 2)
+                    outcomes = [
+                        {'name': home, 'price': price(), 'point': spread},
+                        {'name': away, 'price': price(), 'point': -spread}
+                    ]
+                else:
+                    price = lambda: round(max(1.01, 2 / margin * rng.gauss(1, 0.02)), 2)
+                    outcomes = [
+                        {'name': 'Over', 'price': price(), 'point': total},
+                        {'name': 'Under', 'price': price(), 'point': total}
+                    ]
+                book_markets.append({'key': market, 'last_update': updated, 'outcomes': outcomes})
+            books.append({
+                'key': key,
+                'title': key.title(),
+                'last_update': updated,
+                'markets': book_markets
+            })
+
+        events.append({
+            'id': hashlib.md5(f"{seed}:{m}".encode()).hexdigest(),
+            'sport_key': sport_key,
+            'sport_title': sport_key.replace('_', ' ').title(),
+            'commence_time': commence.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'home_team': home,
+            'away_team': away,
+            'bookmakers': books
+        })
+    return events
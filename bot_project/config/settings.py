@@ -1,4 +1,5 @@
 import os
+import re
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -13,6 +14,124 @@ BOT_TOKEN = os.getenv("BOT_TOKEN")
 SCRAPING_API_KEY = os.getenv("SCRAPING_API_KEY")
 SCRAPING_BASE_URL = os.getenv("SCRAPING_BASE_URL", "https://api.the-odds-api.com/v4")
 
+# Update delivery: "polling" for local development, "webhook" when deployed
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+# Public base URL Telegram posts to; Render provides RENDER_EXTERNAL_URL
+WEBHOOK_URL = os.getenv("WEBHOOK_URL") or os.getenv("RENDER_EXTERNAL_URL")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8443"))
+MAX_CONCURRENT_UPDATES = int(os.getenv("MAX_CONCURRENT_UPDATES", "32"))
+
+# Odds cache settings
+ODDS_CACHE_TTL = float(os.getenv("ODDS_CACHE_TTL", "60"))  # seconds
+ODDS_CACHE_MAX_ENTRIES = int(os.getenv("ODDS_CACHE_MAX_ENTRIES", "64"))
+RENDER_CACHE_MAX_ENTRIES = int(os.getenv("RENDER_CACHE_MAX_ENTRIES", "256"))
+
+# Shared HTTP client settings
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "15"))  # seconds, whole request
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "20"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "60"))
+
+# Upstream odds API client
+UPSTREAM_RATE = float(os.getenv("UPSTREAM_RATE", "2"))  # requests per second, shared by all callers
+UPSTREAM_BURST = int(os.getenv("UPSTREAM_BURST", "10"))
+UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "3"))  # for timeouts, 429 and 5xx
+UPSTREAM_BACKOFF_BASE = float(os.getenv("UPSTREAM_BACKOFF_BASE", "0.5"))  # seconds, doubled per retry, full jitter
+UPSTREAM_BACKOFF_MAX = float(os.getenv("UPSTREAM_BACKOFF_MAX", "8"))
+UPSTREAM_BREAKER_THRESHOLD = int(os.getenv("UPSTREAM_BREAKER_THRESHOLD", "5"))  # consecutive failures to open
+UPSTREAM_BREAKER_RESET = float(os.getenv("UPSTREAM_BREAKER_RESET", "60"))  # seconds open before a trial request
+UPSTREAM_QUOTA_LOW = float(os.getenv("UPSTREAM_QUOTA_LOW", "0.25"))  # remaining share where intervals start to stretch
+UPSTREAM_QUOTA_RESERVE = int(os.getenv("UPSTREAM_QUOTA_RESERVE", "20"))  # credits never spent
+UPSTREAM_QUOTA_PROBE_INTERVAL = float(os.getenv("UPSTREAM_QUOTA_PROBE_INTERVAL", "3600"))  # seconds between calls at the reserve
+UPSTREAM_MAX_INTERVAL_MULTIPLIER = float(os.getenv("UPSTREAM_MAX_INTERVAL_MULTIPLIER", "8"))
+
+# Monte Carlo settings
+MONTE_CARLO_SIMULATIONS = int(os.getenv("MONTE_CARLO_SIMULATIONS", "10000"))  # max samples per market
+MONTE_CARLO_BATCH = int(os.getenv("MONTE_CARLO_BATCH", "1000"))
+MONTE_CARLO_TOLERANCE = float(os.getenv("MONTE_CARLO_TOLERANCE", "0.01"))  # CI half-width to stop at
+MONTE_CARLO_SEED = int(os.environ["MONTE_CARLO_SEED"]) if os.getenv("MONTE_CARLO_SEED") else None
+
+# Fair odds (bookmaker margin removal)
+FAIR_ODDS_METHOD = os.getenv("FAIR_ODDS_METHOD", "shin").lower()  # multiplicative | power | shin
+
+# Kelly portfolio settings
+KELLY_FRACTION = float(os.getenv("KELLY_FRACTION", "0.25"))  # share of full Kelly to stake
+KELLY_MAX_STAKE = float(os.getenv("KELLY_MAX_STAKE", "0.05"))  # per bet, share of bankroll
+KELLY_MAX_EXPOSURE = float(os.getenv("KELLY_MAX_EXPOSURE", "0.5"))  # all bets together, share of bankroll
+KELLY_MIN_EDGE = float(os.getenv("KELLY_MIN_EDGE", "0.02"))
+KELLY_SCENARIOS = int(os.getenv("KELLY_SCENARIOS", "2000"))  # sampled joint outcomes
+KELLY_SEED = int(os.getenv("KELLY_SEED", "0"))  # fixed so the same odds give the same stakes
+
+# Algorithm execution settings
+ALGORITHM_EXECUTOR = os.getenv("ALGORITHM_EXECUTOR", "thread")  # inline | thread | process
+ALGORITHM_WORKERS = int(os.getenv("ALGORITHM_WORKERS", "4"))
+ALGORITHM_TIMEOUT = float(os.getenv("ALGORITHM_TIMEOUT", "30"))  # seconds per run
+
+# Background league prefetch
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+PREFETCH_DEFAULT_INTERVAL = float(os.getenv("PREFETCH_DEFAULT_INTERVAL", "300"))  # seconds
+# Per-league overrides, e.g. "epl=120,champions=600"
+PREFETCH_INTERVALS = {
+    league.strip(): float(seconds)
+    for league, seconds in (
+        item.split("=") for item in os.getenv("PREFETCH_INTERVALS", "").split(",") if "=" in item
+    )
+}
+PREFETCH_JITTER = float(os.getenv("PREFETCH_JITTER", "30"))  # max random start delay, seconds
+PREFETCH_MAX_CALLS_PER_HOUR = int(os.getenv("PREFETCH_MAX_CALLS_PER_HOUR", "100"))
+
+# Odds history store
+ODDS_HISTORY_ENABLED = os.getenv("ODDS_HISTORY_ENABLED", "true").lower() == "true"
+ODDS_HISTORY_PATH = os.getenv("ODDS_HISTORY_PATH", str(PROJECT_ROOT / "data" / "odds_history.db"))
+ODDS_HISTORY_MAX_MB = float(os.getenv("ODDS_HISTORY_MAX_MB", "200"))
+ODDS_HISTORY_RAW_HOURS = float(os.getenv("ODDS_HISTORY_RAW_HOURS", "6"))  # keep every snapshot this long
+ODDS_HISTORY_BUCKET_MINUTES = float(os.getenv("ODDS_HISTORY_BUCKET_MINUTES", "15"))  # then one per bucket
+ODDS_HISTORY_MAX_DAYS = float(os.getenv("ODDS_HISTORY_MAX_DAYS", "14"))
+ODDS_HISTORY_COMPACT_MINUTES = float(os.getenv("ODDS_HISTORY_COMPACT_MINUTES", "30"))
+
+# ARIMA forecasting
+ARIMA_ORDER = tuple(int(x) for x in os.getenv("ARIMA_ORDER", "1,1,0").split(","))
+ARIMA_MIN_OBSERVATIONS = int(os.getenv("ARIMA_MIN_OBSERVATIONS", "12"))
+ARIMA_LOOKBACK_HOURS = float(os.getenv("ARIMA_LOOKBACK_HOURS", "48"))
+ARIMA_REFIT_EVERY = int(os.getenv("ARIMA_REFIT_EVERY", "24"))  # new observations before a warm refit
+ARIMA_TIME_BUDGET = float(os.getenv("ARIMA_TIME_BUDGET", "2.0"))  # seconds per analysis
+ARIMA_WORKERS = int(os.getenv("ARIMA_WORKERS", "4"))
+ARIMA_MAX_MODELS = int(os.getenv("ARIMA_MAX_MODELS", "2000"))
+
+# Event loop lag monitoring
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.5"))  # seconds between probes
+LOOP_LAG_WARN = float(os.getenv("LOOP_LAG_WARN", "0.2"))  # log probes slower than this
+
+# User storage
+USER_STORAGE_BACKEND = os.getenv("USER_STORAGE_BACKEND", "sqlite").lower()  # "sqlite" or "json"
+USER_DB_PATH = os.getenv("USER_DB_PATH", str(PROJECT_ROOT / "data" / "users.db"))
+USER_DB_REFRESH_INTERVAL = float(os.getenv("USER_DB_REFRESH_INTERVAL", "30"))  # seconds between role reloads (other processes' writes)
+
+# User sessions
+SESSION_TTL = float(os.getenv("SESSION_TTL", "21600"))  # seconds of inactivity before a session expires
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "50000"))
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "300"))  # seconds
+# Optional snapshot file so sessions survive restarts; empty disables it
+SESSION_SNAPSHOT_PATH = os.getenv("SESSION_SNAPSHOT_PATH", str(PROJECT_ROOT / "data" / "sessions.json"))
+
+# All-leagues scan
+LEAGUE_SCAN_CONCURRENCY = int(os.getenv("LEAGUE_SCAN_CONCURRENCY", "8"))  # leagues fetched at once
+LEAGUE_SCAN_TIMEOUT = float(os.getenv("LEAGUE_SCAN_TIMEOUT", "10"))  # seconds per league before it is skipped
+LEAGUE_SCAN_TOP = int(os.getenv("LEAGUE_SCAN_TOP", "10"))  # opportunities kept per section
+LEAGUE_SCAN_MIN_EDGE = float(os.getenv("LEAGUE_SCAN_MIN_EDGE", "0.02"))  # value bets: best price over consensus
+
+# Opportunity index
+OPPORTUNITY_INDEX_MIN_EDGE = float(os.getenv("OPPORTUNITY_INDEX_MIN_EDGE", "0.0"))  # smallest value edge kept
+
+# Metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")  # the endpoint is unauthenticated; widen deliberately
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))  # serves GET /metrics
+
 # Validate required environment variables
 required_vars = {
     "BOT_TOKEN": BOT_TOKEN,
@@ -20,6 +139,17 @@ required_vars = {
     "SCRAPING_BASE_URL": SCRAPING_BASE_URL
 }
 
+if BOT_MODE not in ("polling", "webhook"):
+    raise ValueError(f"Invalid BOT_MODE: {BOT_MODE}")
+if FAIR_ODDS_METHOD not in ("multiplicative", "power", "shin"):
+    raise ValueError(f"Invalid FAIR_ODDS_METHOD: {FAIR_ODDS_METHOD}")
+if BOT_MODE == "webhook":
+    required_vars["WEBHOOK_URL"] = WEBHOOK_URL
+    required_vars["WEBHOOK_SECRET"] = WEBHOOK_SECRET
+    # Telegram only accepts 1-256 characters of A-Z, a-z, 0-9, _ and -
+    if WEBHOOK_SECRET and not re.fullmatch(r"[A-Za-z0-9_-]{1,256}", WEBHOOK_SECRET):
+        raise ValueError("WEBHOOK_SECRET may only contain letters, digits, '_' and '-'")
+
 missing_vars = [var for var, value in required_vars.items() if not value]
 if missing_vars:
     raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
\ No newline at end of file
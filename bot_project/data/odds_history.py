@@ -0,0 +1,285 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from config.settings import (
+    ODDS_HISTORY_PATH,
+    ODDS_HISTORY_MAX_MB,
+    ODDS_HISTORY_RAW_HOURS,
+    ODDS_HISTORY_BUCKET_MINUTES,
+    ODDS_HISTORY_MAX_DAYS,
+    ODDS_HISTORY_COMPACT_MINUTES
+)
+
+logger = logging.getLogger('OddsBot')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    match_id TEXT PRIMARY KEY,
+    league TEXT NOT NULL,
+    home_team TEXT NOT NULL,
+    away_team TEXT NOT NULL,
+    commence_time TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bookmakers (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS prices (
+    match_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    bookmaker_id INTEGER NOT NULL,
+    outcome INTEGER NOT NULL,
+    price REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_prices_series ON prices (match_id, outcome, ts, price);
+CREATE INDEX IF NOT EXISTS idx_prices_ts ON prices (ts);
+"""
+
+class OddsHistoryStore:
+    """
+    Append-only SQLite (WAL) store of every fetched price snapshot.
+    Rows are (match, timestamp, bookmaker, outcome, price). Old rows are thinned
+    to one per time bucket, expired after a maximum age, and the file is kept
+    under a size budget.
+    """
+
+    def __init__(
+        self,
+        path: str = ODDS_HISTORY_PATH,
+        max_bytes: float = ODDS_HISTORY_MAX_MB * 1024 * 1024,
+        raw_retention: float = ODDS_HISTORY_RAW_HOURS * 3600,
+        bucket_seconds: float = ODDS_HISTORY_BUCKET_MINUTES * 60,
+        max_age: float = ODDS_HISTORY_MAX_DAYS * 86400,
+        compact_interval: float = ODDS_HISTORY_COMPACT_MINUTES * 60
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.raw_retention = raw_retention
+        self.bucket_seconds = bucket_seconds
+        self.max_age = max_age
+        self.compact_interval = compact_interval
+        self._lock = threading.Lock()
+        self._bookmaker_ids: Dict[str, int] = {}
+        self._last_compaction = time.time()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # auto_vacuum must be chosen before the first table exists
+        self._conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._bookmaker_ids = dict(self._conn.execute("SELECT key, id FROM bookmakers"))
+
+    def _bookmaker_id(self, key: str) -> int:
+        bookmaker_id = self._bookmaker_ids.get(key)
+        if bookmaker_id is None:
+            self._conn.execute("INSERT OR IGNORE INTO bookmakers (key) VALUES (?)", (key,))
+            bookmaker_id = self._conn.execute("SELECT id FROM bookmakers WHERE key = ?", (key,)).fetchone()[0]
+            self._bookmaker_ids[key] = bookmaker_id
+        return bookmaker_id
+
+    def record_snapshot(self, frame, fetched_at: Optional[float] = None) -> int:
+        """
+        Append every quoted price of an OddsFrame at fetched_at (default: now).
+        Blocking; call through asyncio.to_thread from the event loop.
+        Returns: number of price rows written
+        """
+        if not frame.n_matches:
+            return 0
+        ts = fetched_at if fetched_at is not None else time.time()
+        rows, cols, outcomes = np.nonzero(frame.valid)
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO matches (match_id, league, home_team, away_team, commence_time) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        (frame.match_ids[r], frame.leagues[r], frame.home_teams[r],
+                         frame.away_teams[r], frame.commence_times[r])
+                        for r in range(frame.n_matches)
+                    )
+                )
+                bookmaker_ids = [self._bookmaker_id(bm) for bm in frame.bookmakers]
+                match_ids = frame.match_ids[rows].tolist()
+                self._conn.executemany(
+                    "INSERT INTO prices (match_id, ts, bookmaker_id, outcome, price) VALUES (?, ?, ?, ?, ?)",
+                    zip(
+                        match_ids,
+                        [ts] * len(match_ids),
+                        [bookmaker_ids[c] for c in cols.tolist()],
+                        outcomes.tolist(),
+                        frame.prices[rows, cols, outcomes].tolist()
+                    )
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        if time.time() - self._last_compaction >= self.compact_interval:
+            self.compact()
+        return len(match_ids)
+
+    def get_history(
+        self,
+        match_id: str,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        outcome: Optional[int] = None
+    ) -> List[Tuple[float, str, int, float]]:
+        """
+        Price rows for one match in a time window, oldest first.
+        Returns: [(ts, bookmaker, outcome, price), ...]
+        """
+        query = (
+            "SELECT p.ts, b.key, p.outcome, p.price FROM prices p "
+            "JOIN bookmakers b ON b.id = p.bookmaker_id "
+            "WHERE p.match_id = ? AND p.ts >= ? AND p.ts <= ?"
+        )
+        params = [match_id, since if since is not None else 0.0, until if until is not None else float('inf')]
+        if outcome is not None:
+            query += " AND p.outcome = ?"
+            params.append(outcome)
+        with self._lock:
+            return self._conn.execute(query + " ORDER BY p.ts", params).fetchall()
+
+    def get_consensus_series(
+        self,
+        match_id: str,
+        outcome: int,
+        since: Optional[float] = None,
+        until: Optional[float] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Mean price across bookmakers at each snapshot time for one outcome.
+        Returns: (timestamps, prices) arrays, oldest first
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT ts, AVG(price) FROM prices WHERE match_id = ? AND outcome = ? AND ts >= ? AND ts <= ? "
+                "GROUP BY ts ORDER BY ts",
+                (match_id, outcome, since if since is not None else 0.0, until if until is not None else float('inf'))
+            ).fetchall()
+        if not rows:
+            return np.empty(0), np.empty(0)
+        data = np.array(rows, dtype=float)
+        return data[:, 0], data[:, 1]
+
+    def get_consensus_series_bulk(
+        self,
+        match_ids: List[str],
+        since: Optional[float] = None
+    ) -> Dict[Tuple[str, int], Tuple[np.ndarray, np.ndarray]]:
+        """
+        Consensus series for every outcome of many matches in one query.
+        Returns: {(match_id, outcome): (timestamps, prices)}
+        """
+        if not match_ids:
+            return {}
+        placeholders = ','.join('?' * len(match_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT match_id, outcome, ts, AVG(price) FROM prices "
+                f"WHERE match_id IN ({placeholders}) AND ts >= ? "
+                f"GROUP BY match_id, outcome, ts ORDER BY match_id, outcome, ts",
+                (*match_ids, since if since is not None else 0.0)
+            ).fetchall()
+
+        series = {}
+        start = 0
+        for end in range(1, len(rows) + 1):
+            if end == len(rows) or rows[end][:2] != rows[start][:2]:
+                data = np.array([row[2:] for row in rows[start:end]], dtype=float)
+                series[rows[start][:2]] = (data[:, 0], data[:, 1])
+                start = end
+        return series
+
+    def compact(self, now: Optional[float] = None) -> int:
+        """
+        Thin rows older than the raw retention to the last one per bucket, drop rows
+        past the maximum age, then trim the oldest data until under the size budget.
+        Returns: number of rows deleted
+        """
+        now = now if now is not None else time.time()
+        deleted = 0
+        with self._lock:
+            self._last_compaction = now
+            cursor = self._conn.execute("DELETE FROM prices WHERE ts < ?", (now - self.max_age,))
+            deleted += cursor.rowcount
+            cursor = self._conn.execute(
+                "DELETE FROM prices WHERE ts < ? AND rowid NOT IN ("
+                "  SELECT MAX(rowid) FROM prices WHERE ts < ? "
+                "  GROUP BY match_id, bookmaker_id, outcome, CAST(ts / ? AS INTEGER)"
+                ")",
+                (now - self.raw_retention, now - self.raw_retention, self.bucket_seconds)
+            )
+            deleted += cursor.rowcount
+
+            # Enforce the size budget by dropping the oldest tenth until it fits
+            while self._size_bytes() > self.max_bytes:
+                oldest = self._conn.execute(
+                    "SELECT ts FROM prices ORDER BY ts LIMIT 1 OFFSET (SELECT COUNT(*) / 10 FROM prices)"
+                ).fetchone()
+                if oldest is None:
+                    break
+                cursor = self._conn.execute("DELETE FROM prices WHERE ts <= ?", (oldest[0],))
+                deleted += cursor.rowcount
+                self._release_space()
+                if cursor.rowcount == 0:
+                    break
+
+            self._conn.execute(
+                "DELETE FROM matches WHERE match_id NOT IN (SELECT DISTINCT match_id FROM prices)"
+            )
+            self._release_space()
+
+        if deleted:
+            logger.info(f"Odds history compacted: {deleted} rows removed")
+        return deleted
+
+    def _size_bytes(self) -> int:
+        page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+        page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+        return (page_count - free_pages) * page_size
+
+    def _release_space(self) -> None:
+        self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self._conn.execute("PRAGMA incremental_vacuum")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT COUNT(*) FROM prices").fetchone()[0]
+            matches = self._conn.execute("SELECT COUNT(*) FROM matches").fetchone()[0]
+            size = self._size_bytes()
+        return {'rows': rows, 'matches': matches, 'bytes': size}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+_store: Optional[OddsHistoryStore] = None
+_store_lock = threading.Lock()
+
+def get_history_store() -> OddsHistoryStore:
+    """Shared store, opened on first use (each worker process opens its own)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = OddsHistoryStore()
+        return _store
+
+def close_history_store() -> None:
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
@@ -1,61 +1,77 @@
-import json
-import os
+from typing import Dict, List, Optional
+from config.settings import USER_STORAGE_BACKEND, USER_DB_PATH, USER_DB_REFRESH_INTERVAL
+from data.user_storage import (
+    ADMIN,
+    BLOCKED,
+    PAID,
+    JsonUserStorage,
+    SqliteUserStorage,
+    UserStorage
+)
 
 class UserManager:
     DATA_FILE = "data/user_data.json"
     CRYPTO_ADDRESS = "Hot Penis"
-    
-    def __init__(self):
-        os.makedirs(os.path.dirname(self.DATA_FILE), exist_ok=True)
-        self.data = self._load_data()
-        
-    def _load_data(self):
-        try:
-            with open(self.DATA_FILE) as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {"paid_users": [], "blocked_users": [], "admin_ids": ["YOUR_ADMIN_ID"]}
-            
-    def _save_data(self):
-        with open(self.DATA_FILE, 'w') as f:
-            json.dump(self.data, f, indent=2)
+    SAVE_DELAY = 2.0  # seconds to batch JSON mutations before writing
+
+    def __init__(self, storage: Optional[UserStorage] = None):
+        self.storage = storage if storage is not None else self._create_storage()
+
+    def _create_storage(self) -> UserStorage:
+        if USER_STORAGE_BACKEND == "json":
+            return JsonUserStorage(self.DATA_FILE, self.SAVE_DELAY)
+        if USER_STORAGE_BACKEND != "sqlite":
+            raise ValueError(f"Unknown USER_STORAGE_BACKEND: {USER_STORAGE_BACKEND}")
+        storage = SqliteUserStorage(USER_DB_PATH, refresh_interval=USER_DB_REFRESH_INTERVAL)
+        storage.migrate_from_json(self.DATA_FILE)
+        return storage
+
+    def flush(self):
+        """Persist pending changes and release the backend (called on shutdown)."""
+        self.storage.close()
 
     def is_paid(self, user_id: int) -> bool:
-        return str(user_id) in self.data["paid_users"]
-    
+        return self.storage.has_role(str(user_id), PAID)
+
     def is_blocked(self, user_id: int) -> bool:
-        return str(user_id) in self.data["blocked_users"]
-    
+        return self.storage.has_role(str(user_id), BLOCKED)
+
     def is_admin(self, user_id: int) -> bool:
-        return str(user_id) in self.data["admin_ids"]
-    
-    def add_paid_user(self, user_id: int):
-        if str(user_id) not in self.data["paid_users"]:
-            self.data["paid_users"].append(str(user_id))
-            self._save_data()
-    
+        return self.storage.has_role(str(user_id), ADMIN)
+
+    def add_paid_user(self, user_id: int, verified_by: Optional[int] = None, reference: Optional[str] = None):
+        """Grant paid access, logging who verified the payment when known."""
+        self.storage.set_role(str(user_id), PAID, True)
+        if verified_by is not None or reference is not None:
+            self.storage.record_payment(
+                str(user_id),
+                reference=reference,
+                verified_by=str(verified_by) if verified_by is not None else None
+            )
+
     def block_user(self, user_id: int):
-        if str(user_id) not in self.data["blocked_users"]:
-            self.data["blocked_users"].append(str(user_id))
-            self._save_data()
-    
+        self.storage.set_role(str(user_id), BLOCKED, True)
+
     def get_crypto_address(self) -> str:
         return self.CRYPTO_ADDRESS
     def unblock_user(self, user_id: int):
-        if str(user_id) in self.data["blocked_users"]:
-            self.data["blocked_users"].remove(str(user_id))
-            self._save_data()
+        self.storage.set_role(str(user_id), BLOCKED, False)
+
+    def get_payments(self, user_id: int) -> List[Dict]:
+        return self.storage.payments(str(user_id))
 
     def get_stats(self):
+        counts = self.storage.role_counts()
         return {
-            'total': len(self.data["paid_users"]) + len(self.data["blocked_users"]),
-            'paid': len(self.data["paid_users"]),
-            'blocked': len(self.data["blocked_users"])
+            'total': counts[PAID] + counts[BLOCKED],
+            'paid': counts[PAID],
+            'blocked': counts[BLOCKED],
+            'admins': counts[ADMIN]
         }
 
     def list_users(self):
         return {
-            'paid': self.data["paid_users"],
-            'blocked': self.data["blocked_users"],
-            'admins': self.data["admin_ids"]
-        }
\ No newline at end of file
+            'paid': self.storage.list_role(PAID),
+            'blocked': self.storage.list_role(BLOCKED),
+            'admins': self.storage.list_role(ADMIN)
+        }
@@ -0,0 +1,435 @@
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger('OddsBot')
+
+PAID = 'paid'
+BLOCKED = 'blocked'
+ADMIN = 'admin'
+ROLES = (PAID, BLOCKED, ADMIN)
+
+# Role names as stored in the legacy user_data.json
+JSON_ROLE_KEYS = {PAID: 'paid_users', BLOCKED: 'blocked_users', ADMIN: 'admin_ids'}
+
+class UserStorage(ABC):
+    """
+    Storage interface behind UserManager.
+    User ids are handled as strings; roles are one of ROLES.
+    """
+
+    @abstractmethod
+    def has_role(self, user_id: str, role: str) -> bool:
+        ...
+
+    @abstractmethod
+    def set_role(self, user_id: str, role: str, present: bool) -> bool:
+        """Grant or revoke a role. Returns: True if anything changed"""
+
+    @abstractmethod
+    def list_role(self, role: str) -> List[str]:
+        ...
+
+    @abstractmethod
+    def role_counts(self) -> Dict[str, int]:
+        """Returns: {role: number of users holding it} for every role"""
+
+    @abstractmethod
+    def record_payment(self, user_id: str, reference: Optional[str] = None, verified_by: Optional[str] = None) -> None:
+        """Log a payment verification for audit."""
+
+    @abstractmethod
+    def payments(self, user_id: str) -> List[Dict]:
+        """Returns: payment verifications for a user, oldest first"""
+
+    def flush(self) -> None:
+        """Persist anything still buffered."""
+
+    def close(self) -> None:
+        self.flush()
+
+class JsonUserStorage(UserStorage):
+    """
+    Single JSON file held in memory as set-backed role indexes.
+    Mutations are batched and written behind by a timer thread, atomically
+    (temp file, fsync, rename).
+    """
+
+    def __init__(self, path: str, save_delay: float = 2.0):
+        self.path = path
+        self.save_delay = save_delay
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = load_json_users(path)
+        # Set-backed role indexes for constant-time membership checks
+        self._roles = {role: set(map(str, data.get(JSON_ROLE_KEYS[role], []))) for role in ROLES}
+        self._payments: List[Dict] = data.get('payment_verifications', [])
+        self._lock = threading.Lock()
+        self._save_timer = None
+        self._dirty = False
+        atexit.register(self.flush)
+
+    def has_role(self, user_id: str, role: str) -> bool:
+        return user_id in self._roles[role]
+
+    def set_role(self, user_id: str, role: str, present: bool) -> bool:
+        with self._lock:
+            members = self._roles[role]
+            if (user_id in members) == present:
+                return False
+            if present:
+                members.add(user_id)
+            else:
+                members.discard(user_id)
+        self._schedule_save()
+        return True
+
+    def list_role(self, role: str) -> List[str]:
+        with self._lock:
+            return sorted(self._roles[role])
+
+    def role_counts(self) -> Dict[str, int]:
+        return {role: len(members) for role, members in self._roles.items()}
+
+    def record_payment(self, user_id: str, reference: Optional[str] = None, verified_by: Optional[str] = None) -> None:
+        with self._lock:
+            self._payments.append({
+                'user_id': user_id,
+                'reference': reference,
+                'verified_by': verified_by,
+                'verified_at': time.time()
+            })
+        self._schedule_save()
+
+    def payments(self, user_id: str) -> List[Dict]:
+        with self._lock:
+            return [dict(p) for p in self._payments if p['user_id'] == user_id]
+
+    def _schedule_save(self):
+        """Debounced background save; mutations within save_delay are batched."""
+        with self._lock:
+            self._dirty = True
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(self.save_delay, self._write)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def _write(self):
+        """Atomically replace the data file: write temp, fsync, rename."""
+        with self._lock:
+            self._save_timer = None
+            if not self._dirty:
+                return
+            self._dirty = False
+            snapshot = {JSON_ROLE_KEYS[role]: sorted(members) for role, members in self._roles.items()}
+            if self._payments:
+                snapshot['payment_verifications'] = list(self._payments)
+
+        directory = os.path.dirname(self.path) or '.'
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.user_data.', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(snapshot, f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            dir_fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        except OSError as e:
+            logger.error(f"User data save failed: {str(e)}")
+            with self._lock:
+                self._dirty = True
+
+    def flush(self) -> None:
+        with self._lock:
+            timer, self._save_timer = self._save_timer, None
+        if timer is not None:
+            timer.cancel()
+        self._write()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS user_roles (
+    user_id TEXT NOT NULL REFERENCES users (user_id),
+    role TEXT NOT NULL,
+    granted_at REAL NOT NULL,
+    PRIMARY KEY (user_id, role)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_user_roles_role ON user_roles (role, user_id);
+CREATE TABLE IF NOT EXISTS payment_verifications (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL REFERENCES users (user_id),
+    reference TEXT,
+    verified_by TEXT,
+    verified_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_payments_user ON payment_verifications (user_id, verified_at);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Statements are kept as module constants so sqlite3's per-connection
+# statement cache reuses the compiled form on every call
+_SQL_ALL_ROLES = "SELECT user_id, role FROM user_roles"
+_SQL_ADD_USER = "INSERT OR IGNORE INTO users (user_id, created_at) VALUES (?, ?)"
+_SQL_GRANT = "INSERT OR IGNORE INTO user_roles (user_id, role, granted_at) VALUES (?, ?, ?)"
+_SQL_REVOKE = "DELETE FROM user_roles WHERE user_id = ? AND role = ?"
+_SQL_LIST_ROLE = "SELECT user_id FROM user_roles WHERE role = ? ORDER BY user_id"
+_SQL_ROLE_COUNTS = "SELECT role, COUNT(*) FROM user_roles GROUP BY role"
+_SQL_ADD_PAYMENT = (
+    "INSERT INTO payment_verifications (user_id, reference, verified_by, verified_at) VALUES (?, ?, ?, ?)"
+)
+_SQL_PAYMENTS = (
+    "SELECT reference, verified_by, verified_at FROM payment_verifications "
+    "WHERE user_id = ? ORDER BY verified_at"
+)
+
+class SqliteUserStorage(UserStorage):
+    """
+    SQLite (WAL) user store shared safely by several bot processes.
+    Role checks are answered from in-memory sets, so callers on the event loop
+    never wait on the database. Mutations update those sets at once and are
+    written behind, in order, by a single writer thread; the same thread
+    reloads the sets every refresh_interval seconds to pick up other
+    processes' writes. Listings, counts and payment history are read through
+    per-thread connections.
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 5.0, refresh_interval: float = 30.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.refresh_interval = refresh_interval
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+
+        self._writer = self._connect()
+        self._writer.execute("PRAGMA journal_mode = WAL")
+        self._writer.executescript(SCHEMA)
+
+        self._writes = ThreadPoolExecutor(max_workers=1, thread_name_prefix='user-db')
+        self._roles_lock = threading.Lock()
+        self._roles = self._read_roles()
+        self._loaded_at = time.monotonic()
+        self._refreshing = False
+        self._pending = 0
+        atexit.register(self.flush)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=64
+        )
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            conn.execute("PRAGMA query_only = ON")
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    def _read_roles(self) -> Dict[str, Set[str]]:
+        roles: Dict[str, Set[str]] = {role: set() for role in ROLES}
+        with self._write_lock:
+            for user_id, role in self._writer.execute(_SQL_ALL_ROLES):
+                if role in roles:
+                    roles[role].add(user_id)
+        return roles
+
+    def _refresh(self) -> None:
+        """Writer thread: reload the role sets from the database."""
+        try:
+            roles = self._read_roles()
+        except sqlite3.Error as e:
+            logger.error(f"User roles reload failed: {str(e)}")
+            roles = None
+        with self._roles_lock:
+            self._refreshing = False
+            self._loaded_at = time.monotonic()
+            # Mutations queued meanwhile are not in what was read; keep memory until they land
+            if roles is not None and not self._pending:
+                self._roles = roles
+
+    def _maybe_refresh(self) -> None:
+        if self._refreshing or time.monotonic() - self._loaded_at < self.refresh_interval:
+            return
+        with self._roles_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        self._writes.submit(self._refresh)
+
+    def _submit(self, write: Callable[..., Any], *args: Any) -> None:
+        """Queue a database write behind the ones already pending."""
+        with self._roles_lock:
+            self._pending += 1
+        self._writes.submit(self._run_write, write, args)
+
+    def _run_write(self, write: Callable[..., Any], args: tuple) -> None:
+        try:
+            write(*args)
+        except Exception as e:
+            # Memory now disagrees with the database; the next reload settles it
+            logger.error(f"User data write failed: {str(e)}")
+        finally:
+            with self._roles_lock:
+                self._pending -= 1
+
+    def has_role(self, user_id: str, role: str) -> bool:
+        self._maybe_refresh()
+        return user_id in self._roles[role]
+
+    def set_role(self, user_id: str, role: str, present: bool) -> bool:
+        with self._roles_lock:
+            members = self._roles[role]
+            if (user_id in members) == present:
+                return False
+            if present:
+                members.add(user_id)
+            else:
+                members.discard(user_id)
+        self._submit(self._write_role, user_id, role, present)
+        return True
+
+    def _write_role(self, user_id: str, role: str, present: bool) -> None:
+        with self._write_lock:
+            if not present:
+                self._writer.execute(_SQL_REVOKE, (user_id, role))
+                return
+            self._writer.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                self._writer.execute(_SQL_ADD_USER, (user_id, now))
+                self._writer.execute(_SQL_GRANT, (user_id, role, now))
+                self._writer.execute("COMMIT")
+            except Exception:
+                self._writer.execute("ROLLBACK")
+                raise
+
+    def list_role(self, role: str) -> List[str]:
+        # Admin listings and counts are indexed queries of committed data, so
+        # they trail the in-memory sets by whatever writes are still queued
+        return [row[0] for row in self._reader().execute(_SQL_LIST_ROLE, (role,))]
+
+    def role_counts(self) -> Dict[str, int]:
+        counts = dict.fromkeys(ROLES, 0)
+        counts.update(self._reader().execute(_SQL_ROLE_COUNTS))
+        return counts
+
+    def record_payment(self, user_id: str, reference: Optional[str] = None, verified_by: Optional[str] = None) -> None:
+        self._submit(self._write_payment, user_id, reference, verified_by, time.time())
+
+    def _write_payment(self, user_id: str, reference: Optional[str], verified_by: Optional[str], verified_at: float) -> None:
+        with self._write_lock:
+            self._writer.execute("BEGIN IMMEDIATE")
+            try:
+                self._writer.execute(_SQL_ADD_USER, (user_id, verified_at))
+                self._writer.execute(_SQL_ADD_PAYMENT, (user_id, reference, verified_by, verified_at))
+                self._writer.execute("COMMIT")
+            except Exception:
+                self._writer.execute("ROLLBACK")
+                raise
+
+    def payments(self, user_id: str) -> List[Dict]:
+        return [
+            {'user_id': user_id, 'reference': reference, 'verified_by': verified_by, 'verified_at': verified_at}
+            for reference, verified_by, verified_at in self._reader().execute(_SQL_PAYMENTS, (user_id,))
+        ]
+
+    def migrate_from_json(self, json_path: str) -> int:
+        """
+        One-shot import of a legacy user_data.json; later calls are no-ops.
+        The JSON file is left in place.
+        Returns: number of role grants imported
+        """
+        with self._write_lock:
+            if self._writer.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+                return 0
+            if not os.path.exists(json_path):
+                return 0
+            data = load_json_users(json_path)
+            now = time.time()
+            grants = [
+                (str(user_id), role, now)
+                for role in ROLES
+                for user_id in data.get(JSON_ROLE_KEYS[role], [])
+            ]
+            self._writer.execute("BEGIN IMMEDIATE")
+            try:
+                self._writer.executemany(_SQL_ADD_USER, ((user_id, now) for user_id, _, _ in grants))
+                self._writer.executemany(_SQL_GRANT, grants)
+                self._writer.executemany(
+                    _SQL_ADD_PAYMENT,
+                    (
+                        (str(p['user_id']), p.get('reference'), p.get('verified_by'), p.get('verified_at', now))
+                        for p in data.get('payment_verifications', [])
+                    )
+                )
+                self._writer.execute(
+                    "INSERT INTO meta (key, value) VALUES ('json_migrated', ?)", (json_path,)
+                )
+                self._writer.execute("COMMIT")
+            except Exception:
+                self._writer.execute("ROLLBACK")
+                raise
+        self._roles = self._read_roles()
+        logger.info(f"Migrated {len(grants)} role grants from {json_path}")
+        return len(grants)
+
+    def flush(self) -> None:
+        """Wait for the queued writes to land."""
+        try:
+            self._writes.submit(lambda: None).result()
+        except RuntimeError:
+            # Already closed
+            pass
+
+    def close(self) -> None:
+        self.flush()
+        self._writes.shutdown(wait=True)
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+        with self._write_lock:
+            self._writer.close()
+
+def load_json_users(path: str) -> Dict:
+    """Read a legacy user_data.json, falling back to an empty layout."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"paid_users": [], "blocked_users": [], "admin_ids": ["YOUR_ADMIN_ID"]}
@@ -1,7 +1,9 @@
 # integrations/api_client.py
-import httpx
+import asyncio
+import aiohttp
 import logging
 from typing import Optional, Dict, Any
+from integrations.http_client import get_session
 
 logger = logging.getLogger('OddsBot')
 
@@ -13,6 +15,7 @@ async def make_request(
 ) -> Optional[Dict]:
     """
     Makes an async HTTP GET request to the specified URL.
+    Uses the shared pooled session so connections are reused between calls.
     
     Args:
         url: The URL to make the request to
@@ -23,25 +26,25 @@ async def make_request(
     Returns:
         JSON response data or None if request fails
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                url,
-                headers=headers,
-                params=params,
-                timeout=timeout
-            )
+    session = get_session()
+    try:
+        async with session.get(
+            url,
+            headers=headers,
+            params=params,
+            timeout=aiohttp.ClientTimeout(total=timeout)
+        ) as response:
             response.raise_for_status()
-            return response.json()
+            return await response.json()
             
-        except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP error {e.response.status_code} for URL: {url}")
-            return None
-            
-        except httpx.RequestError as e:
-            logger.error(f"Request error for URL {url}: {str(e)}")
-            return None
-            
-        except Exception as e:
-            logger.error(f"Unexpected error making request to {url}: {str(e)}")
-            return None
\ No newline at end of file
+    except aiohttp.ClientResponseError as e:
+        logger.error(f"HTTP error {e.status} for URL: {url}")
+        return None
+        
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.error(f"Request error for URL {url}: {str(e)}")
+        return None
+        
+    except Exception as e:
+        logger.error(f"Unexpected error making request to {url}: {str(e)}")
+        return None
@@ -0,0 +1,51 @@
+# integrations/http_client.py
+import aiohttp
+import logging
+from typing import Optional
+from config.settings import (
+    HTTP_TIMEOUT,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_POOL_LIMIT,
+    HTTP_POOL_LIMIT_PER_HOST,
+    HTTP_KEEPALIVE_TIMEOUT
+)
+
+logger = logging.getLogger('OddsBot')
+
+_session: Optional[aiohttp.ClientSession] = None
+
+def _create_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_POOL_LIMIT,
+        limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=300
+    )
+    timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT, sock_connect=HTTP_CONNECT_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    Return the shared connection-pooled session.
+    Created lazily when used outside the bot lifecycle (scripts, benchmarks).
+    Must be called from within a running event loop.
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = _create_session()
+    return _session
+
+async def start_http_session() -> None:
+    """Open the shared session. Called from the Application post-init hook."""
+    get_session()
+    logger.info(
+        f"HTTP pool started (limit={HTTP_POOL_LIMIT}, per_host={HTTP_POOL_LIMIT_PER_HOST})"
+    )
+
+async def close_http_session() -> None:
+    """Close the shared session and its pooled connections."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+        logger.info("HTTP pool closed")
+    _session = None
@@ -0,0 +1,360 @@
+# integrations/upstream_client.py
+import asyncio
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Mapping, Optional
+import aiohttp
+from integrations.http_client import get_session
+from config.settings import (
+    UPSTREAM_RATE,
+    UPSTREAM_BURST,
+    UPSTREAM_MAX_RETRIES,
+    UPSTREAM_BACKOFF_BASE,
+    UPSTREAM_BACKOFF_MAX,
+    UPSTREAM_BREAKER_THRESHOLD,
+    UPSTREAM_BREAKER_RESET,
+    UPSTREAM_QUOTA_LOW,
+    UPSTREAM_QUOTA_RESERVE,
+    UPSTREAM_QUOTA_PROBE_INTERVAL,
+    UPSTREAM_MAX_INTERVAL_MULTIPLIER
+)
+from utils.metrics import registry, upstream_requests
+
+logger = logging.getLogger('OddsBot')
+
+class UpstreamError(Exception):
+    """An upstream request that did not produce a usable response."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+class CircuitOpenError(UpstreamError):
+    """Refused without calling upstream because the circuit breaker is open."""
+
+class QuotaExhaustedError(UpstreamError):
+    """Refused because the remaining quota reached the reserve."""
+
+class TokenBucket:
+    """
+    Shared request rate limit: rate tokens per second up to capacity.
+    Waiters are served in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> float:
+        """Take one token, waiting for it if needed. Returns: seconds waited"""
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return now - started
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    @property
+    def tokens(self) -> float:
+        self._refill(time.monotonic())
+        return self._tokens
+
+class CircuitBreaker:
+    """
+    Opens after threshold consecutive failures and rejects calls for
+    reset_timeout seconds, then lets a single trial call through (half-open):
+    its success closes the circuit, its failure opens it again.
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opens = 0
+        self._opened_at: Optional[float] = None
+        # Token of the caller holding the half-open trial
+        self._trial: Optional[object] = None
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def allow(self, owner: Optional[object] = None) -> bool:
+        """Whether a call may go out; owner identifies the caller if it gets the half-open trial."""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and self._trial is None:
+            self._trial = owner if owner is not None else object()
+            return True
+        return False
+
+    def release(self, owner: object) -> None:
+        """Give back owner's half-open trial when it ended without a success or failure verdict."""
+        if self._trial is owner:
+            self._trial = None
+
+    def record_success(self) -> None:
+        if self._opened_at is not None:
+            logger.info("Upstream circuit closed")
+        self.failures = 0
+        self._opened_at = None
+        self._trial = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        half_open = self._trial is not None
+        self._trial = None
+        if half_open or (self._opened_at is None and self.failures >= self.threshold):
+            self._opened_at = time.monotonic()
+            self.opens += 1
+            logger.warning(f"Upstream circuit opened after {self.failures} failures for {self.reset_timeout:.0f}s")
+
+class QuotaTracker:
+    """
+    Remaining request credits as reported by the-odds-api headers
+    (x-requests-remaining, x-requests-used, x-requests-last).
+    """
+
+    def __init__(self, low: float, reserve: int, probe_interval: float, max_multiplier: float):
+        self.low = low
+        self.reserve = reserve
+        self.probe_interval = probe_interval
+        self.max_multiplier = max_multiplier
+        self.remaining: Optional[int] = None
+        self.used: Optional[int] = None
+        self.last_cost: Optional[int] = None
+        self._last_probe = 0.0
+
+    @staticmethod
+    def _header(headers: Mapping[str, str], name: str) -> Optional[int]:
+        try:
+            return int(float(headers[name]))
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        remaining = self._header(headers, 'x-requests-remaining')
+        if remaining is None:
+            return
+        self.remaining = remaining
+        self.used = self._header(headers, 'x-requests-used')
+        self.last_cost = self._header(headers, 'x-requests-last') or self.last_cost
+
+    def exhausted(self) -> None:
+        self.remaining = 0
+
+    @property
+    def share(self) -> Optional[float]:
+        """Remaining share of the allowance, when the headers allow computing it."""
+        if self.remaining is None or self.used is None or self.remaining + self.used <= 0:
+            return None
+        return self.remaining / (self.remaining + self.used)
+
+    def multiplier(self) -> float:
+        """
+        Factor to stretch refresh intervals by: 1 until the remaining share
+        drops below low, then growing as low / share up to max_multiplier.
+        """
+        if self.remaining is not None and self.remaining <= self.reserve:
+            return self.max_multiplier
+        share = self.share
+        if share is None or share >= self.low:
+            return 1.0
+        return min(self.max_multiplier, self.low / max(share, 1e-9))
+
+    def allow(self) -> bool:
+        """
+        Whether a call may spend credits. At the reserve only one probe per
+        probe_interval goes out, so a renewed allowance is noticed.
+        """
+        if self.remaining is None or self.remaining - (self.last_cost or 1) >= self.reserve:
+            return True
+        now = time.monotonic()
+        if now - self._last_probe >= self.probe_interval:
+            self._last_probe = now
+            return True
+        return False
+
+class UpstreamClient:
+    """
+    Single gateway to the odds API: a token bucket shared by every caller,
+    quota tracking from response headers, retries of transient failures
+    (connection errors, timeouts, 429, 5xx) with jittered exponential backoff,
+    and a circuit breaker. The request rate slows down with the quota.
+    """
+
+    def __init__(
+        self,
+        rate: float = UPSTREAM_RATE,
+        burst: int = UPSTREAM_BURST,
+        max_retries: int = UPSTREAM_MAX_RETRIES,
+        backoff_base: float = UPSTREAM_BACKOFF_BASE,
+        backoff_max: float = UPSTREAM_BACKOFF_MAX,
+        breaker: Optional[CircuitBreaker] = None,
+        quota: Optional[QuotaTracker] = None
+    ):
+        self.rate = rate
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = breaker or CircuitBreaker(UPSTREAM_BREAKER_THRESHOLD, UPSTREAM_BREAKER_RESET)
+        self.quota = quota or QuotaTracker(
+            UPSTREAM_QUOTA_LOW, UPSTREAM_QUOTA_RESERVE, UPSTREAM_QUOTA_PROBE_INTERVAL, UPSTREAM_MAX_INTERVAL_MULTIPLIER
+        )
+        self.retries = 0
+        self.rejected = 0
+
+    def interval_multiplier(self) -> float:
+        """How much longer than configured periodic refreshes should wait."""
+        return self.quota.multiplier()
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        # Full jitter keeps simultaneous retries from arriving together
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @staticmethod
+    def _retry_after(response: aiohttp.ClientResponse) -> Optional[float]:
+        try:
+            return max(0.0, float(response.headers['Retry-After']))
+        except (KeyError, ValueError):
+            return None
+
+    async def _out_of_credits(self, response: aiohttp.ClientResponse) -> bool:
+        if self.quota._header(response.headers, 'x-requests-remaining') == 0:
+            return True
+        try:
+            body = await response.json(content_type=None)
+        except (aiohttp.ClientError, ValueError):
+            return False
+        return isinstance(body, dict) and body.get('error_code') == 'OUT_OF_USAGE_CREDITS'
+
+    async def _send(self, url: str, label: str, **kwargs: Any) -> aiohttp.ClientResponse:
+        attempt = 0
+        # Identifies this call as the holder of a half-open trial it claims
+        owner = object()
+        while True:
+            # Quota first: a rejected call must not claim the half-open trial
+            if not self.quota.allow():
+                self.rejected += 1
+                raise QuotaExhaustedError(f"Upstream quota at reserve ({self.quota.remaining} left)")
+            if not self.breaker.allow(owner):
+                self.rejected += 1
+                raise CircuitOpenError("Upstream circuit open")
+
+            retry_after = None
+            resolved = False
+            try:
+                await self.bucket.acquire()
+                try:
+                    response = await get_session().get(url, **kwargs)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    upstream_requests.inc(label, 'error')
+                    self.breaker.record_failure()
+                    resolved = True
+                    error = UpstreamError(f"{type(e).__name__}: {str(e) or 'no details'}")
+                else:
+                    upstream_requests.inc(label, str(response.status))
+                    self.quota.update(response.headers)
+                    self.bucket.rate = self.rate / self.quota.multiplier()
+                    if response.status == 200:
+                        self.breaker.record_success()
+                        resolved = True
+                        return response
+
+                    status = response.status
+                    try:
+                        if status == 401 and await self._out_of_credits(response):
+                            self.quota.exhausted()
+                            raise QuotaExhaustedError("Upstream quota exhausted", status)
+                        if status != 429 and status < 500:
+                            # The request itself is wrong; upstream is healthy and retrying won't help
+                            self.breaker.record_success()
+                            resolved = True
+                            raise UpstreamError(f"HTTP {status}", status)
+                        retry_after = self._retry_after(response)
+                    finally:
+                        response.release()
+                    self.breaker.record_failure()
+                    resolved = True
+                    error = UpstreamError(f"HTTP {status}", status)
+            finally:
+                # Cancellation or quota exhaustion says nothing about upstream health
+                if not resolved:
+                    self.breaker.release(owner)
+
+            if attempt >= self.max_retries:
+                raise error
+            delay = self._backoff(attempt, retry_after)
+            attempt += 1
+            self.retries += 1
+            upstream_retries.inc(label)
+            logger.warning(f"Upstream {label or url}: {str(error)}, retry {attempt}/{self.max_retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    @asynccontextmanager
+    async def get(self, url: str, label: str = '', **kwargs: Any) -> AsyncIterator[aiohttp.ClientResponse]:
+        """
+        GET url through the shared session; kwargs go to ClientSession.get.
+        Yields the 200 response for its body to be read or streamed.
+        Raises UpstreamError (or a subclass) when no 200 response was obtained.
+        """
+        response = await self._send(url, label, **kwargs)
+        try:
+            yield response
+        finally:
+            response.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'remaining': self.quota.remaining,
+            'used': self.quota.used,
+            'multiplier': self.interval_multiplier(),
+            'circuit': self.breaker.state,
+            'circuit_opens': self.breaker.opens,
+            'retries': self.retries,
+            'rejected': self.rejected,
+            'tokens': self.bucket.tokens
+        }
+
+upstream_retries = registry.counter(
+    'betsage_upstream_retries_total',
+    'Odds API requests retried after a transient failure',
+    ('league',)
+)
+
+# Shared client for every odds API call
+upstream_client = UpstreamClient()
+
+registry.callback(
+    'betsage_upstream_quota_remaining',
+    'Odds API credits left as last reported by upstream',
+    'gauge',
+    lambda: {} if upstream_client.quota.remaining is None else {(): upstream_client.quota.remaining}
+)
+registry.callback(
+    'betsage_upstream_circuit_open',
+    'Whether the odds API circuit breaker currently rejects calls',
+    'gauge',
+    lambda: {(): 1 if upstream_client.breaker.state == CircuitBreaker.OPEN else 0}
+)
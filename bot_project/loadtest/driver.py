@@ -0,0 +1,144 @@
+"""
+Fire concurrent process_pipeline runs at the fake odds API and report
+end-to-end latency, upstream calls and error rates.
+
+Run from bot_project/:
+    python -m loadtest.driver --runs 500 --concurrency 50
+    python -m loadtest.driver --url http://127.0.0.1:8081 --cache-ttl 0
+
+Without --url an in-process fake API is started with the given latency and
+error settings.
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from typing import Dict, List
+
+# Settings refuse to load without these; the driver never talks to Telegram
+for var in ("BOT_TOKEN", "SCRAPING_API_KEY", "SCRAPING_BASE_URL"):
+    os.environ.setdefault(var, "loadtest")
+# Don't mix load-test snapshots into the local odds history
+os.environ.setdefault("ODDS_HISTORY_ENABLED", "false")
+
+import aiohttp
+import numpy as np
+from app.features.data_processing import process_pipeline
+from app.features.executor import algorithm_executor
+from app.features.odds_cache import odds_cache
+from app.interactions.league_selection import LeagueManager
+from integrations.http_client import close_http_session
+from loadtest.fake_api import FakeOddsApi, start_server
+
+ALGORITHMS = ('arima', 'arb', 'kelly', 'monte', 'ipt', 'value')
+
+async def drive(base_url: str, runs: int, concurrency: int, leagues: List[str], algorithms: List[str], paid: bool) -> Dict:
+    """
+    Run the pipeline runs times with at most concurrency in flight, cycling
+    through the league and algorithm combinations.
+    Returns: {latencies, outcomes, errors, wall}
+    """
+    combos = itertools.cycle(itertools.product(leagues, algorithms))
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    outcomes = Counter()
+    errors = Counter()
+
+    async def one(league_key: str, algorithm: str) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            results = await process_pipeline(
+                api_key='loadtest',
+                base_url=base_url,
+                league_key=LeagueManager.get_api_key(league_key),
+                algorithm=algorithm,
+                paid_user=paid
+            )
+            latencies.append(time.perf_counter() - start)
+            if 'error' in results:
+                outcomes['error'] += 1
+                errors[str(results['error'])] += 1
+            else:
+                outcomes['ok'] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(*next(combos)) for _ in range(runs)))
+    return {'latencies': latencies, 'outcomes': outcomes, 'errors': errors, 'wall': time.perf_counter() - start}
+
+async def upstream_stats(base_url: str) -> Dict:
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"{base_url.rstrip('/')}/stats") as response:
+                return await response.json()
+    except aiohttp.ClientError:
+        return {}
+
+def report(result: Dict, upstream: Dict) -> None:
+    latencies = np.array(result['latencies']) * 1000
+    runs = len(latencies)
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    errors = result['outcomes']['error']
+    cache = odds_cache.stats()
+
+    print(f"Runs:        {runs} in {result['wall']:.2f} s ({runs / result['wall']:.1f} runs/s)")
+    print(f"Latency:     p50 {p50:.1f} ms | p90 {p90:.1f} ms | p99 {p99:.1f} ms | max {latencies.max():.1f} ms")
+    print(f"Errors:      {errors} ({errors / runs:.1%})")
+    for message, count in result['errors'].most_common(5):
+        print(f"  {count:>6} x {message}")
+    print(f"Odds cache:  {cache['hits']} hits | {cache['misses']} misses | {cache['coalesced']} coalesced")
+    print(f"Executor:    {algorithm_executor.mode}")
+    if upstream:
+        print(f"Upstream:    {upstream['requests']} calls | responses {upstream['responses']} | "
+              f"quota used {upstream['quota_used']}")
+
+async def run(args) -> int:
+    # Failures are tallied in the report instead of logged one by one
+    logging.getLogger('OddsBot').setLevel(logging.CRITICAL)
+    runner = None
+    base_url = args.url
+    if base_url is None:
+        api = FakeOddsApi(
+            latency=args.latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+            rate_limit_rate=args.rate_limit_rate,
+            quota=args.quota,
+            seed=args.seed
+        )
+        runner, base_url = await start_server(api)
+    if args.cache_ttl is not None:
+        odds_cache.ttl = args.cache_ttl
+
+    try:
+        result = await drive(base_url, args.runs, args.concurrency, args.leagues, args.algorithms, not args.free)
+        report(result, await upstream_stats(base_url))
+    finally:
+        await close_http_session()
+        algorithm_executor.shutdown()
+        if runner is not None:
+            await runner.cleanup()
+    return 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='base URL of a running fake API (default: start one in-process)')
+    parser.add_argument('--runs', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--leagues', nargs='+', default=list(LeagueManager.LEAGUE_DB), choices=list(LeagueManager.LEAGUE_DB))
+    parser.add_argument('--algorithms', nargs='+', default=list(ALGORITHMS), choices=[*ALGORITHMS, 'all'])
+    parser.add_argument('--free', action='store_true', help='run as an unpaid user (demo analysis)')
+    parser.add_argument('--cache-ttl', type=float, help='override ODDS_CACHE_TTL; 0 sends every run upstream')
+    parser.add_argument('--latency', type=float, default=0.1)
+    parser.add_argument('--jitter', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--quota', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    return asyncio.run(run(parser.parse_args(argv)))
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""
+Local stand-in for the-odds-api /sports/{league}/odds endpoint.
+
+Run from bot_project/:
+    python -m loadtest.fake_api --port 8081 --latency 0.15 --error-rate 0.02
+
+then point the bot at it with SCRAPING_BASE_URL=http://127.0.0.1:8081.
+Payloads come from benchmarks.synthetic and prices drift over time, so each
+league looks like a live market. GET /stats returns the request counters.
+"""
+import argparse
+import asyncio
+import copy
+import math
+import random
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from aiohttp import web
+from benchmarks.synthetic import MARKETS, generate_odds
+
+class FakeOddsApi:
+    """
+    Serves synthetic odds with configurable latency, failures and quota.
+    Each request costs one credit per requested market, and the-odds-api quota
+    headers are returned with every response.
+    """
+
+    def __init__(
+        self,
+        matches: int = 30,
+        bookmakers: int = 30,
+        latency: float = 0.1,
+        jitter: float = 0.05,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        quota: int = 500,
+        drift: float = 0.01,
+        drift_interval: float = 5.0,
+        update_rate: float = 0.3,
+        seed: int = 0
+    ):
+        self.matches = matches
+        self.bookmakers = bookmakers
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.quota = quota
+        self.drift = drift
+        self.drift_interval = drift_interval
+        self.update_rate = update_rate
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.used = 0
+        self.requests = Counter()
+        self.responses = Counter()
+        self._leagues: Dict[str, List[Dict]] = {}
+        self._drift_task: Optional[asyncio.Task] = None
+
+    def league(self, league_key: str) -> List[Dict]:
+        """Current payload for a league, generated on first request."""
+        events = self._leagues.get(league_key)
+        if events is None:
+            seed = self.seed * 1000 + sum(map(ord, league_key))
+            events = generate_odds(self.matches, self.bookmakers, len(MARKETS), seed=seed, sport_key=league_key)
+            self._leagues[league_key] = events
+        return events
+
+    def drift_prices(self) -> int:
+        """
+        Random-walk the h2h prices of a share of bookmakers in every league and
+        stamp their last_update, like a live feed.
+        Returns: number of bookmaker quotes that changed
+        """
+        now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        changed = 0
+        for events in self._leagues.values():
+            for event in events:
+                for book in event['bookmakers']:
+                    if self.rng.random() >= self.update_rate:
+                        continue
+                    for market in book['markets']:
+                        if market['key'] != 'h2h':
+                            continue
+                        for outcome in market['outcomes']:
+                            step = math.exp(self.rng.gauss(0, self.drift))
+                            outcome['price'] = round(max(1.01, outcome['price'] * step), 2)
+                        market['last_update'] = now
+                    book['last_update'] = now
+                    changed += 1
+        return changed
+
+    async def _drift_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.drift_interval)
+            self.drift_prices()
+
+    def _headers(self, cost: int) -> Dict[str, str]:
+        return {
+            'x-requests-used': str(self.used),
+            'x-requests-remaining': str(max(0, self.quota - self.used)),
+            'x-requests-last': str(cost)
+        }
+
+    def _reply(self, status: int, body, headers: Dict[str, str]) -> web.Response:
+        self.responses[status] += 1
+        return web.json_response(body, status=status, headers=headers)
+
+    async def handle_odds(self, request: web.Request) -> web.Response:
+        league_key = request.match_info['league']
+        self.requests[league_key] += 1
+        await asyncio.sleep(self.latency + (self.rng.expovariate(1 / self.jitter) if self.jitter > 0 else 0))
+
+        if not request.query.get('apiKey'):
+            return self._reply(401, {'message': 'API key is missing'}, self._headers(0))
+
+        requested = [m for m in request.query.get('markets', 'h2h').split(',') if m in MARKETS]
+        cost = max(1, len(requested))
+        if self.used + cost > self.quota:
+            return self._reply(401, {'message': 'Usage quota has been reached', 'error_code': 'OUT_OF_USAGE_CREDITS'}, self._headers(0))
+
+        roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            return self._reply(429, {'message': 'Too many requests', 'error_code': 'EXCEEDED_FREQ_LIMIT'}, self._headers(0))
+        if roll < self.rate_limit_rate + self.error_rate:
+            return self._reply(500, {'message': 'Internal server error'}, self._headers(0))
+
+        self.used += cost
+        events = copy.deepcopy(self.league(league_key))
+        for event in events:
+            for book in event['bookmakers']:
+                book['markets'] = [m for m in book['markets'] if m['key'] in requested]
+        return self._reply(200, events, self._headers(cost))
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    def stats(self) -> Dict:
+        return {
+            'requests': sum(self.requests.values()),
+            'by_league': dict(self.requests),
+            'responses': {str(status): count for status, count in self.responses.items()},
+            'quota_used': self.used,
+            'quota_remaining': max(0, self.quota - self.used)
+        }
+
+    async def _on_startup(self, app: web.Application) -> None:
+        if self.drift > 0:
+            self._drift_task = asyncio.create_task(self._drift_loop())
+
+    async def _on_cleanup(self, app: web.Application) -> None:
+        if self._drift_task is not None:
+            self._drift_task.cancel()
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        # Served with and without the /v4 prefix of the real API
+        app.router.add_get('/sports/{league}/odds', self.handle_odds)
+        app.router.add_get('/v4/sports/{league}/odds', self.handle_odds)
+        app.router.add_get('/stats', self.handle_stats)
+        app.on_startup.append(self._on_startup)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+async def start_server(api: FakeOddsApi, host: str = '127.0.0.1', port: int = 0) -> Tuple[web.AppRunner, str]:
+    """
+    Start the fake API in the running loop; port 0 picks a free port.
+    Returns: (runner to clean up, base URL to use as SCRAPING_BASE_URL)
+    """
+    runner = web.AppRunner(api.make_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = runner.addresses[0][1]
+    return runner, f"http://{host}:{bound_port}"
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--matches', type=int, default=30, help='matches per league')
+    parser.add_argument('--bookmakers', type=int, default=30)
+    parser.add_argument('--latency', type=float, default=0.1, help='base response delay, seconds')
+    parser.add_argument('--jitter', type=float, default=0.05, help='mean extra exponential delay, seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of 500 responses')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='share of 429 responses')
+    parser.add_argument('--quota', type=int, default=500, help='credits before 401 OUT_OF_USAGE_CREDITS')
+    parser.add_argument('--drift', type=float, default=0.01, help='log-price step size per drift tick')
+    parser.add_argument('--drift-interval', type=float, default=5.0, help='seconds between drift ticks')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    api = FakeOddsApi(
+        matches=args.matches,
+        bookmakers=args.bookmakers,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        quota=args.quota,
+        drift=args.drift,
+        drift_interval=args.drift_interval,
+        seed=args.seed
+    )
+    print(f"Fake odds API on http://{args.host}:{args.port} (SCRAPING_BASE_URL)")
+    web.run_app(api.make_app(), host=args.host, port=args.port, access_log=None, print=None)
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,48 @@
+import asyncio
+import functools
 import logging
+import time
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.error import BadRequest
 from telegram.ext import ApplicationBuilder, ContextTypes, CallbackQueryHandler, CommandHandler, MessageHandler, filters
 from data.user_manager import UserManager
+from data.odds_history import close_history_store
 from app.features.odds_fetcher import fetch_odds_for_league
-from app.features.data_processing import preprocess_odds, process_pipeline
+from app.features.data_processing import ALL_ALGORITHMS, preprocess_odds, process_pipeline
+from app.features.odds_cache import odds_cache
+from app.features.executor import algorithm_executor
+from app.features.league_scan import scan_all_leagues
+from app.features.opportunity_index import opportunity_index
+from app.features.prefetch import PrefetchScheduler
+from app.features.render_cache import paginate, render_cache
 from app.features.result_formatter import format_results
 from app.interactions.league_selection import LeagueManager
 from app.interactions.inline_buttons import ButtonGenerator
-from config.settings import BOT_TOKEN, SCRAPING_API_KEY, SCRAPING_BASE_URL
+from app.interactions.session_store import SessionStore
+from app.interactions.update_processor import PerUserUpdateProcessor
+from integrations.http_client import start_http_session, close_http_session
+from integrations.upstream_client import upstream_client
+from config.settings import (
+    BOT_MODE,
+    MAX_CONCURRENT_UPDATES,
+    PORT,
+    WEBHOOK_LISTEN,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL,
+    METRICS_ENABLED,
+    METRICS_HOST,
+    METRICS_PORT,
+    BOT_TOKEN,
+    SCRAPING_API_KEY,
+    SCRAPING_BASE_URL,
+    PREFETCH_ENABLED,
+    SESSION_SNAPSHOT_PATH,
+    SESSION_SWEEP_INTERVAL
+)
 from utils.logger import setup_logging
+from utils.loop_monitor import loop_monitor
+from utils.metrics import analyses, errors, registry, stage_seconds, start_metrics_server, stop_metrics_server
 
 # Import algorithms directly from their modules
 from app.features.algorithms.arima import analyze_odds_movement
@@ -26,7 +59,69 @@ class OddsBot:
         self.buttons = ButtonGenerator()
         self.league_manager = LeagueManager()
         self.user_manager = UserManager()
-        self.user_sessions = {}
+        self.sessions = SessionStore()
+        self.active_runs = {}  # user_id -> running analysis task
+        self.prefetcher = PrefetchScheduler(SCRAPING_API_KEY, SCRAPING_BASE_URL)
+
+    async def post_init(self, application):
+        """Acquire shared resources once the application is running"""
+        await start_http_session()
+        loop_monitor.start()
+        if SESSION_SNAPSHOT_PATH:
+            restored = await asyncio.to_thread(self.sessions.load, SESSION_SNAPSHOT_PATH)
+            logger.info(f"Restored {restored} user sessions")
+        application.job_queue.run_repeating(
+            self._sweep_sessions,
+            interval=SESSION_SWEEP_INTERVAL,
+            first=SESSION_SWEEP_INTERVAL,
+            name="session_sweep"
+        )
+        if PREFETCH_ENABLED:
+            self.prefetcher.start(application.job_queue)
+        if METRICS_ENABLED:
+            self._register_metrics()
+            await start_metrics_server(METRICS_HOST, METRICS_PORT)
+
+    def _register_metrics(self):
+        """Expose bot state read at scrape time"""
+        registry.callback(
+            'betsage_active_sessions', 'Live user sessions', 'gauge',
+            lambda: {(): len(self.sessions)}
+        )
+        registry.callback(
+            'betsage_active_analyses', 'Analyses currently running', 'gauge',
+            lambda: {(): len(self.active_runs)}
+        )
+
+    async def post_shutdown(self, application):
+        """Release shared resources on shutdown"""
+        await loop_monitor.stop()
+        await stop_metrics_server()
+        algorithm_executor.shutdown()
+        await close_http_session()
+        close_history_store()
+        self.user_manager.flush()
+        await self._save_sessions()
+
+    async def _sweep_sessions(self, context: ContextTypes.DEFAULT_TYPE):
+        """Periodically drop expired sessions and started matches' opportunities, and refresh the snapshot"""
+        removed = self.sessions.sweep()
+        if removed:
+            logger.info(f"Swept {removed} expired sessions")
+        pruned = opportunity_index.prune(time.time())
+        if pruned:
+            logger.info(f"Pruned {pruned} opportunities on matches already started")
+        await self._save_sessions()
+
+    async def _save_sessions(self):
+        if not SESSION_SNAPSHOT_PATH:
+            return
+        try:
+            # Snapshot on the loop, where handlers mutate sessions; only the file write goes to a thread
+            data = self.sessions.snapshot()
+            await asyncio.to_thread(self.sessions.save, SESSION_SNAPSHOT_PATH, data)
+        except OSError as e:
+            logger.error(f"Session snapshot failed: {str(e)}")
 
     async def handle_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         query = update.callback_query
@@ -35,7 +130,7 @@ class OddsBot:
             await query.edit_message_text(
                 "⚽ Welcome to OddsAnalyst Bot!\n"
                 "Start by selecting a league:",
-                reply_markup=self.buttons.league_selector()
+                reply_markup=self.buttons.league_selector(self.user_manager.is_paid(query.from_user.id))
             )
         else:
             user_id = update.effective_user.id
@@ -68,7 +163,8 @@ class OddsBot:
 
         try:
             target_user = int(context.args[0])
-            self.user_manager.add_paid_user(target_user)
+            reference = context.args[1] if len(context.args) > 1 else None
+            self.user_manager.add_paid_user(target_user, verified_by=user_id, reference=reference)
             await update.message.reply_text(f"✅ User {target_user} activated")
             await context.bot.send_message(
                 chat_id=target_user,
@@ -99,6 +195,9 @@ class OddsBot:
             user_id = query.from_user.id
             action, *values = query.data.split(':')
 
+            # Any new interaction means the user left the analysis screen
+            self._cancel_run(user_id)
+
             # Add admin handler check
             if action == 'admin' and self.user_manager.is_admin(user_id):
                 await self._handle_admin_actions(query, context, values)
@@ -111,7 +210,9 @@ class OddsBot:
                 'algo': self.handle_algorithm_selection,
                 'help': self.show_help,
                 'tool': self._handle_tool,
-                'action': self._handle_action
+                'action': self._handle_action,
+                'page': self._handle_page,
+                'scan': self._handle_scan
             }
 
             if handler := handler_map.get(action):
@@ -155,7 +256,7 @@ class OddsBot:
                 action = context.user_data.pop('admin_action')
 
                 if action == 'verify':
-                    self.user_manager.add_paid_user(target_id)
+                    self.user_manager.add_paid_user(target_id, verified_by=user_id)
                     msg = f"✅ Verified user {target_id}"
                 elif action == 'block':
                     self.user_manager.block_user(target_id)
@@ -185,12 +286,32 @@ class OddsBot:
     async def _show_admin_stats(self, query):
         """Display admin statistics"""
         stats = self.user_manager.get_stats()
+        cache_stats = odds_cache.stats()
+        lag_stats = loop_monitor.stats()
+        prefetch_stats = self.prefetcher.stats()
+        session_stats = self.sessions.stats()
+        render_stats = render_cache.stats()
+        upstream_stats = upstream_client.stats()
+        remaining = upstream_stats['remaining']
         text = (
             "📊 Bot Statistics\n\n"
             f"👤 Total users: {stats['total']}\n"
             f"💎 Paid users: {stats['paid']}\n"
             f"🚫 Blocked users: {stats['blocked']}\n"
-            f"🛠️ Admins: {len(self.user_manager.data['admin_ids'])}"
+            f"🛠️ Admins: {stats['admins']}\n\n"
+            f"🗄️ Odds cache: {cache_stats['hits']} hits | {cache_stats['misses']} misses | "
+            f"{cache_stats['coalesced']} coalesced | {cache_stats['entries']} entries\n"
+            f"🖨️ Render cache: {render_stats['hits']} hits | {render_stats['misses']} misses | "
+            f"{render_stats['entries']} entries\n"
+            f"⏱️ Loop lag: p50 {lag_stats['p50_ms']:.1f} ms | p99 {lag_stats['p99_ms']:.1f} ms | "
+            f"max {lag_stats['max_ms']:.1f} ms\n"
+            f"⚙️ Executor: {algorithm_executor.mode} ({len(self.active_runs)} running)\n"
+            f"🔁 Prefetch: {prefetch_stats['refreshed']} refreshed | {prefetch_stats['skipped']} skipped | "
+            f"{prefetch_stats['calls_last_hour']}/{self.prefetcher.max_calls_per_hour} calls this hour\n"
+            f"🌐 Upstream: {'?' if remaining is None else remaining} credits left | circuit {upstream_stats['circuit']} | "
+            f"intervals x{upstream_stats['multiplier']:.1f} | {upstream_stats['retries']} retries\n"
+            f"🧾 Sessions: {session_stats['entries']} live | {session_stats['hits']} hits | "
+            f"{session_stats['expirations']} expired | {session_stats['evictions']} evicted"
         )
         await query.edit_message_text(text, reply_markup=self.buttons.admin_menu())
 
@@ -212,7 +333,7 @@ class OddsBot:
         if menu_action == 'leagues':
             await query.edit_message_text(
                 "⚽ Select a league:",
-                reply_markup=self.buttons.league_selector()
+                reply_markup=self.buttons.league_selector(self.user_manager.is_paid(query.from_user.id))
             )
         elif menu_action == 'help':
             await self.show_help(query, context, values)
@@ -234,16 +355,24 @@ class OddsBot:
             await self.show_error(query, "Invalid action")
 
     async def _handle_refresh(self, query, context):
-        """Handle data refresh requests"""
-        await query.edit_message_text(
-            "🔄 Refreshing data...",
-            reply_markup=self.buttons.main_menu()
-        )
-        # Add data refresh logic here
+        """Refresh the selected league immediately through the prefetch scheduler"""
+        session = self.sessions.get(query.from_user.id)
+        league_key = session.league if session else None
+        if not league_key:
+            return await self.show_error(query, "Select a league first")
+
         await query.edit_message_text(
-            "✅ Data refreshed successfully!",
+            f"🔄 Refreshing {self.league_manager.get_display_name(league_key)}...",
             reply_markup=self.buttons.main_menu()
         )
+        frame = await self.prefetcher.refresh(league_key)
+        if frame:
+            await query.edit_message_text(
+                f"✅ Data refreshed successfully! ({frame.n_matches} matches)",
+                reply_markup=self.buttons.main_menu()
+            )
+        else:
+            await self.show_error(query, "Refresh unavailable, try again later")
 
     async def _handle_tool(self, query, context, values):
         """Modified tool handler"""
@@ -310,54 +439,217 @@ class OddsBot:
 
     async def handle_algorithm_selection(self, query, context, values):
         """Process algorithm selection and execute analysis"""
+        started = time.perf_counter()
         user_id = query.from_user.id
         paid_status = self.user_manager.is_paid(user_id)
-        algorithm = values[0]
+        algorithm = values[0] if values else ''
 
-        if not (session := self.user_sessions.get(user_id)):
+        # Callback data comes from the client: only known algorithms may become metric labels
+        if algorithm not in self.buttons.algorithm_data and algorithm not in (ALL_ALGORITHMS, 'demo'):
+            return await self.show_error(query, "Unknown algorithm")
+
+        if not (session := self.sessions.get(user_id)):
             return await self.show_error(query, "Session expired")
 
-        league_key = session.get('league')
+        league_key = session.league
         if not league_key:
             return await self.show_error(query, "No league selected")
 
         try:
-            # Get payment status
-            paid_user = self.user_manager.is_paid(user_id)
-
             # Get API-compatible league identifier
             api_league_key = self.league_manager.get_api_key(league_key)
             if not api_league_key:
                 raise ValueError("Invalid league mapping")
 
+            # Serve an identical earlier render of the current snapshot straight away
+            odds_key = odds_cache.make_key(api_league_key)
+            version = odds_cache.version(odds_key)
+            if version is not None:
+                render_key = render_cache.make_key(odds_key, algorithm.lower(), version, paid_status)
+                if pages := render_cache.get(render_key):
+                    session.render_key = render_key
+                    text, markup = pages[0]
+                    with stage_seconds.time('telegram', api_league_key, algorithm):
+                        await query.edit_message_text(text, reply_markup=markup)
+                    stage_seconds.observe(time.perf_counter() - started, 'total', api_league_key, algorithm)
+                    analyses.inc(api_league_key, algorithm, 'cached')
+                    return
+
             # Update user with processing status
             progress_msg = await query.edit_message_text(
                 f"⚙️ Processing {self.league_manager.get_display_name(league_key)}...\n"
                 f"Algorithm: {algorithm.upper()}"
             )
 
-            # Execute full processing pipeline
-            results = await process_pipeline(
-                api_key=SCRAPING_API_KEY,
-                base_url=SCRAPING_BASE_URL,
-                league_key=api_league_key,
-                algorithm=algorithm.lower(),
-                paid_user=paid_status
+            # Run the analysis in the background so other updates keep flowing
+            task = asyncio.create_task(
+                self._run_analysis(query, progress_msg, session, league_key, api_league_key, algorithm, paid_status, started)
             )
+            self.active_runs[user_id] = task
+            task.add_done_callback(functools.partial(self._forget_run, user_id))
+
+        except Exception as e:
+            errors.inc('handler')
+            logger.error(f"Algorithm error: {str(e)}", exc_info=True)
+            await self.show_error(query, f"Analysis failed: {str(e)}")
+
+    async def _run_analysis(self, query, progress_msg, session, league_key, api_league_key, algorithm, paid_status, started):
+        """Execute the processing pipeline and display its results"""
+        try:
+            odds_key = odds_cache.make_key(api_league_key)
+            version_before = odds_cache.version(odds_key)
+
+            # Execute full processing pipeline
+            with stage_seconds.time('pipeline', api_league_key, algorithm):
+                results = await process_pipeline(
+                    api_key=SCRAPING_API_KEY,
+                    base_url=SCRAPING_BASE_URL,
+                    league_key=api_league_key,
+                    algorithm=algorithm.lower(),
+                    paid_user=paid_status
+                )
 
             # Format and display results
-            formatted = format_results(results)
-            await progress_msg.edit_text(
-                f"🏆 {self.league_manager.get_display_name(league_key)} Results\n"
-                f"📊 Method: {algorithm.upper()}\n\n"
-                f"{formatted}",
-                reply_markup=self.buttons.main_menu()
-            )
+            with stage_seconds.time('format', api_league_key, algorithm):
+                formatted = format_results(results)
+                pages = self._render_pages(
+                    f"🏆 {self.league_manager.get_display_name(league_key)} Results\n"
+                    f"📊 Method: {algorithm.upper()}\n\n"
+                    f"{formatted}"
+                )
+
+            # Share the render only if it is known to come from the current snapshot;
+            # otherwise keep it for this user only so its pages can still be browsed
+            version = odds_cache.version(odds_key)
+            if 'error' not in results and version is not None and version_before in (None, version):
+                render_key = render_cache.make_key(odds_key, algorithm.lower(), version, paid_status)
+            else:
+                render_key = render_cache.make_key(('analysis', query.from_user.id), algorithm.lower(), 0, paid_status)
+            render_cache.put(render_key, pages)
+            session.render_key = render_key
+
+            text, markup = pages[0]
+            with stage_seconds.time('telegram', api_league_key, algorithm):
+                await progress_msg.edit_text(text, reply_markup=markup)
+            stage_seconds.observe(time.perf_counter() - started, 'total', api_league_key, algorithm)
+            analyses.inc(api_league_key, algorithm, 'error' if 'error' in results else 'ok')
+
+        except asyncio.CancelledError:
+            analyses.inc(api_league_key, algorithm, 'cancelled')
+            logger.info(f"Analysis cancelled: {algorithm} on {league_key}")
+            raise
 
         except Exception as e:
+            analyses.inc(api_league_key, algorithm, 'failed')
+            errors.inc('handler')
             logger.error(f"Algorithm error: {str(e)}", exc_info=True)
             await self.show_error(query, f"Analysis failed: {str(e)}")
 
+    async def _handle_scan(self, query, context, values):
+        """Scan every league at once and rank the best opportunities across them"""
+        started = time.perf_counter()
+        user_id = query.from_user.id
+        if not self.user_manager.is_paid(user_id):
+            return await self._handle_demo_analysis(query)
+
+        session = self.sessions.get(user_id) or self.sessions.set(user_id, None)
+
+        # Serve an earlier scan of exactly the current snapshots
+        render_key = self._scan_render_key()
+        if render_key is not None and (pages := render_cache.get(render_key)):
+            session.render_key = render_key
+            text, markup = pages[0]
+            await query.edit_message_text(text, reply_markup=markup)
+            analyses.inc('all', 'scan', 'cached')
+            return
+
+        progress_msg = await query.edit_message_text(
+            f"🌍 Scanning {len(LeagueManager.LEAGUE_DB)} leagues..."
+        )
+        task = asyncio.create_task(self._run_scan(query, progress_msg, session, render_key, started))
+        self.active_runs[user_id] = task
+        task.add_done_callback(functools.partial(self._forget_run, user_id))
+
+    def _scan_render_key(self):
+        """Render cache key of a scan over the cached snapshots, or None if a league isn't cached"""
+        versions = tuple(
+            odds_cache.version(odds_cache.make_key(self.league_manager.get_api_key(league_key)))
+            for league_key in LeagueManager.LEAGUE_DB
+        )
+        if None in versions:
+            return None
+        return render_cache.make_key(('scan', versions), 'scan', 0, True)
+
+    async def _run_scan(self, query, progress_msg, session, render_key_before, started):
+        """Run the all-leagues scan and display its merged ranking"""
+        try:
+            results = await scan_all_leagues(SCRAPING_API_KEY, SCRAPING_BASE_URL)
+
+            with stage_seconds.time('format', 'all', 'scan'):
+                pages = self._render_pages(
+                    "🌍 All Leagues Scan\n"
+                    "📊 Arbitrage and value, ranked across leagues\n\n"
+                    f"{format_results(results)}"
+                )
+
+            # Complete scans of unchanged snapshots are shared; anything else
+            # is kept for this user only so its pages can still be browsed
+            render_key = self._scan_render_key()
+            complete = all(entry['status'] in ('ok', 'empty') for entry in results.get('league_status', {}).values())
+            if 'error' in results or not complete or render_key is None or render_key_before not in (None, render_key):
+                render_key = render_cache.make_key(('scan', query.from_user.id), 'scan', 0, True)
+            render_cache.put(render_key, pages)
+            session.render_key = render_key
+
+            text, markup = pages[0]
+            with stage_seconds.time('telegram', 'all', 'scan'):
+                await progress_msg.edit_text(text, reply_markup=markup)
+            stage_seconds.observe(time.perf_counter() - started, 'total', 'all', 'scan')
+            analyses.inc('all', 'scan', 'error' if 'error' in results else 'ok')
+
+        except asyncio.CancelledError:
+            analyses.inc('all', 'scan', 'cancelled')
+            logger.info("League scan cancelled")
+            raise
+
+        except Exception as e:
+            analyses.inc('all', 'scan', 'failed')
+            errors.inc('handler')
+            logger.error(f"League scan error: {str(e)}", exc_info=True)
+            await self.show_error(query, f"Scan failed: {str(e)}")
+
+    def _render_pages(self, text):
+        """Split a result message into Telegram-sized pages with pager buttons"""
+        chunks = paginate(text)
+        if len(chunks) == 1:
+            return [(chunks[0], self.buttons.main_menu())]
+        return [(chunk, self.buttons.result_pages(i, len(chunks))) for i, chunk in enumerate(chunks)]
+
+    async def _handle_page(self, query, context, values):
+        """Show another page of the user's last rendered result"""
+        session = self.sessions.get(query.from_user.id)
+        page = render_cache.page(session.render_key, int(values[0])) if session and session.render_key else None
+        if page is None:
+            return await self.show_error(query, "Results expired, run the analysis again")
+
+        text, markup = page
+        try:
+            await query.edit_message_text(text, reply_markup=markup)
+        except BadRequest as e:
+            if "Message is not modified" not in str(e):
+                raise
+
+    def _cancel_run(self, user_id):
+        """Cancel a user's in-flight analysis, if any"""
+        task = self.active_runs.pop(user_id, None)
+        if task and not task.done():
+            task.cancel()
+
+    def _forget_run(self, user_id, task):
+        """Drop a finished analysis task unless a newer one replaced it"""
+        if self.active_runs.get(user_id) is task:
+            del self.active_runs[user_id]
+
     async def handle_league_selection(self, query, context, values):
         """Store league selection and show algorithm choices"""
         user_id = query.from_user.id
@@ -367,7 +659,7 @@ class OddsBot:
             return await self.show_error(query, "Invalid league")
 
         # Update user session
-        self.user_sessions[user_id] = {'league': league_key}
+        self.sessions.set(user_id, league_key)
 
         await query.edit_message_text(
             f"✅ Selected: {self.league_manager.get_display_name(league_key)}\n"
@@ -383,7 +675,8 @@ class OddsBot:
             "🤖 *Bot Guide*\n\n"
             "1. Select a football league\n"
             "2. Choose analysis method\n"
-            "3. Receive betting insights\n\n"
+            "3. Receive betting insights\n"
+            "🌍 Or scan all leagues at once from the league menu\n\n"
             "✨ *Available Algorithms*\n"
             "- ARIMA: Price trend analysis\n"
             "- KELLY: Optimal bet sizing\n"
@@ -421,7 +714,15 @@ class OddsBot:
 def initialize_bot():
     """Configure and start the Telegram bot"""
     bot = OddsBot()
-    application = ApplicationBuilder().token(BOT_TOKEN).build()
+    application = (
+        ApplicationBuilder()
+        .token(BOT_TOKEN)
+        # Updates run concurrently up to the limit; each user's stay in order
+        .concurrent_updates(PerUserUpdateProcessor(MAX_CONCURRENT_UPDATES))
+        .post_init(bot.post_init)
+        .post_shutdown(bot.post_shutdown)
+        .build()
+    )
 
     # Register handlers
     application.add_handler(CommandHandler('start', bot.handle_start))
@@ -436,6 +737,22 @@ def initialize_bot():
     logger.info("OddsAnalyst bot initializing...")
     return application
 
+def run_bot(application):
+    """Serve updates by webhook or long polling, per BOT_MODE"""
+    if BOT_MODE == "webhook":
+        logger.info(f"Starting webhook server on {WEBHOOK_LISTEN}:{PORT}/{WEBHOOK_PATH}")
+        application.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=PORT,
+            url_path=WEBHOOK_PATH,
+            webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET,
+            max_connections=MAX_CONCURRENT_UPDATES,
+            allowed_updates=Update.ALL_TYPES
+        )
+    else:
+        application.run_polling(allowed_updates=Update.ALL_TYPES)
+
 if __name__ == "__main__":
     app = initialize_bot()
-    app.run_polling()
+    run_bot(app)
@@ -0,0 +1,73 @@
+# utils/loop_monitor.py
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Optional
+from config.settings import LOOP_LAG_INTERVAL, LOOP_LAG_WARN
+from utils.metrics import registry
+
+logger = logging.getLogger('OddsBot')
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag by scheduling a periodic sleep and recording how
+    late it wakes up. A blocked loop shows up directly as lag.
+    """
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL, warn_threshold: float = LOOP_LAG_WARN, window: int = 600):
+        self.interval = interval
+        self.warn_threshold = warn_threshold
+        self.samples = deque(maxlen=window)
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _probe(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+            self.samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag > self.warn_threshold:
+                logger.warning(f"Event loop lag {lag * 1000:.0f} ms")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._probe())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def last_lag(self) -> float:
+        return self.samples[-1] if self.samples else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """Lag over the recent window, in milliseconds."""
+        if not self.samples:
+            return {'last_ms': 0.0, 'p50_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+        ordered = sorted(self.samples)
+        pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+        return {
+            'last_ms': self.last_lag * 1000,
+            'p50_ms': pick(0.50),
+            'p99_ms': pick(0.99),
+            'max_ms': self.max_lag * 1000
+        }
+
+loop_monitor = LoopLagMonitor()
+
+registry.callback(
+    'betsage_event_loop_lag_seconds',
+    'Event loop lag over the recent probe window',
+    'gauge',
+    lambda: {(stat,): loop_monitor.stats()[f"{stat}_ms"] / 1000 for stat in ('last', 'p50', 'p99', 'max')},
+    ('stat',)
+)